@@ -0,0 +1,87 @@
+"""
+Mide cuánto tarda en importarse cada módulo de soporte en un intérprete nuevo (importación en frío) y falla si
+alguno supera el tiempo máximo de `presupuesto_importacion.json` o si carga alguna de las librerías pesadas que
+deben importarse solo al usarse (pandas, scipy, statsmodels, matplotlib...).
+
+Uso, desde la raíz del repositorio:
+    python benchmarks/importacion.py [--repeticiones 7] [--actualizar]
+
+Con --actualizar se reescriben los tiempos máximos como el doble de la mediana medida en esta máquina.
+El proceso termina con código 1 si hay alguna regresión.
+"""
+# Otras librerias
+# -----------------------------------------------------------------------
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PRESUPUESTO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "presupuesto_importacion.json")
+
+# se mide solo la importación del módulo, no el arranque del intérprete
+CODIGO = """
+import json, sys, time
+inicio = time.perf_counter()
+import {modulo}
+duracion = time.perf_counter() - inicio
+print(json.dumps({{"duracion": duracion, "cargados": sorted(sys.modules)}}))
+"""
+
+
+def medir_importacion(modulo, repeticiones):
+    """
+    Importa el módulo `repeticiones` veces, cada una en un intérprete nuevo.
+
+    Returns:
+        Tupla (mediana de la duración en segundos, conjunto de módulos cargados tras la importación).
+    """
+    duraciones, cargados = [], set()
+    for _ in range(repeticiones):
+        salida = subprocess.run([sys.executable, "-c", CODIGO.format(modulo=modulo)], cwd=RAIZ,
+                                capture_output=True, text=True, check=True)
+        resultado = json.loads(salida.stdout)
+        duraciones.append(resultado["duracion"])
+        cargados.update(resultado["cargados"])
+    return statistics.median(duraciones), cargados
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Benchmark de importación en frío de los módulos de soporte.")
+    parser.add_argument("--repeticiones", type=int, default=7, help="intérpretes nuevos por módulo (se usa la mediana)")
+    parser.add_argument("--actualizar", action="store_true", help="reescribe los tiempos máximos con las medidas actuales")
+    argumentos = parser.parse_args(argumentos)
+
+    with open(PRESUPUESTO, encoding="utf-8") as fichero:
+        presupuesto = json.load(fichero)
+
+    errores = []
+    for modulo, maximo in presupuesto["tiempo_maximo"].items():
+        duracion, cargados = medir_importacion(modulo, argumentos.repeticiones)
+        prohibidos = sorted(nombre for nombre in presupuesto["modulos_prohibidos"] if nombre in cargados)
+        estado = "ok"
+        if prohibidos:
+            estado = "CARGA " + ", ".join(prohibidos)
+            errores.append(f"{modulo} importa {', '.join(prohibidos)}")
+        elif duracion > maximo and not argumentos.actualizar:
+            estado = "LENTO"
+            errores.append(f"{modulo} tarda {duracion:.3f} s (máximo {maximo:.3f} s)")
+        print(f"{modulo:<28} {duracion * 1000:8.1f} ms  (máximo {maximo * 1000:6.0f} ms)  {estado}")
+        if argumentos.actualizar:
+            presupuesto["tiempo_maximo"][modulo] = round(2 * duracion, 3)
+
+    if argumentos.actualizar:
+        with open(PRESUPUESTO, "w", encoding="utf-8") as fichero:
+            json.dump(presupuesto, fichero, indent=4, ensure_ascii=False)
+            fichero.write("\n")
+
+    for error in errores:
+        print(f"Regresión: {error}", file=sys.stderr)
+    return 1 if errores else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
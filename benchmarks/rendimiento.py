@@ -0,0 +1,316 @@
+"""
+Mide el tiempo y la memoria de las funciones públicas de `soporte_abtesting`, `soporte_descriptiva` y
+`soporte_combinatoria` con datos sintéticos de distintos tamaños, guarda los resultados en JSON y, si se indica
+una ejecución anterior, marca las regresiones.
+
+Uso, desde la raíz del repositorio:
+    python benchmarks/rendimiento.py [--filas 1e3,1e4,1e5,1e6] [--grupos 2] [--sesgo 0] [--asimetria 1] [--nulos 0]
+                                     [--repeticiones 3] [--casos REGEX] [--salida resultados.json]
+                                     [--comparar base.json] [--umbral 0.25]
+
+El tiempo es la mediana de `--repeticiones` ejecuciones. La memoria es el pico de memoria reservada durante una
+ejecución aparte, medido con tracemalloc (incluye numpy y pandas, pero no la memoria interna de pyarrow). Cada
+ejecución crea sus propias instancias y vacía la caché de rangos, así que siempre se mide el cálculo completo.
+Con 10^8 filas hacen falta varios GB de memoria; los casos que no escalan (gráficos, Wilcoxon...) tienen un
+número máximo de filas y se omiten por encima.
+
+El proceso termina con código 1 si hay alguna regresión.
+"""
+# Tratamiento de datos
+# -----------------------------------------------------------------------
+import numpy as np
+import pandas as pd
+
+# Otras librerias
+# -----------------------------------------------------------------------
+import argparse
+import builtins
+import contextlib
+import io
+import itertools
+import json
+import os
+import platform
+import re
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+# los gráficos se dibujan sin ventana
+os.environ.setdefault("MPLBACKEND", "Agg")
+
+from src import soporte_abtesting as ab
+from src import soporte_descriptiva as de
+from src import soporte_combinatoria as co
+from src.soporte_grupos import cache_rangos
+
+
+# diferencias por debajo de estos valores se consideran ruido aunque superen el umbral relativo
+TIEMPO_MINIMO = 0.005
+MEMORIA_MINIMA = 1 << 20
+
+# tuplas que se recorren de cada secuencia combinatoria, como mucho
+MAXIMO_TUPLAS = 10**6
+
+
+def generar_datos(filas, grupos=2, sesgo=0.0, asimetria=1.0, nulos=0.0, semilla=0):
+    """
+    Genera un DataFrame sintético de un experimento A/B.
+
+    Params:
+        - filas: número de filas.
+        - grupos (opcional): número de grupos de la columna "grupo". Por defecto es 2.
+        - sesgo (opcional): desequilibrio del tamaño de los grupos; la probabilidad del grupo i es proporcional
+          a (i + 1)**-sesgo. Con 0 todos los grupos tienen el mismo tamaño esperado. Por defecto es 0.
+        - asimetria (opcional): sigma de la lognormal de "importe"; cuanto mayor, más asimétrica. Por defecto es 1.
+        - nulos (opcional): proporción de nulos en "importe", "visitas" y "segmento". Por defecto es 0.
+        - semilla (opcional): semilla del generador. Por defecto es 0.
+
+    Returns:
+        DataFrame con las columnas grupo, segmento, conversion (0/1), importe y visitas.
+    """
+    rng = np.random.default_rng(semilla)
+    pesos = (np.arange(grupos) + 1.0)**-sesgo
+    nombres = np.array([f"grupo_{i}" for i in range(grupos)], dtype=object)
+    codigos = rng.choice(grupos, size=filas, p=pesos / pesos.sum())
+    # un pequeño efecto por grupo, para que los tests no sean todos nulos
+    efecto = 0.02 * codigos
+
+    dataframe = pd.DataFrame({"grupo": nombres[codigos],
+                              "segmento": np.array(["movil", "web", "tienda", "app"], dtype=object)[rng.integers(0, 4, filas)],
+                              "conversion": (rng.random(filas) < 0.1 + efecto / 10).astype(np.int64),
+                              "importe": rng.lognormal(3 + efecto, asimetria, filas),
+                              "visitas": rng.poisson(3 + efecto, filas).astype(np.float64)})
+    if nulos > 0:
+        for columna in ("importe", "visitas", "segmento"):
+            dataframe.loc[rng.random(filas) < nulos, columna] = None
+    return dataframe
+
+
+def generar_pareados(filas, semilla=0):
+    """
+    Genera datos pareados (dos categorías del mismo tamaño), para los tests de muestras dependientes.
+    """
+    rng = np.random.default_rng(semilla)
+    mitad = filas // 2
+    antes = rng.normal(10, 2, mitad)
+    return pd.DataFrame({"momento": np.repeat(np.array(["antes", "despues"], dtype=object), mitad),
+                         "valor": np.concatenate([antes, antes + rng.normal(0.1, 1, mitad)])})
+
+
+def _recorrer(secuencia, filas):
+    secuencia, total = secuencia
+    return total, sum(1 for _ in itertools.islice(secuencia, min(filas, MAXIMO_TUPLAS)))
+
+
+def _cerrar_figuras(resultado):
+    import matplotlib.pyplot as plt
+
+    plt.close("all")
+    return resultado
+
+
+def _no_parametricas(datos):
+    return ab.Pruebas_no_parametricas(datos["dataframe"], "importe", "grupo")
+
+
+def _parametricas(datos, columna="importe", dataframe="dataframe"):
+    categorias = datos["categorias"]
+    return ab.Pruebas_parametricas("grupo", columna, datos[dataframe], categoria_test=categorias[1],
+                                   categoria_control=categorias[0])
+
+
+# Cada caso es (módulo, nombre, función que recibe los datos preparados, número máximo de filas o None).
+# Las funciones crean sus propias instancias para que se mida también la separación en grupos.
+CASOS = [
+    ("abtesting", "exploracion_dataframe", lambda d: ab.exploracion_dataframe(d["dataframe"], "grupo"), None),
+    ("abtesting", "exploracion_dataframe_sketch", lambda d: ab.exploracion_dataframe(d["dataframe"], "grupo", metodo_cuantiles="sketch"), None),
+    ("abtesting", "exploracion_dataframe_por_chunks", lambda d: ab.exploracion_dataframe_por_chunks(d["fichero"], "grupo"), None),
+    ("abtesting", "describir_numericas", lambda d: ab.describir_numericas(d["dataframe"]), None),
+    ("abtesting", "pruebas_multiples_metricas", lambda d: ab.pruebas_multiples_metricas(d["dataframe"], ["importe", "visitas"], "grupo"), None),
+    ("abtesting", "Asunciones.identificar_normalidad_analitica", lambda d: ab.Asunciones(d["dataframe"], "importe").identificar_normalidad_analitica(metodo="dagostino", verbose=False), None),
+    ("abtesting", "Asunciones.identificar_normalidad_multiple", lambda d: ab.Asunciones(d["dataframe"], "importe").identificar_normalidad_multiple(columna_categorica="grupo"), None),
+    ("abtesting", "Asunciones.identificar_homogeneidad", lambda d: ab.Asunciones(d["dataframe"], "importe").identificar_homogeneidad("grupo"), None),
+    ("abtesting", "Asunciones.matriz_asunciones", lambda d: ab.Asunciones(d["dataframe"], "importe").matriz_asunciones(n_procesos=1), None),
+    ("abtesting", "Pruebas_parametricas.separar_grupos", lambda d: _parametricas(d).separar_grupos(), None),
+    ("abtesting", "Pruebas_parametricas.z_test", lambda d: _parametricas(d, "conversion").z_test(), None),
+    ("abtesting", "Pruebas_parametricas.test_t", lambda d: _parametricas(d, dataframe="dos_grupos").test_t(), None),
+    ("abtesting", "Pruebas_parametricas.test_anova", lambda d: _parametricas(d).test_anova(), None),
+    ("abtesting", "Pruebas_parametricas.test_t_resumenes", lambda d: _parametricas(d).test_t_resumenes(), None),
+    ("abtesting", "Pruebas_parametricas.test_anova_resumenes", lambda d: _parametricas(d).test_anova_resumenes(), None),
+    ("abtesting", "Pruebas_parametricas.post_hoc", lambda d: _parametricas(d).post_hoc(), None),
+    ("abtesting", "Pruebas_parametricas.pruebas_por_segmento", lambda d: _parametricas(d).pruebas_por_segmento(["segmento", "visitas"], test="welch"), None),
+    ("abtesting", "Pruebas_parametricas.intervalo_bootstrap", lambda d: _parametricas(d).intervalo_bootstrap(n_replicas=200, n_procesos=1, semilla=0), 10**7),
+    ("abtesting", "Pruebas_parametricas.test_t_dependiente", lambda d: ab.Pruebas_parametricas("momento", "valor", d["pareados"]).test_t_dependiente(), None),
+    ("abtesting", "Pruebas_no_parametricas.generar_grupos", lambda d: _no_parametricas(d).generar_grupos(), None),
+    ("abtesting", "Pruebas_no_parametricas.test_manwhitneyu", lambda d: _no_parametricas(d).test_manwhitneyu(d["categorias"][:2]), None),
+    ("abtesting", "Pruebas_no_parametricas.test_kruskal", lambda d: _no_parametricas(d).test_kruskal(d["categorias"]), None),
+    ("abtesting", "Pruebas_no_parametricas.post_hoc", lambda d: _no_parametricas(d).post_hoc(), None),
+    ("abtesting", "Pruebas_no_parametricas.pruebas_por_segmento", lambda d: _no_parametricas(d).pruebas_por_segmento(["segmento", "visitas"], d["categorias"][:2]), None),
+    ("abtesting", "Pruebas_no_parametricas.test_wilcoxon", lambda d: ab.Pruebas_no_parametricas(d["pareados"], "valor", "momento").test_wilcoxon(["antes", "despues"]), 10**7),
+    ("abtesting", "Pruebas_no_parametricas.test_permutacion", lambda d: _no_parametricas(d).test_permutacion(d["categorias"][:2], n_permutaciones=200, n_procesos=1, semilla=0), 10**7),
+    ("abtesting", "Pruebas_no_parametricas.intervalo_bootstrap", lambda d: _no_parametricas(d).intervalo_bootstrap(d["categorias"][:2], n_replicas=200, n_procesos=1, semilla=0), 10**7),
+    ("descriptiva", "tablas_contingencia", lambda d: de.tablas_contingencia(d["dataframe"], ["grupo", "segmento"]), None),
+    ("descriptiva", "densidad_2d", lambda d: de.densidad_2d(d["dataframe"]["importe"], d["dataframe"]["visitas"]), None),
+    ("descriptiva", "identificar_linealidad", lambda d: _cerrar_figuras(de.identificar_linealidad(d["dataframe"], [("importe", "visitas")])), None),
+    ("descriptiva", "visualizar_tablas_frecuencias", lambda d: _cerrar_figuras(de.visualizar_tablas_frecuencias(d["dataframe"], ["grupo", "segmento"])), 10**6),
+    ("descriptiva", "visualizar_tablas_contingencia", lambda d: _cerrar_figuras(de.visualizar_tablas_contingencia(d["dataframe"], ["grupo", "segmento"])), None),
+    ("descriptiva", "visualizar_medidas_posicion", lambda d: _cerrar_figuras(de.visualizar_medidas_posicion(d["dataframe"], "importe")), None),
+    # las funciones combinatorias no dependen de los datos: se recorren min(filas, MAXIMO_TUPLAS) tuplas
+    ("combinatoria", "permutaciones", lambda d: _recorrer(co.permutaciones(range(10)), d["filas"]), None),
+    ("combinatoria", "variaciones", lambda d: _recorrer(co.variaciones(range(20), 5), d["filas"]), None),
+    ("combinatoria", "combinaciones", lambda d: _recorrer(co.combinaciones(range(40), 5), d["filas"]), None),
+    ("combinatoria", "permutaciones_con_repeticion", lambda d: _recorrer(co.permutaciones_con_repeticion([0] * 4 + [1] * 4 + [2] * 4), d["filas"]), None),
+    ("combinatoria", "variaciones_con_repeticion", lambda d: _recorrer(co.variaciones_con_repeticion(range(10), 7), d["filas"]), None),
+    ("combinatoria", "combinaciones_con_repeticion", lambda d: _recorrer(co.combinaciones_con_repeticion(range(20), 7), d["filas"]), None),
+    ("combinatoria", "producto_cartesiano", lambda d: _recorrer(co.producto_cartesiano(range(100), range(100), range(100)), d["filas"]), None),
+]
+
+
+def preparar_datos(filas, casos, directorio, **parametros):
+    """
+    Genera los datos de un tamaño y escribe el fichero Parquet solo si algún caso lo necesita.
+    """
+    dataframe = generar_datos(filas, **parametros)
+    categorias = sorted(dataframe["grupo"].unique())
+    datos = {"filas": filas,
+             "dataframe": dataframe,
+             "categorias": categorias,
+             # el test t de Student (no el de los resúmenes) compara todas las categorías, así que necesita dos
+             "dos_grupos": dataframe[dataframe["grupo"].isin(categorias[:2])],
+             "pareados": generar_pareados(filas, parametros.get("semilla", 0))}
+    if any(nombre == "exploracion_dataframe_por_chunks" for _, nombre, _, _ in casos):
+        datos["fichero"] = os.path.join(directorio, f"datos_{filas}.parquet")
+        dataframe.to_parquet(datos["fichero"], index=False)
+    return datos
+
+
+def medir(funcion, datos, repeticiones):
+    """
+    Ejecuta la función `repeticiones` veces para el tiempo y una vez más con tracemalloc para la memoria.
+    Todo lo que imprima se descarta.
+
+    Returns:
+        Tupla (mediana del tiempo en segundos, pico de memoria en bytes).
+    """
+    duraciones = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeticiones):
+            cache_rangos.limpiar()
+            inicio = time.perf_counter()
+            funcion(datos)
+            duraciones.append(time.perf_counter() - inicio)
+
+        cache_rangos.limpiar()
+        tracemalloc.start()
+        try:
+            funcion(datos)
+            _, pico = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return statistics.median(duraciones), pico
+
+
+def comparar(resultados, base, umbral):
+    """
+    Compara los resultados con los de una ejecución anterior (mismo caso, tamaño y parámetros de los datos).
+
+    Returns:
+        Lista de mensajes, uno por regresión de tiempo o de memoria mayor que `umbral` (relativo).
+    """
+    anteriores = {(r["caso"], r["filas"]): r for r in base["resultados"]}
+    regresiones = []
+    if base.get("parametros") != resultados["parametros"]:
+        print("Aviso: los parámetros de los datos no coinciden con los de la ejecución de referencia.", file=sys.stderr)
+    for resultado in resultados["resultados"]:
+        anterior = anteriores.get((resultado["caso"], resultado["filas"]))
+        if anterior is None or "error" in resultado or "error" in anterior:
+            continue
+        for medida, minimo, unidad, escala in (("tiempo", TIEMPO_MINIMO, "s", 1), ("memoria_pico", MEMORIA_MINIMA, "MB", 1 << 20)):
+            nuevo, viejo = resultado[medida], anterior[medida]
+            if nuevo > viejo * (1 + umbral) and nuevo - viejo > minimo:
+                regresiones.append(f"{resultado['caso']} con {resultado['filas']} filas: {medida} "
+                                   f"{viejo / escala:.3f} -> {nuevo / escala:.3f} {unidad} (+{(nuevo / viejo - 1) * 100:.0f}%)")
+    return regresiones
+
+
+def _leer_filas(texto):
+    return [int(float(valor)) for valor in texto.split(",")]
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Benchmark de tiempo y memoria de las funciones públicas.")
+    parser.add_argument("--filas", type=_leer_filas, default=[10**3, 10**4, 10**5, 10**6],
+                        help="tamaños separados por comas, por ejemplo 1e3,1e5,1e8")
+    parser.add_argument("--grupos", type=int, default=2, help="número de grupos")
+    parser.add_argument("--sesgo", type=float, default=0.0, help="desequilibrio del tamaño de los grupos")
+    parser.add_argument("--asimetria", type=float, default=1.0, help="sigma de la lognormal de 'importe'")
+    parser.add_argument("--nulos", type=float, default=0.0, help="proporción de nulos")
+    parser.add_argument("--semilla", type=int, default=0, help="semilla de los datos")
+    parser.add_argument("--repeticiones", type=int, default=3, help="ejecuciones por caso (se usa la mediana)")
+    parser.add_argument("--casos", default=None, help="expresión regular para elegir los casos por nombre")
+    parser.add_argument("--salida", default=None, help="fichero JSON donde guardar los resultados")
+    parser.add_argument("--comparar", default=None, help="fichero JSON de una ejecución anterior")
+    parser.add_argument("--umbral", type=float, default=0.25, help="aumento relativo que se considera regresión")
+    argumentos = parser.parse_args(argumentos)
+
+    if argumentos.grupos < 2:
+        parser.error("hacen falta al menos dos grupos")
+    casos = [caso for caso in CASOS if argumentos.casos is None or re.search(argumentos.casos, f"{caso[0]}.{caso[1]}")]
+    parametros = {"grupos": argumentos.grupos, "sesgo": argumentos.sesgo, "asimetria": argumentos.asimetria,
+                  "nulos": argumentos.nulos, "semilla": argumentos.semilla}
+
+    # las funciones de exploración usan `display`, que solo existe en Jupyter
+    if not hasattr(builtins, "display"):
+        builtins.display = lambda *objetos, **kwargs: None
+
+    resultados = {"maquina": {"python": platform.python_version(), "numpy": np.__version__, "pandas": pd.__version__,
+                              "sistema": platform.platform(), "procesador": platform.processor(), "nucleos": os.cpu_count()},
+                  "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                  "parametros": parametros,
+                  "repeticiones": argumentos.repeticiones,
+                  "resultados": []}
+
+    with tempfile.TemporaryDirectory() as directorio:
+        # una primera pasada con pocos datos, sin medir, para que las importaciones perezosas (scipy, matplotlib...)
+        # no cuenten en el tiempo del primer tamaño
+        datos = preparar_datos(200, casos, directorio, **parametros)
+        for _, _, funcion, _ in casos:
+            with contextlib.suppress(Exception), contextlib.redirect_stdout(io.StringIO()):
+                funcion(datos)
+
+        for filas in argumentos.filas:
+            casos_tamaño = [caso for caso in casos if caso[3] is None or filas <= caso[3]]
+            datos = preparar_datos(filas, casos_tamaño, directorio, **parametros)
+            for modulo, nombre, funcion, _ in casos_tamaño:
+                resultado = {"caso": f"{modulo}.{nombre}", "filas": filas}
+                try:
+                    resultado["tiempo"], resultado["memoria_pico"] = medir(funcion, datos, argumentos.repeticiones)
+                    print(f"{resultado['caso']:<60} {filas:>11,} filas  {resultado['tiempo'] * 1000:10.1f} ms  "
+                          f"{resultado['memoria_pico'] / (1 << 20):9.1f} MB")
+                except Exception as error:
+                    resultado["error"] = f"{type(error).__name__}: {error}"
+                    print(f"{resultado['caso']:<60} {filas:>11,} filas  ERROR {resultado['error']}")
+                resultados["resultados"].append(resultado)
+            del datos
+
+    if argumentos.salida:
+        with open(argumentos.salida, "w", encoding="utf-8") as fichero:
+            json.dump(resultados, fichero, indent=4, ensure_ascii=False)
+            fichero.write("\n")
+
+    regresiones = []
+    if argumentos.comparar:
+        with open(argumentos.comparar, encoding="utf-8") as fichero:
+            regresiones = comparar(resultados, json.load(fichero), argumentos.umbral)
+    for regresion in regresiones:
+        print(f"Regresión: {regresion}", file=sys.stderr)
+    return 1 if regresiones else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
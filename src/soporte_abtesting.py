@@ -1,36 +1,151 @@
+# Para importar las librerías pesadas solo cuando se usan
+# -----------------------------------------------------------------------
+from .soporte_perezoso import importar_perezoso
+
 # Tratamiento de datos
 # -----------------------------------------------------------------------
-import pandas as pd
 import numpy as np
+pd = importar_perezoso("pandas")
 
 # Para pruebas estadísticas
 # -----------------------------------------------------------------------
-from scipy import stats
-from statsmodels.stats.proportion import proportions_ztest # para hacer el ztest
+stats = importar_perezoso("scipy.stats")
+
+# Para separar los datos en grupos
+# -----------------------------------------------------------------------
+from .soporte_grupos import GruposContiguos, rangos_columnas, sumas_por_grupo, momentos_por_grupo
+from .soporte_grupos import RangosAgrupados, RangosSignados, cache_rangos, huella_array, estadistico_kruskal, estadistico_mannwhitney
+from .soporte_exactas import mannwhitney_exacto, wilcoxon_exacto, metodo_mannwhitney
+
+# Para explorar ficheros que no caben en memoria
+# -----------------------------------------------------------------------
+from .soporte_acumuladores import AcumuladorMomentos, AcumuladorFrecuencias, combinar_tipos, leer_por_chunks
+from .soporte_acumuladores import test_t_resumenes, test_anova_resumenes
+from .soporte_cuantiles import SketchCuantiles, TAMAÑO_BLOQUE
+
+# Para evaluar la normalidad en conjuntos de datos grandes
+# -----------------------------------------------------------------------
+from .soporte_normalidad import normalidad_por_grupos, momentos_centrales, METODOS_NORMALIDAD
+from .soporte_asunciones import matriz_asunciones, levene_por_grupos
 
-def exploracion_dataframe(dataframe, columna_control):
+# Para las comparaciones por parejas (post-hoc)
+# -----------------------------------------------------------------------
+from .soporte_posthoc import comparaciones_rangos, test_dunn, test_mannwhitney_parejas, test_tukey, test_welch_parejas
+
+# Para los tests por remuestreo
+# -----------------------------------------------------------------------
+from . import soporte_remuestreo
+
+# Para monitorizar experimentos en vivo
+# -----------------------------------------------------------------------
+from .soporte_secuencial import ContadorConversiones
+
+# Para medir el tiempo y la memoria de cada etapa
+# -----------------------------------------------------------------------
+from .soporte_instrumentacion import etapa
+
+# Para aceptar DataFrames de Polars y tablas de PyArrow sin convertirlos a pandas
+# -----------------------------------------------------------------------
+from .soporte_tablas import es_nativa, numero_filas, columnas_por_tipo, a_numpy, factorizar_columna, grupos_contiguos, informe_nativo
+from .soporte_tablas import referencias_columnas, misma_clave
+
+# Para repetir los tests dentro de cada segmento
+# -----------------------------------------------------------------------
+from .soporte_segmentos import pruebas_por_segmento
+
+# Para detectar duplicados con un índice de huellas de filas, incremental y persistente
+# -----------------------------------------------------------------------
+from .soporte_huellas import IndiceHuellas, contar_duplicados
+
+def describir_numericas(dataframe, metodo_cuantiles="exacto", error_cuantiles=0.01):
+    """
+    Calcula los estadísticos de las columnas numéricas con el mismo formato que `describe().T`.
+
+    Params:
+    - dataframe (DataFrame): El DataFrame a describir.
+    - metodo_cuantiles (str, opcional): 'exacto' usa `describe()`; 'sketch' calcula los cuartiles con
+      SketchCuantiles en una sola pasada, sin ordenar cada columna.
+    - error_cuantiles (float, opcional): Error de rango admitido en el modo 'sketch'. Por defecto es 0.01.
+
+    Returns:
+    DataFrame con una fila por columna numérica y las columnas count, mean, std, min, 25%, 50%, 75% y max.
+    """
+    if metodo_cuantiles == "exacto":
+        return dataframe.describe().T
+    if metodo_cuantiles != "sketch":
+        raise ValueError("Método no válido. Por favor, elige 'exacto' o 'sketch'.")
+
+    numericas = dataframe.select_dtypes(include = "number")
+    # los momentos se acumulan por bloques de filas para no copiar todas las columnas numéricas de una vez
+    momentos = AcumuladorMomentos(numericas.columns)
+    for inicio in range(0, len(numericas), TAMAÑO_BLOQUE):
+        momentos.actualizar(numericas.iloc[inicio:inicio + TAMAÑO_BLOQUE].to_numpy(dtype=np.float64))
+    resumen = momentos.resumen()
+    cuartiles = [SketchCuantiles(error_cuantiles).actualizar(numericas[col]).cuantil([0.25, 0.5, 0.75]) for col in numericas.columns]
+    return insertar_cuartiles(resumen, cuartiles)
+
+
+def insertar_cuartiles(resumen, cuartiles):
+    """
+    Añade las columnas 25%, 50% y 75% a un resumen numérico, en la misma posición que `describe()`.
+
+    Params:
+    - resumen (DataFrame): Resumen con las columnas count, mean, std, min y max.
+    - cuartiles (list): Una terna de cuartiles por fila del resumen.
+
+    Returns:
+    El DataFrame con las columnas en el orden de `describe().T`.
+    """
+    cuartiles = np.asarray(cuartiles, dtype=np.float64).reshape(len(resumen), 3)
+    resumen = resumen.copy()
+    for indice, etiqueta in enumerate(["25%", "50%", "75%"]):
+        resumen[etiqueta] = cuartiles[:, indice]
+    return resumen[["count", "mean", "std", "min", "25%", "50%", "75%", "max"]]
+
+
+def exploracion_dataframe(dataframe, columna_control, metodo_cuantiles="exacto", error_cuantiles=0.01, indice_duplicados=None):
     """
     Realiza un análisis exploratorio básico de un DataFrame, mostrando información sobre duplicados,
     valores nulos, tipos de datos, valores únicos para columnas categóricas y estadísticas descriptivas
     para columnas categóricas y numéricas, agrupadas por la columna de control.
 
     Params:
-    - dataframe (DataFrame): El DataFrame que se va a explorar.
+    - dataframe (DataFrame): El DataFrame que se va a explorar. También puede ser un DataFrame o LazyFrame de Polars o
+      una tabla de PyArrow.
     - columna_control (str): El nombre de la columna que se utilizará como control para dividir el DataFrame.
+    - metodo_cuantiles (str, opcional): 'exacto' (por defecto) o 'sketch' para calcular los cuartiles de las
+      columnas numéricas de forma aproximada, sin ordenar cada grupo.
+    - error_cuantiles (float, opcional): Error de rango admitido en el modo 'sketch'. Por defecto es 0.01.
+    - indice_duplicados (IndiceHuellas, opcional): Índice de huellas de filas ya vistas (por ejemplo, los datos
+      de días anteriores). Si se indica, se cuentan también como duplicadas las filas que ya estaban en él y el
+      índice se actualiza con las nuevas.
 
     Returns: 
     No devuelve nada directamente, pero imprime en la consola la información exploratoria.
     """
+    # con Polars o PyArrow los conteos y los estadísticos los calcula el propio motor y solo se imprimen los resultados
+    if es_nativa(dataframe):
+        with etapa("informe_nativo", filas=numero_filas(dataframe)):
+            informe = informe_nativo(dataframe, columna_control)
+        if indice_duplicados is not None:
+            with etapa("duplicados", filas=numero_filas(dataframe)):
+                informe["duplicados"] = contar_duplicados(dataframe, indice_duplicados)
+        imprimir_informe(informe)
+        return
+
     print(f"El número de datos es {dataframe.shape[0]} y el de columnas es {dataframe.shape[1]}")
     print("\n ..................... \n")
 
-    print(f"Los duplicados que tenemos en el conjunto de datos son: {dataframe.duplicated().sum()}")
+    with etapa("duplicados", filas=len(dataframe)):
+        duplicados = contar_duplicados(dataframe, indice_duplicados)
+    print(f"Los duplicados que tenemos en el conjunto de datos son: {duplicados}")
     print("\n ..................... \n")
     
     
     # generamos un DataFrame para los valores nulos
     print("Los nulos que tenemos en el conjunto de datos son:")
-    df_nulos = pd.DataFrame(dataframe.isnull().sum() / dataframe.shape[0] * 100, columns = ["%_nulos"])
+    with etapa("nulos", filas=len(dataframe)):
+        df_nulos = pd.DataFrame(dataframe.isnull().sum() / dataframe.shape[0] * 100, columns = ["%_nulos"])
     display(df_nulos[df_nulos["%_nulos"] > 0])
     
     print("\n ..................... \n")
@@ -44,20 +159,171 @@ def exploracion_dataframe(dataframe, columna_control):
     
     for col in dataframe_categoricas.columns:
         print(f"La columna {col.upper()} tiene las siguientes valore únicos:")
-        display(pd.DataFrame(dataframe[col].value_counts()).head())    
+        with etapa("valores_unicos", filas=len(dataframe), columna=col):
+            valores_unicos = pd.DataFrame(dataframe[col].value_counts()).head()
+        display(valores_unicos)    
     
     # como estamos en un problema de A/B testing y lo que realmente nos importa es comparar entre el grupo de control y el de test, los principales estadísticos los vamos a sacar de cada una de las categorías
     
     for categoria in dataframe[columna_control].unique():
-        dataframe_filtrado = dataframe[dataframe[columna_control] == categoria]
+        with etapa("filtrar_categoria", filas=len(dataframe), categoria=categoria):
+            dataframe_filtrado = dataframe[dataframe[columna_control] == categoria]
     
         print("\n ..................... \n")
         print(f"Los principales estadísticos de las columnas categóricas para el {categoria} son: ")
-        display(dataframe_filtrado.describe(include = "O").T)
+        with etapa("describe_categoricas", filas=len(dataframe_filtrado), categoria=categoria):
+            resumen_categoricas = dataframe_filtrado.describe(include = "O").T
+        display(resumen_categoricas)
         
         print("\n ..................... \n")
         print(f"Los principales estadísticos de las columnas numéricas para el {categoria} son: ")
-        display(dataframe_filtrado.describe().T)
+        with etapa("describe_numericas", filas=len(dataframe_filtrado), categoria=categoria):
+            resumen_numerico = describir_numericas(dataframe_filtrado, metodo_cuantiles, error_cuantiles)
+        display(resumen_numerico)
+
+
+def imprimir_informe(informe):
+    """
+    Imprime un informe exploratorio (el de `exploracion_dataframe_por_chunks` o `informe_nativo`) con el mismo
+    formato que `exploracion_dataframe`.
+
+    Params:
+    - informe (dict): Diccionario con las claves filas, columnas, duplicados, nulos, tipos, valores_categoricas,
+      estadisticos_categoricas y estadisticos_numericos.
+
+    Returns:
+    No devuelve nada.
+    """
+    print(f"El número de datos es {informe['filas']} y el de columnas es {informe['columnas']}")
+    print("\n ..................... \n")
+
+    print(f"Los duplicados que tenemos en el conjunto de datos son: {informe['duplicados']}")
+    print("\n ..................... \n")
+
+    print("Los nulos que tenemos en el conjunto de datos son:")
+    df_nulos = informe["nulos"]
+    display(df_nulos[df_nulos["%_nulos"] > 0])
+
+    print("\n ..................... \n")
+    print(f"Los tipos de las columnas son:")
+    display(informe["tipos"])
+
+    print("\n ..................... \n")
+    print("Los valores que tenemos para las columnas categóricas son: ")
+    for col, valores in informe["valores_categoricas"].items():
+        print(f"La columna {col.upper()} tiene las siguientes valore únicos:")
+        display(valores)
+
+    for categoria, resumen_numerico in informe["estadisticos_numericos"].items():
+        print("\n ..................... \n")
+        print(f"Los principales estadísticos de las columnas categóricas para el {categoria} son: ")
+        display(informe["estadisticos_categoricas"].get(categoria))
+
+        print("\n ..................... \n")
+        print(f"Los principales estadísticos de las columnas numéricas para el {categoria} son: ")
+        display(resumen_numerico)
+
+
+def exploracion_dataframe_por_chunks(ruta, columna_control, tamaño_chunk=100_000, formato=None, capacidad_categorias=10_000, error_cuantiles=0.01, verbose=True, indice_duplicados=None, **kwargs):
+    """
+    Realiza el mismo análisis exploratorio que `exploracion_dataframe`, pero leyendo un fichero CSV o Parquet
+    por trozos en una única pasada. Cada trozo actualiza unos acumuladores combinables (conteos, nulos, tipos,
+    mínimo/máximo/media/M2 por grupo y conteos de categorías), de forma que la memoria queda acotada por el
+    tamaño del trozo y no por el del fichero.
+
+    Params:
+    - ruta (str): Ruta del fichero CSV o Parquet.
+    - columna_control (str): El nombre de la columna que se utilizará como control para dividir los datos.
+    - tamaño_chunk (int, opcional): Número de filas que se leen en cada trozo. Por defecto es 100000.
+    - formato (str, opcional): 'csv' o 'parquet'. Si es None se deduce de la extensión.
+    - capacidad_categorias (int, opcional): Número máximo de categorías distintas que se guardan por columna;
+      por encima de él los conteos de las categorías poco frecuentes son aproximados.
+    - error_cuantiles (float, opcional): Error de rango de los cuartiles, que se calculan con SketchCuantiles
+      combinables entre trozos. Por defecto es 0.01.
+    - verbose (bool, opcional): Si es True, imprime el informe igual que `exploracion_dataframe`.
+    - indice_duplicados (IndiceHuellas, opcional): Índice de huellas de filas ya vistas, que se actualiza con las
+      del fichero. Si es None se usa uno exacto nuevo. Con `IndiceHuellas(metodo="bloom")` la memoria es fija
+      aunque haya cientos de millones de filas, a cambio de una pequeña tasa de falsos duplicados.
+    - **kwargs: Argumentos adicionales para la lectura del CSV (por ejemplo `dtype`).
+
+    Returns:
+    Un diccionario con el informe: filas, columnas, duplicados, nulos, tipos, valores_categoricas,
+    estadisticos_categoricas y estadisticos_numericos (con los cuartiles aproximados) (estos dos últimos, diccionarios por categoría de control).
+    Las columnas numéricas y categóricas se fijan con el primer trozo; si en un trozo posterior una columna
+    numérica trae texto, esos valores se tratan como nulos y el tipo informado pasa a ser object.
+    """
+    filas = 0
+    nulos = None
+    tipos = {}
+    duplicados = 0
+    indice = IndiceHuellas() if indice_duplicados is None else indice_duplicados
+    columnas_numericas = columnas_categoricas = None
+    frecuencias = {}
+    momentos_grupo = {}
+    cuantiles_grupo = {}
+    frecuencias_grupo = {}
+
+    for chunk in leer_por_chunks(ruta, tamaño_chunk, formato, **kwargs):
+        with etapa("acumular_chunk", filas=len(chunk)):
+            if columnas_numericas is None:
+                columnas_numericas = chunk.select_dtypes(include="number").columns.tolist()
+                columnas_categoricas = chunk.select_dtypes(include="O").columns.tolist()
+                frecuencias = {col: AcumuladorFrecuencias(capacidad_categorias) for col in columnas_categoricas}
+
+            filas += len(chunk)
+            nulos_chunk = chunk.isnull().sum()
+            nulos = nulos_chunk if nulos is None else nulos.add(nulos_chunk, fill_value=0)
+            for col, tipo in chunk.dtypes.items():
+                tipos[col] = combinar_tipos(tipos.get(col), tipo)
+
+            # los duplicados se detectan con una huella de 64 bits por fila, comparada con las de los trozos anteriores
+            with etapa("duplicados", filas=len(chunk)):
+                duplicados += indice.actualizar(chunk)
+
+            for col in columnas_categoricas:
+                frecuencias[col].actualizar(chunk[col].value_counts())
+
+            numericas = chunk[columnas_numericas].apply(pd.to_numeric, errors="coerce")
+            agrupado = numericas.groupby(chunk[columna_control], sort=False)
+            conteo, media, varianza = agrupado.count(), agrupado.mean(), agrupado.var(ddof=0)
+            minimo, maximo = agrupado.min(), agrupado.max()
+            for categoria in conteo.index:
+                parcial = AcumuladorMomentos.desde_resumen(columnas_numericas,
+                                                           conteo.loc[categoria].to_numpy(),
+                                                           media.loc[categoria].to_numpy(),
+                                                           (varianza.loc[categoria] * conteo.loc[categoria]).to_numpy(),
+                                                           minimo.loc[categoria].to_numpy(),
+                                                           maximo.loc[categoria].to_numpy())
+                if categoria in momentos_grupo:
+                    momentos_grupo[categoria].combinar(parcial)
+                else:
+                    momentos_grupo[categoria] = parcial
+
+            for categoria, valores in agrupado:
+                sketches = cuantiles_grupo.setdefault(categoria, [SketchCuantiles(error_cuantiles) for _ in columnas_numericas])
+                for sketch, col in zip(sketches, columnas_numericas):
+                    sketch.actualizar(valores[col])
+
+            for col in columnas_categoricas:
+                for categoria, conteos in chunk.groupby([columna_control, col], sort=False).size().groupby(level=0, sort=False):
+                    acumulador = frecuencias_grupo.setdefault(categoria, {}).setdefault(col, AcumuladorFrecuencias(capacidad_categorias))
+                    acumulador.actualizar(conteos.droplevel(0))
+
+    informe = {"filas": filas,
+               "columnas": len(tipos),
+               "duplicados": int(duplicados),
+               "nulos": pd.DataFrame(nulos / filas * 100, columns = ["%_nulos"]),
+               "tipos": pd.DataFrame(pd.Series(tipos), columns = ["tipo_dato"]),
+               "valores_categoricas": {col: pd.DataFrame(acumulador.top(5)) for col, acumulador in frecuencias.items()},
+               "estadisticos_categoricas": {categoria: pd.DataFrame({col: acumulador.resumen() for col, acumulador in por_columna.items()}).T
+                                            for categoria, por_columna in frecuencias_grupo.items()},
+               "estadisticos_numericos": {categoria: insertar_cuartiles(acumulador.resumen(), [sketch.cuantil([0.25, 0.5, 0.75]) for sketch in cuantiles_grupo[categoria]])
+                                          for categoria, acumulador in momentos_grupo.items()}}
+
+    if verbose:
+        imprimir_informe(informe)
+
+    return informe
 
 
 
@@ -69,64 +335,129 @@ class Asunciones:
         
     
 
-    def identificar_normalidad_analitica(self, metodo='shapiro', alpha=0.05, verbose=True):
+    def identificar_normalidad_analitica(self, metodo='shapiro', alpha=0.05, verbose=True, tamaño_muestra=5000, semilla=0):
         """
-        Evalúa la normalidad de una columna de datos de un DataFrame utilizando la prueba de Shapiro-Wilk o Kolmogorov-Smirnov.
+        Evalúa la normalidad de una columna de datos de un DataFrame utilizando la prueba de Shapiro-Wilk, Kolmogorov-Smirnov,
+        D'Agostino-Pearson, Jarque-Bera o Anderson-Darling.
 
         Params:
-            metodo (str): El método a utilizar para la prueba de normalidad ('shapiro' o 'kolmogorov').
+            metodo (str): El método a utilizar para la prueba de normalidad ('shapiro', 'kolmogorov', 'dagostino', 'jarque_bera' o 'anderson').
+                Kolmogorov-Smirnov compara con una normal de la misma media y desviación que los datos.
             alpha (float): Nivel de significancia para la prueba.
             verbose (bool): Si se establece en True, imprime el resultado de la prueba. Si es False, Returns el resultado.
+            tamaño_muestra (int): Con 'shapiro', 'kolmogorov' y 'anderson', si hay más datos se usa una submuestra aleatoria
+                de este tamaño (Shapiro-Wilk no es fiable por encima de 5000).
+            semilla (int): Semilla de la submuestra, para que el resultado sea reproducible.
 
         Returns:
             bool: True si los datos siguen una distribución normal, False de lo contrario.
         """
-
-        if metodo == 'shapiro':
-            _, p_value = stats.shapiro(self.dataframe[self.columna_numerica])
-            resultado = p_value > alpha
-            mensaje = f"los datos siguen una distribución normal según el test de Shapiro-Wilk. p_value: {p_value}" if resultado else f"los datos no siguen una distribución normal según el test de Shapiro-Wilk. p_value: {p_value}"
-        
-        elif metodo == 'kolmogorov':
-            _, p_value = stats.kstest(self.dataframe[self.columna_numerica], 'norm')
-            resultado = p_value > alpha
-            mensaje = f"los datos siguen una distribución normal según el test de Kolmogorov-Smirnov. p_value: {p_value}" if resultado else f"los datos no siguen una distribución normal según el test de Kolmogorov-Smirnov. p_value: {p_value}"
-        else:
-            raise ValueError("Método no válido. Por favor, elige 'shapiro' o 'kolmogorov'.")
+        nombres = {'shapiro': 'Shapiro-Wilk', 'kolmogorov': 'Kolmogorov-Smirnov', 'dagostino': "D'Agostino-Pearson",
+                   'jarque_bera': 'Jarque-Bera', 'anderson': 'Anderson-Darling'}
+        if metodo not in METODOS_NORMALIDAD:
+            raise ValueError("Método no válido. Por favor, elige 'shapiro', 'kolmogorov', 'dagostino', 'jarque_bera' o 'anderson'.")
+
+        with etapa("test_normalidad", filas=numero_filas(self.dataframe), metodo=metodo):
+            resultado_test = normalidad_por_grupos(self.dataframe, [self.columna_numerica], metodo=metodo, alpha=alpha,
+                                                   tamaño_muestra=tamaño_muestra, semilla=semilla).iloc[0]
+        p_value = resultado_test["p_valor"]
+        resultado = bool(resultado_test["normal"])
+        mensaje = f"los datos siguen una distribución normal según el test de {nombres[metodo]}. p_value: {p_value}" if resultado else f"los datos no siguen una distribución normal según el test de {nombres[metodo]}. p_value: {p_value}"
 
         if verbose:
             print(f"Para la columna {self.columna_numerica}, {mensaje}")
         else:
             return resultado
 
+    def identificar_normalidad_multiple(self, columnas=None, columna_categorica=None, metodo='dagostino', alpha=0.05,
+                                        tamaño_muestra=5000, semilla=0):
+        """
+        Evalúa la normalidad de muchas columnas a la vez y, si se indica una columna categórica, dentro de cada grupo.
+        Con 'dagostino' y 'jarque_bera' se usan todos los datos a partir de sus momentos, calculados de forma vectorizada;
+        el resto de métodos usa una submuestra estratificada por grupo.
+
+        Params:
+            columnas (list): Columnas numéricas a evaluar. Si es None se usan todas las numéricas.
+            columna_categorica (str): Columna con los grupos. Si es None se evalúa cada columna entera.
+            metodo (str): 'shapiro', 'kolmogorov', 'dagostino', 'jarque_bera' o 'anderson'.
+            alpha (float): Nivel de significancia para la prueba.
+            tamaño_muestra (int): Filas por grupo en los métodos que usan submuestra.
+            semilla (int): Semilla de la submuestra.
+
+        Returns:
+            DataFrame con una fila por columna y grupo, con el estadístico, el p-valor y si los datos son normales.
+        """
+        if columnas is None:
+            columnas = columnas_por_tipo(self.dataframe)[0]
+        with etapa("test_normalidad", filas=numero_filas(self.dataframe), metodo=metodo):
+            return normalidad_por_grupos(self.dataframe, columnas, columna_categorica, metodo, alpha, tamaño_muestra, semilla)
+
         
-    def identificar_homogeneidad (self,  columna_categorica):
+    def identificar_homogeneidad (self,  columna_categorica, alpha=0.05, centro='median'):
         
         """
         Evalúa la homogeneidad de las varianzas entre grupos para una métrica específica en un DataFrame dado.
 
         Params:
-        - columna (str): El nombre de la columna que se utilizará para dividir los datos en grupos.
-        - columna_categorica (str): El nombre de la columna que se utilizará para evaluar la homogeneidad de las varianzas.
+        - columna_categorica (str): El nombre de la columna que se utilizará para dividir los datos en grupos.
+        - alpha (float): Nivel de significancia para la prueba. Por defecto es 0.05.
+        - centro (str): 'median' (Brown-Forsythe, como `stats.levene`) o 'mean' (Levene clásico). Por defecto es 'median'.
 
         Returns:
         No Returns nada directamente, pero imprime en la consola si las varianzas son homogéneas o no entre los grupos.
-        Se utiliza la prueba de Levene para evaluar la homogeneidad de las varianzas. Si el valor p resultante es mayor que 0.05,
+        Se utiliza la prueba de Levene para evaluar la homogeneidad de las varianzas. Si el valor p resultante es mayor que alpha,
         se concluye que las varianzas son homogéneas; de lo contrario, se concluye que las varianzas no son homogéneas.
         """
         
-        # lo primero que tenemos que hacer es crear tantos conjuntos de datos para cada una de las categorías que tenemos, Control Campaign y Test Campaign
-        valores_evaluar = []
-        
-        for valor in self.dataframe[columna_categorica].unique():
-            valores_evaluar.append(self.dataframe[self.dataframe[columna_categorica]== valor][self.columna_numerica])
-
-        statistic, p_value = stats.levene(*valores_evaluar)
-        if p_value > 0.05:
+        # separamos los datos en grupos una sola vez, factorizando la columna categórica
+        with etapa("separar_grupos", filas=numero_filas(self.dataframe)):
+            codigos, categorias = factorizar_columna(self.dataframe, columna_categorica)
+            valores = a_numpy(self.dataframe, [self.columna_numerica])
+            grupos = GruposContiguos.desde_codigos(codigos, categorias, valores)
+
+        with etapa("test_levene", filas=numero_filas(self.dataframe)):
+            statistic, p_value = levene_por_grupos(grupos.valores, grupos.offsets, centro)
+        if p_value[0] > alpha:
             print(f"En la variable {columna_categorica} las varianzas son homogéneas entre grupos.")
         else:
             print(f"En la variable {columna_categorica} las varianzas NO son homogéneas entre grupos.")
 
+    def matriz_asunciones(self, columnas_numericas=None, columnas_categoricas=None, alpha=0.05, metodo='dagostino',
+                          centro='median', n_procesos=None, detalle=False):
+        """
+        Evalúa la normalidad de cada grupo y la homogeneidad de varianzas para todos los pares (columna numérica,
+        columna categórica) y recomienda en cada caso la prueba a usar con `Pruebas_parametricas` o `Pruebas_no_parametricas`.
+
+        Params:
+            columnas_numericas (list): Columnas numéricas. Si es None se usan todas las numéricas.
+            columnas_categoricas (list): Columnas categóricas. Si es None se usan todas las de tipo object, category o bool.
+            alpha (float): Nivel de significancia de las pruebas.
+            metodo (str): Prueba de normalidad, 'dagostino' o 'jarque_bera'.
+            centro (str): 'median' (Brown-Forsythe) o 'mean' (Levene).
+            n_procesos (int): Número de procesos entre los que se reparten las columnas categóricas. Si es None se usan todos los núcleos.
+            detalle (bool): Si es True se devuelve la tabla con los p-valores de cada par en lugar de la matriz.
+
+        Returns:
+            DataFrame con una fila por columna numérica, una columna por columna categórica y la prueba recomendada
+            en cada celda; o, con `detalle=True`, una fila por par con los resultados de ambas pruebas.
+        """
+        if columnas_numericas is None:
+            columnas_numericas = columnas_por_tipo(self.dataframe)[0]
+        if columnas_categoricas is None:
+            if es_nativa(self.dataframe):
+                columnas_categoricas = columnas_por_tipo(self.dataframe)[1]
+            else:
+                columnas_categoricas = self.dataframe.select_dtypes(include = ["object", "category", "bool"]).columns.tolist()
+
+        with etapa("matriz_asunciones", filas=numero_filas(self.dataframe)):
+            resultados = matriz_asunciones(self.dataframe, columnas_numericas, columnas_categoricas, alpha=alpha,
+                                           metodo=metodo, centro=centro, n_procesos=n_procesos)
+        if detalle:
+            return resultados
+        return resultados.pivot(index="columna_numerica", columns="columna_categorica", values="test_recomendado") \
+                         .reindex(index=columnas_numericas, columns=columnas_categoricas)
+
+
 
 class Pruebas_parametricas:
     
@@ -146,6 +477,36 @@ class Pruebas_parametricas:
         self.categoria_control = categoria_control
         self.columna_respuesta = columna_respuesta
         self.dataframe = dataframe
+        self._grupos = None
+        self._clave_grupos = None
+
+    def obtener_grupos(self):
+        """
+        Devuelve los datos de respuesta separados por grupo. La separación (factorizando y ordenando la
+        columna de grupos) se guarda en la instancia y solo se rehace si cambian las columnas o los arrays
+        que las guardan (al reasignarlas o al filtrar, ordenar o borrar filas). Si los valores se modifican
+        en el sitio, por ejemplo con `loc`, hay que llamar antes a `invalidar_grupos()`.
+
+        Params: 
+            No recibe nigún parámetros
+
+        Returns:
+            Una instancia de GruposContiguos, donde cada grupo es una vista de numpy.
+        """
+        columnas = [self.columna_grupo, self.columna_respuesta]
+        clave = (columnas, referencias_columnas(self.dataframe, columnas))
+        if not misma_clave(self._clave_grupos, clave):
+            with etapa("separar_grupos", filas=numero_filas(self.dataframe)):
+                self._grupos = grupos_contiguos(self.dataframe, self.columna_grupo, self.columna_respuesta)
+            self._clave_grupos = clave
+        return self._grupos
+
+    def invalidar_grupos(self):
+        """
+        Descarta la separación en grupos guardada, para que se rehaga tras modificar los datos en el sitio.
+        """
+        self._grupos = None
+        self._clave_grupos = None
 
     def separar_grupos_z(self):
         """
@@ -155,12 +516,10 @@ class Pruebas_parametricas:
             No recibe nigún parámetros
             
         Returns:
-            Tupla de dos pandas.Series, uno para cada grupo.
+            Tupla de dos arrays de numpy (vistas sin copia), uno para cada grupo.
         """
-        data_control = self.dataframe[self.dataframe[self.columna_grupo] == self.categoria_control][self.columna_respuesta]
-        data_test = self.dataframe[self.dataframe[self.columna_grupo] == self.categoria_test][self.columna_respuesta]
-
-        return data_control, data_test
+        grupos = self.obtener_grupos()
+        return grupos[self.categoria_control], grupos[self.categoria_test]
     
     def separar_grupos(self):
         """
@@ -170,16 +529,9 @@ class Pruebas_parametricas:
             No recibe nigún parámetros
 
         Returns:
-            Una lista de nombres de las categorías.
+            Una lista de nombres de las categorías. Los datos de cada una se obtienen con `obtener_grupos()`.
         """
-        lista_categorias =[]
-    
-        for value in self.dataframe[self.columna_grupo].unique():
-            variable_data = self.dataframe[self.dataframe[self.columna_grupo] == value][self.columna_respuesta].values.tolist()
-            globals()[value] = variable_data  
-            lista_categorias.append(value)
-    
-        return lista_categorias
+        return list(self.obtener_grupos())
 
     def comprobar_pvalue(self, pvalor, alpha=0.05):
         """
@@ -210,19 +562,64 @@ class Pruebas_parametricas:
         Returns:
             No devuelve nada.
         """
-        control, test = self.separar_grupos_z()
-
-        # calculamos el número de usuarios que han convertido en cada uno de los tratamientos y creamos una lista (esto es asi porque el método de python para hacer el ztest nos pide una lista)
-        convertidos = [control.sum(), test.sum()]
-        # contamos el número de filas que tenemos para cada uno de los grupos, es decir, calculamos el tamaño muestral del grupo control y grupo test. Todo esto lo almacenamos en una lista igual que antes. 
-        tamaños_muestrales = [control.count(), test.count()]
-
-        resultados_test = proportions_ztest(convertidos, tamaños_muestrales)
+        # contamos los usuarios que han convertido y el tamaño muestral de cada grupo, y con esos cuatro números
+        # calculamos el test Z con la proporción combinada (el mismo resultado que proportions_ztest de statsmodels)
+        contador = self.contador_conversiones()
+        with etapa("test_z"):
+            resultados_test = contador.z_test()
         print(f"El estadístico de prueba (Z) es: {round(resultados_test[0], 2)}, el p-valor es {round(resultados_test[1], 2)}")
         
         # Interpretar los resultados
         self.comprobar_pvalue(resultados_test[1])
 
+    def contador_conversiones(self, tau=0.01):
+        """
+        Crea un contador de conversiones con los datos actuales, para seguir añadiendo lotes de eventos
+        y consultar el test Z (o su versión secuencial) sin volver a recorrer el DataFrame.
+
+        Params:
+            - tau (opcional): Tamaño de efecto esperado para el mSPRT. Por defecto es 0.01.
+
+        Returns:
+            Una instancia de ContadorConversiones.
+        """
+        control, test = self.separar_grupos_z()
+        with etapa("contar_conversiones", filas=len(control) + len(test)):
+            validos_control, validos_test = ~pd.isna(control), ~pd.isna(test)
+            contador = ContadorConversiones(self.categoria_control, self.categoria_test, tau)
+            return contador.actualizar_conteos(validos_control.sum(), control[validos_control].sum(),
+                                               validos_test.sum(), test[validos_test].sum())
+
+    def intervalo_bootstrap(self, estadistico="diferencia_medias", n_replicas=10_000, confianza=0.95,
+                            metodo_pesos="poisson", n_procesos=None, semilla=None):
+        """
+        Calcula un intervalo de confianza bootstrap para la diferencia entre la categoría de test y la de control.
+
+        Params:
+            - estadistico (opcional): 'diferencia_medias', 'diferencia_medianas' o 'diferencia_proporciones'. Por defecto es 'diferencia_medias'.
+            - n_replicas (opcional): Número de réplicas bootstrap. Por defecto es 10000.
+            - confianza (opcional): Nivel de confianza del intervalo. Por defecto es 0.95.
+            - metodo_pesos (opcional): 'poisson' o 'multinomial'. Por defecto es 'poisson'.
+            - n_procesos (opcional): Número de procesos. Si es None se usan todos los núcleos.
+            - semilla (opcional): Semilla para que el resultado sea reproducible.
+
+        Returns:
+            Un diccionario con la estimación, los límites inferior y superior, el error estándar y el número de réplicas.
+        """
+        control, test = self.separar_grupos_z()
+        with etapa("intervalo_bootstrap", filas=len(control) + len(test), n_replicas=n_replicas):
+            resultado = soporte_remuestreo.intervalo_bootstrap(control, test,
+                                                               estadistico=estadistico,
+                                                               n_replicas=n_replicas,
+                                                               confianza=confianza,
+                                                               metodo_pesos=metodo_pesos,
+                                                               n_procesos=n_procesos,
+                                                               semilla=semilla)
+
+        print(f"La {estadistico.replace('_', ' ')} (test - control) es {round(resultado['estimacion'], 4)}, "
+              f"con un intervalo de confianza del {round(confianza * 100)}% de [{round(resultado['inferior'], 4)}, {round(resultado['superior'], 4)}]")
+        return resultado
+
     def test_anova(self):
         """
         Realiza el test ANOVA para comparar las medias de múltiples grupos.
@@ -235,8 +632,9 @@ class Pruebas_parametricas:
         Returns:
             No devuelve nada.
         """
-        categorias = self.separar_grupos()
-        statistic, p_value = stats.f_oneway(*[globals()[var] for var in categorias])
+        grupos = self.obtener_grupos()
+        with etapa("test_anova", filas=len(grupos.valores)):
+            statistic, p_value = stats.f_oneway(*grupos.seleccionar(list(grupos)))
 
         print("Estadístico F:", statistic)
         print("Valor p:", p_value)
@@ -255,15 +653,138 @@ class Pruebas_parametricas:
         Returns:
             No devuelve nada.
         """
-        categorias = self.separar_grupos()
+        grupos = self.obtener_grupos()
+        categorias = list(grupos)
 
-        t_stat, p_value = stats.ttest_ind(*[globals()[var] for var in categorias])
+        with etapa("test_t", filas=len(grupos.valores)):
+            t_stat, p_value = stats.ttest_ind(*grupos.seleccionar(categorias))
 
         print("Estadístico t:", t_stat)
         print("Valor p:", p_value)
 
         self.comprobar_pvalue(p_value)
 
+    def resumenes_grupos(self):
+        """
+        Calcula los estadísticos suficientes (n, media y M2) de cada grupo. Con los resúmenes de varias particiones
+        (combinados con `combinar_resumenes`) se pueden hacer el test t, el de Welch y el ANOVA sin mover los datos.
+
+        Params: 
+            No recibe nigún parámetros
+
+        Returns:
+            Un diccionario {categoria: AcumuladorMomentos}.
+        """
+        grupos = self.obtener_grupos()
+        with etapa("resumenes_grupos", filas=len(grupos.valores)):
+            return {categoria: AcumuladorMomentos([self.columna_respuesta]).actualizar(grupos[categoria][:, None]) for categoria in grupos}
+
+    def test_t_resumenes(self, resumenes=None, varianzas_iguales=True):
+        """
+        Realiza el test t para dos grupos independientes a partir de sus estadísticos suficientes.
+
+        Calcula el estadístico t y el valor p de la prueba y lo imprime en la consola.
+
+        Params:
+            - resumenes (opcional): Diccionario {categoria: AcumuladorMomentos}, por ejemplo combinado de varias
+              particiones. Si es None se calcula con `resumenes_grupos()`.
+            - varianzas_iguales (opcional): True para el test t de Student, False para el de Welch. Por defecto es True.
+
+        Returns:
+            No devuelve nada.
+        """
+        if resumenes is None:
+            resumenes = self.resumenes_grupos()
+        if self.categoria_control is not None and self.categoria_test is not None:
+            categorias = [self.categoria_control, self.categoria_test]
+        else:
+            categorias = list(resumenes)
+        if len(categorias) != 2:
+            raise ValueError(f"El test t compara dos grupos y hay {len(categorias)}.")
+
+        with etapa("test_t_resumenes"):
+            t_stat, p_value = test_t_resumenes(resumenes[categorias[0]], resumenes[categorias[1]], varianzas_iguales)
+
+        print("Estadístico t:", t_stat[0])
+        print("Valor p:", p_value[0])
+
+        self.comprobar_pvalue(p_value[0])
+
+    def test_anova_resumenes(self, resumenes=None):
+        """
+        Realiza el test ANOVA a partir de los estadísticos suficientes de cada grupo.
+
+        Calcula el estadístico F y el valor p de la prueba y lo imprime en la consola.
+
+        Params:
+            - resumenes (opcional): Diccionario {categoria: AcumuladorMomentos}, por ejemplo combinado de varias
+              particiones. Si es None se calcula con `resumenes_grupos()`.
+
+        Returns:
+            No devuelve nada.
+        """
+        if resumenes is None:
+            resumenes = self.resumenes_grupos()
+
+        with etapa("test_anova_resumenes"):
+            statistic, p_value = test_anova_resumenes(list(resumenes.values()))
+
+        print("Estadístico F:", statistic[0])
+        print("Valor p:", p_value[0])
+
+        self.comprobar_pvalue(p_value[0])
+
+    def post_hoc(self, metodo="tukey", correccion="holm", alpha=0.05):
+        """
+        Compara todas las parejas de grupos después de un ANOVA significativo. Todas las parejas salen de una sola
+        pasada por los datos: se calculan (n, media, M2) de cada grupo y las comparaciones se hacen con ellos.
+        Los NaN se descartan.
+
+        Params:
+            - metodo (opcional): 'tukey' (HSD de Tukey) o 'welch' (t de Welch por parejas). Por defecto es 'tukey'.
+            - correccion (opcional): Corrección por comparaciones múltiples de 'welch': 'holm', 'bh', 'bonferroni'
+              o None. Tukey ya controla el error de todas las parejas y no la usa. Por defecto es 'holm'.
+            - alpha (opcional): Nivel de significancia. Por defecto es 0.05.
+
+        Returns:
+            DataFrame con una fila por pareja: grupo_1, grupo_2, prueba, diferencia, estadistico, p_valor,
+            p_ajustado y significativo (Tukey añade el intervalo de confianza de la diferencia).
+        """
+        if metodo not in ("tukey", "welch"):
+            raise ValueError("Método no válido. Por favor, elige 'tukey' o 'welch'.")
+
+        grupos = self.obtener_grupos()
+        with etapa("post_hoc", filas=len(grupos.valores), metodo=metodo):
+            n, medias, m2, _, _ = momentos_centrales(grupos.valores[:, None], grupos.offsets)
+            n, medias, m2 = n[:, 0], medias[:, 0], m2[:, 0] * n[:, 0]
+            if metodo == "tukey":
+                return test_tukey(grupos.categorias, n, medias, m2, alpha)
+            return test_welch_parejas(grupos.categorias, n, medias, m2, correccion, alpha)
+
+    def pruebas_por_segmento(self, columnas_segmento, test="t", correccion="bh", alpha=0.05):
+        """
+        Repite el test dentro de cada segmento (cada combinación de valores de las columnas de segmento), para todos
+        los segmentos a la vez: los datos se ordenan una sola vez por (segmento, grupo) y el test se calcula sobre
+        bloques contiguos, sin crear un DataFrame ni una instancia por segmento.
+
+        Params:
+            - columnas_segmento: Nombre o lista de nombres de las columnas que definen los segmentos.
+            - test (opcional): 'z', 't', 'welch' o 'anova'. Por defecto es 't'.
+            - correccion (opcional): Corrección por comparaciones múltiples: 'bh', 'holm', 'bonferroni' o None.
+              Por defecto es 'bh' (Benjamini-Hochberg).
+            - alpha (opcional): Nivel de significancia. Por defecto es 0.05.
+
+        Returns:
+            DataFrame con una fila por segmento y las columnas de `soporte_segmentos.pruebas_por_segmento`.
+        """
+        if test not in ("z", "t", "welch", "anova"):
+            raise ValueError("Test no válido. Por favor, elige 'z', 't', 'welch' o 'anova'.")
+        categorias = None
+        if test != "anova" and self.categoria_control is not None and self.categoria_test is not None:
+            categorias = [self.categoria_control, self.categoria_test]
+        return pruebas_por_segmento(self.dataframe, columnas_segmento, self.columna_grupo, self.columna_respuesta,
+                                    test, categorias, correccion, alpha)
+
     def test_t_dependiente(self):
         """
         Realiza el test t de Student para comparar las medias de dos grupos dependientes.
@@ -276,9 +797,11 @@ class Pruebas_parametricas:
         Returns:
             No devuelve nada.
         """
-        categorias = self.separar_grupos()
+        grupos = self.obtener_grupos()
+        categorias = list(grupos)
 
-        t_stat, p_value = stats.ttest_rel(*[globals()[var] for var in categorias])
+        with etapa("test_t_dependiente", filas=len(grupos.valores)):
+            t_stat, p_value = stats.ttest_rel(*grupos.seleccionar(categorias))
 
         print("Estadístico t:", t_stat)
         print("Valor p:", p_value)
@@ -301,23 +824,77 @@ class Pruebas_no_parametricas:
         self.dataframe = dataframe
         self.variable_respuesta = variable_respuesta
         self.columna_categorica = columna_categorica
+        self._grupos = None
+        self._clave_grupos = None
+        self._huella = None
+
+    def obtener_grupos(self):
+        """
+        Devuelve los datos de la variable respuesta separados por categoría. La separación se guarda en la
+        instancia y solo se rehace si cambian las columnas o los arrays que las guardan (al reasignarlas o al
+        filtrar, ordenar o borrar filas). Si los valores se modifican en el sitio, por ejemplo con `loc`, hay
+        que llamar antes a `invalidar_grupos()`.
+
+        Retorna:
+        Una instancia de GruposContiguos, donde cada grupo es una vista de numpy.
+        """
+        columnas = [self.columna_categorica, self.variable_respuesta]
+        clave = (columnas, referencias_columnas(self.dataframe, columnas))
+        if not misma_clave(self._clave_grupos, clave):
+            with etapa("separar_grupos", filas=numero_filas(self.dataframe)):
+                self._grupos = grupos_contiguos(self.dataframe, self.columna_categorica, self.variable_respuesta)
+            self._clave_grupos = clave
+        return self._grupos
+
+    def invalidar_grupos(self):
+        """
+        Descarta la separación en grupos guardada, para que se rehaga tras modificar los datos en el sitio.
+        """
+        self._grupos = None
+        self._clave_grupos = None
+
+    def obtener_rangos(self, grupos=None):
+        """
+        Devuelve el orden global de la variable respuesta, del que salen los rangos de Kruskal-Wallis y Mann-Whitney.
+        Se guarda en una caché LRU compartida (`cache_rangos`) con la huella de los datos y la columna como clave,
+        así que solo se ordena una vez aunque se hagan varios tests o se creen varias instancias con los mismos datos.
+
+        Parámetros:
+        - grupos (opcional): la separación en grupos, si ya se ha obtenido con `obtener_grupos()`.
+
+        Retorna:
+        Una instancia de RangosAgrupados.
+        """
+        grupos = self.obtener_grupos() if grupos is None else grupos
+        clave = (*self._huella_grupos(grupos), self.variable_respuesta)
+        return cache_rangos.obtener(clave, lambda: self._calcular_rangos(grupos))
+
+    def _huella_grupos(self, grupos):
+        """
+        Huella del contenido de los grupos (valores y límites), para las claves de `cache_rangos`. Se calcula una
+        vez por separación de grupos, en O(n) y sin ordenar.
+        """
+        if self._huella is None or self._huella[0] is not grupos:
+            self._huella = (grupos, huella_array(grupos.valores), huella_array(grupos.offsets))
+        return self._huella[1], self._huella[2]
+
+    def _calcular_rangos(self, grupos):
+        with etapa("calcular_rangos", filas=len(grupos.valores)):
+            return RangosAgrupados(grupos)
+
+    def _calcular_rangos_signados(self, grupos, categorias):
+        muestras = grupos.seleccionar(categorias)
+        with etapa("calcular_rangos", filas=len(muestras[0])):
+            return RangosSignados(*muestras)
 
     def generar_grupos(self):
         """
         Genera grupos de datos basados en la columna categórica.
 
         Retorna:
-        Una lista de nombres de las categorías.
+        Una lista de nombres de las categorías. Los datos de cada una se obtienen con `obtener_grupos()`.
         """
-        lista_categorias =[]
-    
-        for value in self.dataframe[self.columna_categorica].unique():
-            variable_name = value  # Asigna el nombre de la variable
-            variable_data = self.dataframe[self.dataframe[self.columna_categorica] == value][self.variable_respuesta].values.tolist()
-            globals()[variable_name] = variable_data  
-            lista_categorias.append(variable_name)
-    
-        return lista_categorias
+        return list(self.obtener_grupos())
 
     def comprobar_pvalue(self, pvalor):
         """
@@ -338,7 +915,21 @@ class Pruebas_no_parametricas:
         Parámetros:
         - categorias: Lista de nombres de las categorías a comparar.
         """
-        statistic, p_value = stats.mannwhitneyu(*[globals()[var] for var in categorias])
+        grupos = self.obtener_grupos()
+        rangos = self.obtener_rangos(grupos)
+        indices = [grupos.indice(categoria) for categoria in categorias]
+        sumas, tamaños, empates = rangos.sumas_rangos(indices)
+
+        # con muestras pequeñas sin empates se usa la distribución exacta (como scipy), con las tablas de conteos
+        # guardadas en caché; con nulos, grupos vacíos o tablas demasiado grandes se deja a scipy, que propaga NaN
+        with etapa("test_mannwhitneyu", filas=int(sum(tamaños))):
+            exacto, en_tablas = metodo_mannwhitney(tamaños[0], tamaños[1], empates)
+            if rangos.grupos_con_nulos.intersection(indices) or min(tamaños) == 0 or (exacto and not en_tablas):
+                statistic, p_value = stats.mannwhitneyu(*grupos.seleccionar(categorias))
+            elif exacto:
+                statistic, p_value = mannwhitney_exacto(sumas[0] - tamaños[0] * (tamaños[0] + 1) / 2, tamaños[0], tamaños[1])
+            else:
+                statistic, p_value = estadistico_mannwhitney(sumas[0], tamaños[0], tamaños[1], empates)
 
         print("Estadístico del Test de Mann-Whitney U:", statistic)
         print("Valor p:", p_value)
@@ -352,7 +943,19 @@ class Pruebas_no_parametricas:
         Parámetros:
         - categorias: Lista de nombres de las categorías a comparar.
         """
-        statistic, p_value = stats.wilcoxon(*[globals()[var] for var in categorias])
+        grupos = self.obtener_grupos()
+        clave = (*self._huella_grupos(grupos), self.variable_respuesta, "wilcoxon", tuple(categorias))
+        rangos = cache_rangos.obtener(clave, lambda: self._calcular_rangos_signados(grupos, categorias))
+
+        # hasta 50 parejas sin ceros ni empates la distribución es exacta y sale de las tablas en caché; con ceros
+        # o empates scipy hace un test de permutaciones (o la aproximación normal), y con nulos propaga NaN
+        with etapa("test_wilcoxon", filas=rangos.n_total):
+            if rangos.n_total <= 50 and not rangos.con_nulos and rangos.n == rangos.n_total > 0 and rangos.empates == 0:
+                statistic, p_value = wilcoxon_exacto(rangos.suma_positivos, rangos.suma_negativos, rangos.n)
+            elif rangos.n_total <= 50 or rangos.con_nulos:
+                statistic, p_value = stats.wilcoxon(*grupos.seleccionar(categorias))
+            else:
+                statistic, p_value = rangos.aproximacion_normal()
 
         print("Estadístico del Test de Wilcoxon:", statistic)
         print("Valor p:", p_value)
@@ -370,9 +973,204 @@ class Pruebas_no_parametricas:
        Parámetros:
        - categorias: Lista de nombres de las categorías a comparar.
        """
-       statistic, p_value = stats.kruskal(*[globals()[var] for var in categorias])
+       grupos = self.obtener_grupos()
+       rangos = self.obtener_rangos(grupos)
+       indices = [grupos.indice(categoria) for categoria in categorias]
+
+       with etapa("test_kruskal", filas=len(grupos.valores)):
+           if rangos.grupos_con_nulos.intersection(indices):
+               statistic, p_value = stats.kruskal(*grupos.seleccionar(categorias))
+           else:
+               statistic, p_value = estadistico_kruskal(*rangos.sumas_rangos(indices))
 
        print("Estadístico de prueba:", statistic)
        print("Valor p:", p_value)
 
-       self.comprobar_pvalue(p_value)
\ No newline at end of file
+       self.comprobar_pvalue(p_value)
+
+
+    def post_hoc(self, metodo="dunn", correccion="holm", alpha=0.05):
+       """
+       Compara todas las parejas de grupos después de un test de Kruskal-Wallis significativo. Usa el orden global
+       de los datos que ya calculó `test_kruskal` (guardado en la caché de rangos) y obtiene todas las parejas en una
+       sola pasada, sin volver a separar ni a ordenar los datos de cada pareja. Los NaN se descartan.
+
+       Parámetros:
+       - metodo (opcional): 'dunn' (test de Dunn, con los rangos de todos los grupos) o 'mannwhitneyu' (Mann-Whitney U
+         por parejas, con el p-valor asintótico). Por defecto es 'dunn'.
+       - correccion (opcional): Corrección por comparaciones múltiples: 'holm', 'bh', 'bonferroni' o None. Por defecto es 'holm'.
+       - alpha (opcional): Nivel de significancia. Por defecto es 0.05.
+
+       Retorna:
+       DataFrame con una fila por pareja: grupo_1, grupo_2, prueba, diferencia, estadistico, p_valor, p_ajustado y significativo.
+       """
+       if metodo not in ("dunn", "mannwhitneyu"):
+           raise ValueError("Método no válido. Por favor, elige 'dunn' o 'mannwhitneyu'.")
+
+       grupos = self.obtener_grupos()
+       rangos = self.obtener_rangos(grupos)
+       with etapa("post_hoc", filas=len(grupos.valores), metodo=metodo):
+           comparaciones = comparaciones_rangos(rangos.valores_ordenados, rangos.codigos_ordenados, rangos.n_grupos)
+           if metodo == "dunn":
+               return test_dunn(grupos.categorias, comparaciones, correccion, alpha)
+           return test_mannwhitney_parejas(grupos.categorias, comparaciones, correccion, alpha)
+
+    def pruebas_por_segmento(self, columnas_segmento, categorias=None, test="mannwhitneyu", correccion="bh", alpha=0.05):
+        """
+        Repite el test dentro de cada segmento (cada combinación de valores de las columnas de segmento), para todos
+        los segmentos a la vez: los datos se ordenan una sola vez por (segmento, valor) y los rangos de cada segmento
+        salen de esa ordenación, sin crear un DataFrame ni una instancia por segmento.
+
+        Parámetros:
+        - columnas_segmento: Nombre o lista de nombres de las columnas que definen los segmentos.
+        - categorias (opcional): Lista de nombres de las categorías a comparar. Si es None se usan todas.
+        - test (opcional): 'mannwhitneyu' o 'kruskal'. Por defecto es 'mannwhitneyu'.
+        - correccion (opcional): Corrección por comparaciones múltiples: 'bh', 'holm', 'bonferroni' o None. Por defecto es 'bh'.
+        - alpha (opcional): Nivel de significancia. Por defecto es 0.05.
+
+        Retorna:
+        DataFrame con una fila por segmento y las columnas de `soporte_segmentos.pruebas_por_segmento`.
+        """
+        if test not in ("mannwhitneyu", "kruskal"):
+            raise ValueError("Test no válido. Por favor, elige 'mannwhitneyu' o 'kruskal'.")
+        return pruebas_por_segmento(self.dataframe, columnas_segmento, self.columna_categorica, self.variable_respuesta,
+                                    test, categorias, correccion, alpha)
+
+    def test_permutacion(self, categorias, estadistico="diferencia_medias", n_permutaciones=10_000, alpha=0.05,
+                         parada_temprana=True, n_procesos=None, semilla=None):
+        """
+        Realiza un test de permutación, útil cuando los datos son muy asimétricos y no queremos depender de la aproximación asintótica.
+
+        Parámetros:
+        - categorias: Lista de nombres de las categorías a comparar.
+        - estadistico (opcional): 'diferencia_medias', 'diferencia_medianas', 'rango_suma' o 'kruskal'. Por defecto es 'diferencia_medias'.
+        - n_permutaciones (opcional): Número máximo de permutaciones. Por defecto es 10000.
+        - alpha (opcional): Nivel de significancia para la parada temprana. Por defecto es 0.05.
+        - parada_temprana (opcional): Si es True, se para en cuanto el p-valor queda claramente por encima o por debajo de alpha.
+        - n_procesos (opcional): Número de procesos. Si es None se usan todos los núcleos.
+        - semilla (opcional): Semilla para que el resultado sea reproducible.
+
+        Retorna:
+        Un diccionario con el estadístico, el p-valor y el número de permutaciones realizadas.
+        """
+        muestras = self.obtener_grupos().seleccionar(categorias)
+        with etapa("test_permutacion", filas=sum(len(muestra) for muestra in muestras), n_permutaciones=n_permutaciones):
+            resultado = soporte_remuestreo.test_permutacion(muestras,
+                                                            estadistico=estadistico,
+                                                            n_permutaciones=n_permutaciones,
+                                                            alpha=alpha,
+                                                            parada_temprana=parada_temprana,
+                                                            n_procesos=n_procesos,
+                                                            semilla=semilla)
+
+        print("Estadístico del Test de permutación:", resultado["estadistico"])
+        print("Valor p:", resultado["p_valor"], f"({resultado['n_permutaciones']} permutaciones)")
+
+        self.comprobar_pvalue(resultado["p_valor"])
+        return resultado
+
+    def intervalo_bootstrap(self, categorias, estadistico="diferencia_medias", n_replicas=10_000, confianza=0.95,
+                            metodo_pesos="poisson", n_procesos=None, semilla=None):
+        """
+        Calcula un intervalo de confianza bootstrap para la diferencia entre dos categorías (la segunda menos la primera).
+
+        Parámetros:
+        - categorias: Lista con los nombres de las dos categorías a comparar.
+        - estadistico (opcional): 'diferencia_medias', 'diferencia_medianas' o 'diferencia_proporciones'. Por defecto es 'diferencia_medias'.
+        - n_replicas (opcional): Número de réplicas bootstrap. Por defecto es 10000.
+        - confianza (opcional): Nivel de confianza del intervalo. Por defecto es 0.95.
+        - metodo_pesos (opcional): 'poisson' o 'multinomial'. Por defecto es 'poisson'.
+        - n_procesos (opcional): Número de procesos. Si es None se usan todos los núcleos.
+        - semilla (opcional): Semilla para que el resultado sea reproducible.
+
+        Retorna:
+        Un diccionario con la estimación, los límites inferior y superior, el error estándar y el número de réplicas.
+        """
+        if len(categorias) != 2:
+            raise ValueError("El intervalo bootstrap compara exactamente dos categorías.")
+        primera, segunda = self.obtener_grupos().seleccionar(categorias)
+        with etapa("intervalo_bootstrap", filas=len(primera) + len(segunda), n_replicas=n_replicas):
+            resultado = soporte_remuestreo.intervalo_bootstrap(primera, segunda,
+                                                               estadistico=estadistico,
+                                                               n_replicas=n_replicas,
+                                                               confianza=confianza,
+                                                               metodo_pesos=metodo_pesos,
+                                                               n_procesos=n_procesos,
+                                                               semilla=semilla)
+
+        print(f"La {estadistico.replace('_', ' ')} entre {categorias[1]} y {categorias[0]} es {round(resultado['estimacion'], 4)}, "
+              f"con un intervalo de confianza del {round(confianza * 100)}% de [{round(resultado['inferior'], 4)}, {round(resultado['superior'], 4)}]")
+        return resultado
+
+
+def pruebas_multiples_metricas(dataframe, columnas_respuesta, columna_grupo, test="kruskal", categorias=None):
+    """
+    Aplica el mismo test a muchas columnas de respuesta a la vez. La columna de grupos se factoriza una única vez
+    y los rangos o los momentos de cada grupo se calculan para todas las métricas con operaciones vectorizadas
+    de numpy, sin un bucle de Python por métrica.
+
+    Params:
+        - dataframe: DataFrame que contiene los datos.
+        - columnas_respuesta: Lista de nombres de las columnas numéricas a evaluar.
+        - columna_grupo: Nombre de la columna que contiene las categorías.
+        - test (opcional): 'kruskal', 'manwhitneyu', 'anova' o 't' (t de Student con varianzas iguales). Por defecto es 'kruskal'.
+        - categorias (opcional): Lista de categorías a comparar. Si es None se usan todas.
+
+    Returns:
+        DataFrame con una fila por métrica y las columnas metrica, test, estadistico, p_valor y n.
+        Las métricas que tienen nulos devuelven NaN, igual que scipy.
+    """
+    if test not in ("kruskal", "manwhitneyu", "anova", "t"):
+        raise ValueError("Test no válido. Por favor, elige 'kruskal', 'manwhitneyu', 'anova' o 't'.")
+
+    columnas_respuesta = list(columnas_respuesta)
+    with etapa("separar_grupos", filas=numero_filas(dataframe)):
+        codigos, nombres = factorizar_columna(dataframe, columna_grupo)
+        valores = a_numpy(dataframe, columnas_respuesta)
+        grupos = GruposContiguos.desde_codigos(codigos, nombres, valores)
+        if categorias is not None:
+            grupos = grupos.subconjunto(categorias)
+
+    if test in ("manwhitneyu", "t") and len(grupos) != 2:
+        raise ValueError(f"El test {test} solo compara dos grupos y hay {len(grupos)}.")
+
+    X, offsets = grupos.valores, grupos.offsets
+    tamaños = grupos.tamaños.astype(np.float64)
+    n_total = X.shape[0]
+    k = len(grupos)
+
+    with etapa(f"test_{test}", filas=n_total, metricas=len(columnas_respuesta)), np.errstate(invalid="ignore", divide="ignore"):
+        if test in ("kruskal", "manwhitneyu"):
+            rangos, empates = rangos_columnas(X)
+            sumas_rangos = sumas_por_grupo(rangos, offsets)
+
+            if test == "kruskal":
+                estadistico, p_valor = estadistico_kruskal(sumas_rangos, tamaños, empates)
+            else:
+                estadistico, p_valor = estadistico_mannwhitney(sumas_rangos[0], tamaños[0], tamaños[1], empates)
+
+        else:
+            _, medias, m2 = momentos_por_grupo(X, offsets)
+            media_global = (medias * tamaños[:, None]).sum(axis=0) / n_total
+            ss_dentro = m2.sum(axis=0)
+
+            if test == "anova":
+                ss_entre = (tamaños[:, None] * (medias - media_global)**2).sum(axis=0)
+                estadistico = (ss_entre / (k - 1)) / (ss_dentro / (n_total - k))
+                p_valor = stats.f.sf(estadistico, k - 1, n_total - k)
+            else:
+                n1, n2 = tamaños
+                varianza_comun = ss_dentro / (n_total - 2)
+                estadistico = (medias[0] - medias[1]) / np.sqrt(varianza_comun * (1 / n1 + 1 / n2))
+                p_valor = 2 * stats.t.sf(np.abs(estadistico), n_total - 2)
+
+    # scipy propaga los nulos: si una métrica tiene algún NaN, su resultado es NaN
+    con_nulos = np.isnan(X).any(axis=0)
+    estadistico = np.where(con_nulos, np.nan, estadistico)
+    p_valor = np.where(con_nulos, np.nan, p_valor)
+
+    return pd.DataFrame({"metrica": columnas_respuesta,
+                         "test": test,
+                         "estadistico": estadistico,
+                         "p_valor": p_valor,
+                         "n": n_total})
@@ -0,0 +1,330 @@
+# Para importar las librerías pesadas solo cuando se usan
+# -----------------------------------------------------------------------
+from .soporte_perezoso import importar_perezoso
+
+# Tratamiento de datos
+# -----------------------------------------------------------------------
+import numpy as np
+pd = importar_perezoso("pandas")
+
+# Para pruebas estadísticas
+# -----------------------------------------------------------------------
+stats = importar_perezoso("scipy.stats")
+
+# Otras librerias
+# -----------------------------------------------------------------------
+import warnings
+
+
+class AcumuladorMomentos:
+    """
+    Acumula, para varias columnas numéricas a la vez, el número de valores no nulos, la media, la suma de
+    cuadrados centrada (M2), el mínimo y el máximo. Dos acumuladores se pueden combinar sin volver a leer
+    los datos, por lo que sirven para procesar un fichero por trozos o por particiones.
+
+    Attributes:
+        - columnas: lista con los nombres de las columnas.
+        - n, media, m2, minimo, maximo: arrays de numpy con un valor por columna.
+    """
+
+    def __init__(self, columnas):
+        self.columnas = list(columnas)
+        m = len(self.columnas)
+        self.n = np.zeros(m)
+        self.media = np.zeros(m)
+        self.m2 = np.zeros(m)
+        self.minimo = np.full(m, np.inf)
+        self.maximo = np.full(m, -np.inf)
+
+    @classmethod
+    def desde_resumen(cls, columnas, n, media, m2, minimo, maximo):
+        """
+        Crea un acumulador a partir de los resúmenes ya calculados de un trozo de datos.
+
+        Params:
+            - columnas: lista con los nombres de las columnas.
+            - n, media, m2, minimo, maximo: arrays con un valor por columna.
+
+        Returns:
+            Una instancia de AcumuladorMomentos.
+        """
+        acumulador = cls(columnas)
+        acumulador.n = np.asarray(n, dtype=np.float64)
+        vacios = acumulador.n == 0
+        acumulador.media = np.where(vacios, 0.0, media)
+        acumulador.m2 = np.where(vacios, 0.0, m2)
+        acumulador.minimo = np.where(vacios, np.inf, minimo)
+        acumulador.maximo = np.where(vacios, -np.inf, maximo)
+        return acumulador
+
+    def actualizar(self, valores):
+        """
+        Añade un bloque de datos al acumulador.
+
+        Params:
+            - valores: array de numpy de forma (filas, columnas); los NaN se ignoran.
+
+        Returns:
+            El propio acumulador.
+        """
+        valores = np.asarray(valores, dtype=np.float64)
+        n = (~np.isnan(valores)).sum(axis=0)
+        # las columnas sin ningún valor válido dan avisos de "Mean of empty slice", que aquí no aportan nada
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            media = np.nanmean(valores, axis=0)
+            m2 = np.nansum((valores - media)**2, axis=0)
+            minimo = np.nanmin(valores, axis=0) if len(valores) else np.full(len(self.columnas), np.inf)
+            maximo = np.nanmax(valores, axis=0) if len(valores) else np.full(len(self.columnas), -np.inf)
+        return self.combinar(AcumuladorMomentos.desde_resumen(self.columnas, n, media, m2, minimo, maximo))
+
+    def combinar(self, otro):
+        """
+        Combina otro acumulador con este usando la fórmula en paralelo de Chan para la varianza,
+        que es numéricamente estable.
+
+        Params:
+            - otro: Otra instancia de AcumuladorMomentos con las mismas columnas.
+
+        Returns:
+            El propio acumulador, ya actualizado.
+        """
+        n = self.n + otro.n
+        with np.errstate(invalid="ignore", divide="ignore"):
+            delta = otro.media - self.media
+            peso = np.where(n > 0, otro.n / n, 0.0)
+            self.media = self.media + delta * peso
+            self.m2 = self.m2 + otro.m2 + delta**2 * self.n * peso
+        self.n = n
+        self.minimo = np.minimum(self.minimo, otro.minimo)
+        self.maximo = np.maximum(self.maximo, otro.maximo)
+        return self
+
+    def varianza(self, ddof=1):
+        """
+        Devuelve la varianza de cada columna (NaN si no hay datos suficientes).
+        """
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(self.n > ddof, self.m2 / (self.n - ddof), np.nan)
+
+    def resumen(self):
+        """
+        Devuelve los estadísticos en el mismo formato que `describe().T` para las columnas numéricas.
+
+        Returns:
+            DataFrame con una fila por columna y las columnas count, mean, std, min y max.
+        """
+        hay_datos = self.n > 0
+        return pd.DataFrame({"count": self.n,
+                             "mean": np.where(hay_datos, self.media, np.nan),
+                             "std": np.sqrt(self.varianza()),
+                             "min": np.where(hay_datos, self.minimo, np.nan),
+                             "max": np.where(hay_datos, self.maximo, np.nan)},
+                            index=self.columnas)
+
+
+class AcumuladorFrecuencias:
+    """
+    Acumula el conteo de valores de una columna categórica. Si el número de categorías distintas supera
+    `capacidad`, se resta a todos los conteos el de la categoría que queda en la posición `capacidad + 1`
+    y se descartan los que llegan a cero (algoritmo de Misra-Gries, combinable entre trozos). Lo restado se
+    acumula en `error`, de forma que la memoria queda acotada y el conteo real de cualquier categoría está
+    entre su conteo guardado (0 si se descartó) y ese conteo más `error`, que no pasa de total / (capacidad + 1).
+
+    Attributes:
+        - conteos: pandas.Series con el conteo de cada categoría (una cota inferior si no es exacto).
+        - capacidad: número máximo de categorías que se guardan.
+        - error: cota superior de lo que le puede faltar al conteo de cualquier categoría.
+        - total: número exacto de valores no nulos contados.
+    """
+
+    def __init__(self, capacidad=10_000):
+        self.conteos = pd.Series(dtype=np.int64)
+        self.capacidad = capacidad
+        self.error = 0
+        self.total = 0
+
+    def actualizar(self, conteos):
+        """
+        Añade los conteos de un trozo de datos.
+
+        Params:
+            - conteos: pandas.Series con el conteo de cada categoría (por ejemplo, salida de `value_counts()`).
+
+        Returns:
+            El propio acumulador.
+        """
+        self.total += int(conteos.sum())
+        return self._sumar(conteos)
+
+    def _sumar(self, conteos):
+        self.conteos = self.conteos.add(conteos, fill_value=0).astype(np.int64)
+        if len(self.conteos) > self.capacidad:
+            ordenados = self.conteos.sort_values(ascending=False)
+            corte = int(ordenados.iloc[self.capacidad])
+            ordenados = ordenados.iloc[:self.capacidad] - corte
+            self.conteos = ordenados[ordenados > 0]
+            self.error += corte
+        return self
+
+    def combinar(self, otro):
+        """
+        Combina otro acumulador de frecuencias con este.
+
+        Params:
+            - otro: Otra instancia de AcumuladorFrecuencias.
+
+        Returns:
+            El propio acumulador, ya actualizado.
+        """
+        self.error += otro.error
+        self.total += otro.total
+        return self._sumar(otro.conteos)
+
+    @property
+    def exacto(self):
+        """
+        True si no se ha descartado ninguna categoría y los conteos son exactos.
+        """
+        return self.error == 0
+
+    def top(self, k=5):
+        """
+        Devuelve las k categorías más frecuentes.
+        """
+        return self.conteos.sort_values(ascending=False).head(k).rename("count")
+
+    def resumen(self):
+        """
+        Devuelve los estadísticos en el mismo formato que `describe(include="O")`.
+
+        Returns:
+            Diccionario con count, unique, top y freq.
+        """
+        if self.conteos.empty:
+            return {"count": self.total, "unique": 0, "top": np.nan, "freq": np.nan}
+        top = self.conteos.idxmax()
+        return {"count": self.total,
+                "unique": len(self.conteos),
+                "top": top,
+                "freq": int(self.conteos[top])}
+
+
+def combinar_tipos(tipo_a, tipo_b):
+    """
+    Combina los tipos de dato inferidos para una misma columna en dos trozos distintos.
+
+    Params:
+        - tipo_a, tipo_b: dtypes de numpy/pandas (o None si aún no se ha visto la columna).
+
+    Returns:
+        El dtype que puede representar ambos trozos (object si no son compatibles).
+    """
+    if tipo_a is None or tipo_a == tipo_b:
+        return tipo_b
+    if tipo_b is None:
+        return tipo_a
+    if pd.api.types.is_numeric_dtype(tipo_a) and pd.api.types.is_numeric_dtype(tipo_b):
+        return np.result_type(tipo_a, tipo_b)
+    return np.dtype("O")
+
+
+def combinar_resumenes(*particiones):
+    """
+    Combina los resúmenes por grupo calculados en varias particiones de los datos.
+
+    Params:
+        - *particiones: Diccionarios {categoria: AcumuladorMomentos}, uno por partición.
+
+    Returns:
+        Un diccionario {categoria: AcumuladorMomentos} con los resúmenes de todas las particiones juntas.
+    """
+    combinados = {}
+    for particion in particiones:
+        for categoria, resumen in particion.items():
+            if categoria in combinados:
+                combinados[categoria].combinar(resumen)
+            else:
+                combinados[categoria] = AcumuladorMomentos.desde_resumen(resumen.columnas, resumen.n, resumen.media,
+                                                                         resumen.m2, resumen.minimo, resumen.maximo)
+    return combinados
+
+
+def test_t_resumenes(resumen_a, resumen_b, varianzas_iguales=True):
+    """
+    Test t para dos grupos independientes a partir solo de (n, media, M2) de cada grupo.
+    Da el mismo resultado que `stats.ttest_ind` (o su variante de Welch).
+
+    Params:
+        - resumen_a, resumen_b: AcumuladorMomentos de cada grupo.
+        - varianzas_iguales (opcional): True para el test t de Student, False para el de Welch. Por defecto es True.
+
+    Returns:
+        Tupla (estadístico t, p-valor), con un valor por columna del resumen.
+    """
+    n_a, n_b = resumen_a.n, resumen_b.n
+    diferencia = resumen_a.media - resumen_b.media
+    with np.errstate(invalid="ignore", divide="ignore"):
+        if varianzas_iguales:
+            grados = n_a + n_b - 2
+            varianza_comun = (resumen_a.m2 + resumen_b.m2) / grados
+            error = np.sqrt(varianza_comun * (1 / n_a + 1 / n_b))
+        else:
+            # Welch: grados de libertad de Welch-Satterthwaite
+            va, vb = resumen_a.varianza() / n_a, resumen_b.varianza() / n_b
+            error = np.sqrt(va + vb)
+            grados = (va + vb)**2 / (va**2 / (n_a - 1) + vb**2 / (n_b - 1))
+        t = diferencia / error
+    return t, 2 * stats.t.sf(np.abs(t), grados)
+
+
+def test_anova_resumenes(resumenes):
+    """
+    ANOVA de un factor a partir solo de (n, media, M2) de cada grupo. Da el mismo resultado que `stats.f_oneway`.
+
+    Params:
+        - resumenes: Lista de AcumuladorMomentos, uno por grupo.
+
+    Returns:
+        Tupla (estadístico F, p-valor), con un valor por columna del resumen.
+    """
+    n = np.array([resumen.n for resumen in resumenes])
+    medias = np.array([resumen.media for resumen in resumenes])
+    m2 = np.array([resumen.m2 for resumen in resumenes])
+    k, n_total = len(resumenes), n.sum(axis=0)
+
+    media_global = (n * medias).sum(axis=0) / n_total
+    ss_entre = (n * (medias - media_global)**2).sum(axis=0)
+    ss_dentro = m2.sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        f = (ss_entre / (k - 1)) / (ss_dentro / (n_total - k))
+    return f, stats.f.sf(f, k - 1, n_total - k)
+
+
+def leer_por_chunks(ruta, tamaño_chunk=100_000, formato=None, columnas=None, **kwargs):
+    """
+    Lee un fichero CSV o Parquet por trozos, de forma que nunca hay más de `tamaño_chunk` filas en memoria.
+
+    Params:
+        - ruta (str): Ruta del fichero.
+        - tamaño_chunk (int, opcional): Número de filas de cada trozo. Por defecto es 100000.
+        - formato (str, opcional): 'csv' o 'parquet'. Si es None se deduce de la extensión del fichero.
+        - columnas (list, opcional): Columnas a leer. Si es None se leen todas.
+        - **kwargs: Argumentos adicionales para `pd.read_csv` (por ejemplo `dtype` o `sep`).
+
+    Returns:
+        Un generador de DataFrames.
+    """
+    if formato is None:
+        formato = "parquet" if str(ruta).lower().endswith((".parquet", ".pq")) else "csv"
+
+    if formato == "csv":
+        yield from pd.read_csv(ruta, chunksize=tamaño_chunk, usecols=columnas, **kwargs)
+    elif formato == "parquet":
+        import pyarrow.parquet as pq
+
+        fichero = pq.ParquetFile(ruta)
+        for lote in fichero.iter_batches(batch_size=tamaño_chunk, columns=columnas):
+            yield lote.to_pandas()
+    else:
+        raise ValueError("Formato no válido. Por favor, elige 'csv' o 'parquet'.")
@@ -0,0 +1,179 @@
+# Para importar las librerías pesadas solo cuando se usan
+# -----------------------------------------------------------------------
+from .soporte_perezoso import importar_perezoso
+
+# Tratamiento de datos
+# -----------------------------------------------------------------------
+import numpy as np
+pd = importar_perezoso("pandas")
+
+# Para pruebas estadísticas
+# -----------------------------------------------------------------------
+stats = importar_perezoso("scipy.stats")
+
+# Otras librerias
+# -----------------------------------------------------------------------
+import warnings
+
+# Para separar los datos en grupos y evaluar la normalidad
+# -----------------------------------------------------------------------
+from .soporte_grupos import GruposContiguos
+from .soporte_tablas import a_numpy, factorizar_columna
+from .soporte_normalidad import momentos_centrales, dagostino_momentos, jarque_bera_momentos
+
+# Para repartir el trabajo entre varios procesos
+# -----------------------------------------------------------------------
+from .soporte_paralelo import abrir_pool, ejecutar_tareas, numero_procesos
+
+
+# métodos de normalidad que se calculan a partir de los momentos, con todos los datos
+METODOS_MATRIZ = ("dagostino", "jarque_bera")
+
+CENTROS_LEVENE = ("median", "mean")
+
+COLUMNAS_MATRIZ = ["columna_numerica", "columna_categorica", "n_grupos", "normal", "p_valor_normalidad",
+                   "estadistico_levene", "p_valor_levene", "homogeneo", "test_recomendado"]
+
+
+def levene_por_grupos(valores, offsets, centro="median"):
+    """
+    Test de Levene (centro 'mean') o de Brown-Forsythe (centro 'median') para cada columna de una matriz ordenada
+    por grupo, ignorando los NaN. Con datos sin nulos da lo mismo que `stats.levene`.
+
+    Params:
+        - valores: array (n, m) ordenado por grupo.
+        - offsets: límites de los grupos, de tamaño k+1.
+        - centro (opcional): 'median' o 'mean'. Por defecto es 'median', como `stats.levene`.
+
+    Returns:
+        Tupla (W, p-valor), un valor por columna. NaN si la columna tiene menos de dos grupos con datos.
+    """
+    if centro not in CENTROS_LEVENE:
+        raise ValueError(f"Centro no válido. Por favor, elige uno de {CENTROS_LEVENE}.")
+
+    tamaños = np.diff(offsets)
+    # el centro de cada grupo es lo único que no se puede sacar de sumas por grupo; el bucle es solo sobre los grupos
+    funcion = np.nanmedian if centro == "median" else np.nanmean
+    centros = np.full((len(tamaños), valores.shape[1]), np.nan)
+    # los grupos sin ningún valor válido en una columna dan avisos de "All-NaN slice", que aquí no aportan nada
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        for g in np.flatnonzero(tamaños):
+            centros[g] = funcion(valores[offsets[g]:offsets[g + 1]], axis=0)
+    desviaciones = np.abs(valores - np.repeat(centros, tamaños, axis=0))
+
+    n, media, m2, _, _ = momentos_centrales(desviaciones, offsets)
+    con_datos = n > 0
+    k = con_datos.sum(axis=0)
+    n_total = n.sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        media_global = np.where(con_datos, n * media, 0.0).sum(axis=0) / n_total
+        entre = np.where(con_datos, n * (media - media_global)**2, 0.0).sum(axis=0)
+        dentro = np.where(con_datos, n * m2, 0.0).sum(axis=0)
+        w = (n_total - k) / (k - 1) * entre / dentro
+    w = np.where(k > 1, w, np.nan)
+    return w, stats.f.sf(w, k - 1, n_total - k)
+
+
+def recomendar_test(n_grupos, normal, homogeneo):
+    """
+    Elige la prueba para comparar los grupos según se cumplan o no las asunciones.
+
+    Params:
+        - n_grupos: número de grupos con datos.
+        - normal: True si todos los grupos siguen una distribución normal.
+        - homogeneo: True si las varianzas son homogéneas entre grupos.
+
+    Returns:
+        El nombre de la prueba recomendada (None si hay menos de dos grupos).
+    """
+    if n_grupos < 2:
+        return None
+    if n_grupos == 2:
+        if normal:
+            return "t de Student" if homogeneo else "t de Welch"
+        return "Mann-Whitney U"
+    if normal:
+        return "ANOVA" if homogeneo else "ANOVA de Welch"
+    return "Kruskal-Wallis"
+
+
+def _asunciones_categorica(datos, indice, metodo, centro):
+    """
+    Calcula la normalidad de cada grupo y la homogeneidad de varianzas de todas las columnas numéricas
+    para una de las columnas categóricas, a partir de los datos compartidos por todas las tareas.
+    """
+    valores = datos["valores"]
+    codigos = datos["codigos"][:, indice]
+    grupos = GruposContiguos.desde_codigos(codigos, np.arange(codigos.max() + 1), valores)
+
+    n, _, m2, m3, m4 = momentos_centrales(grupos.valores, grupos.offsets)
+    funcion = dagostino_momentos if metodo == "dagostino" else jarque_bera_momentos
+    _, p_normalidad = funcion(n, m2, m3, m4)
+    w, p_levene = levene_por_grupos(grupos.valores, grupos.offsets, centro)
+    return n, p_normalidad, w, p_levene
+
+
+def matriz_asunciones(dataframe, columnas_numericas, columnas_categoricas, alpha=0.05, metodo="dagostino",
+                      centro="median", n_procesos=None):
+    """
+    Evalúa la normalidad por grupo y la homogeneidad de varianzas para cada par (columna numérica, columna categórica)
+    y recomienda la prueba a usar en cada caso.
+
+    Cada columna categórica se factoriza una sola vez y sus grupos se forman sobre la matriz con todas las columnas
+    numéricas, de forma que los momentos, las medianas y las desviaciones se calculan para todas las numéricas a la vez.
+    Las columnas categóricas se reparten entre los procesos, que reciben los datos una única vez.
+
+    Params:
+        - dataframe: DataFrame con los datos (de pandas o de Polars, LazyFrame de Polars o tabla de PyArrow).
+        - columnas_numericas: lista de columnas numéricas.
+        - columnas_categoricas: lista de columnas categóricas.
+        - alpha (opcional): nivel de significancia de ambas pruebas. Por defecto es 0.05.
+        - metodo (opcional): 'dagostino' o 'jarque_bera'. Por defecto es 'dagostino'.
+        - centro (opcional): 'median' (Brown-Forsythe) o 'mean' (Levene). Por defecto es 'median'.
+        - n_procesos (opcional): número de procesos. Si es None se usan todos los núcleos.
+
+    Returns:
+        DataFrame con una fila por par y las columnas columna_numerica, columna_categorica, n_grupos, normal,
+        p_valor_normalidad (el mínimo entre los grupos), estadistico_levene, p_valor_levene, homogeneo y test_recomendado.
+        Un grupo cuya normalidad no se puede evaluar (menos de 8 datos) cuenta como no normal.
+    """
+    if metodo not in METODOS_MATRIZ:
+        raise ValueError(f"Método no válido. Por favor, elige uno de {METODOS_MATRIZ}.")
+    if centro not in CENTROS_LEVENE:
+        raise ValueError(f"Centro no válido. Por favor, elige uno de {CENTROS_LEVENE}.")
+
+    columnas_numericas, columnas_categoricas = list(columnas_numericas), list(columnas_categoricas)
+    if not columnas_numericas or not columnas_categoricas:
+        return pd.DataFrame(columns=COLUMNAS_MATRIZ)
+    valores = a_numpy(dataframe, columnas_numericas)
+    codigos = np.column_stack([factorizar_columna(dataframe, columna)[0].astype(np.int64) for columna in columnas_categoricas])
+
+    n_procesos = min(numero_procesos(n_procesos), len(columnas_categoricas))
+    datos = {"valores": valores, "codigos": codigos}
+    pool = abrir_pool(datos, n_procesos)
+    try:
+        tareas = [(indice, metodo, centro) for indice in range(len(columnas_categoricas))]
+        resultados = ejecutar_tareas(pool, _asunciones_categorica, tareas, datos)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    filas = []
+    for columna_categorica, (n, p_normalidad, w, p_levene) in zip(columnas_categoricas, resultados):
+        n_grupos = (n > 0).sum(axis=0)
+        normal = np.where(n > 0, p_normalidad > alpha, True).all(axis=0)
+        homogeneo = p_levene > alpha
+        with np.errstate(invalid="ignore"):
+            p_minimo = np.where(n > 0, p_normalidad, np.inf).min(axis=0)
+        for c, columna_numerica in enumerate(columnas_numericas):
+            filas.append({"columna_numerica": columna_numerica,
+                          "columna_categorica": columna_categorica,
+                          "n_grupos": int(n_grupos[c]),
+                          "normal": bool(normal[c]),
+                          "p_valor_normalidad": p_minimo[c] if np.isfinite(p_minimo[c]) else np.nan,
+                          "estadistico_levene": w[c],
+                          "p_valor_levene": p_levene[c],
+                          "homogeneo": bool(homogeneo[c]),
+                          "test_recomendado": recomendar_test(n_grupos[c], normal[c], homogeneo[c])})
+    return pd.DataFrame(filas)
@@ -0,0 +1,314 @@
+"""
+Ejecuta por lotes muchos experimentos A/B descritos en un fichero de configuración JSON y escribe todos los
+resultados en un único fichero Parquet o JSON.
+
+Uso, desde la raíz del repositorio:
+    python -m src.soporte_cli experimentos.json [--salida resultados.parquet] [--n-procesos 8]
+
+Formato de la configuración (las claves de primer nivel distintas de "experimentos" y "salida" son valores por
+defecto para todos los experimentos):
+
+    {
+        "salida": "resultados.parquet",
+        "alpha": 0.05,
+        "experimentos": [
+            {"nombre": "campaña_marzo",
+             "datos": "datos/marzo.parquet",
+             "columna_grupo": "campaign_name",
+             "categoria_control": "Control Campaign",
+             "categoria_test": "Test Campaign",
+             "metricas": ["purchase", "impressions"],
+             "tests": ["welch", "mannwhitneyu"],
+             "correccion": "holm"}
+        ]
+    }
+
+Los datos se leen con pyarrow: los ficheros Arrow/Feather (.arrow, .feather, .ipc) se abren con memoria mapeada
+sin copiar, y de los Parquet (o CSV) solo se leen la columna de grupos y las métricas.
+"""
+# Tratamiento de datos
+# -----------------------------------------------------------------------
+import numpy as np
+
+# Otras librerias
+# -----------------------------------------------------------------------
+import argparse
+import json
+import os
+import sys
+
+# Para importar las librerías pesadas solo cuando se usan
+# -----------------------------------------------------------------------
+from .soporte_perezoso import importar_perezoso
+pd = importar_perezoso("pandas")
+stats = importar_perezoso("scipy.stats")
+
+# Para separar los datos en grupos y calcular los tests
+# -----------------------------------------------------------------------
+from .soporte_grupos import (GruposContiguos, RangosAgrupados, sumas_por_grupo, estadistico_kruskal, estadistico_mannwhitney,
+                             TESTS_PAREJA)
+from .soporte_exactas import mannwhitney_exacto, metodo_mannwhitney
+from .soporte_acumuladores import AcumuladorMomentos, test_t_resumenes, test_anova_resumenes
+from .soporte_secuencial import ContadorConversiones
+from .soporte_posthoc import ajustar_pvalores
+
+# Para repartir el trabajo entre varios procesos
+# -----------------------------------------------------------------------
+from .soporte_paralelo import abrir_pool, ejecutar_tareas, numero_procesos
+
+
+TESTS = ("z", "t", "welch", "anova", "mannwhitneyu", "kruskal")
+
+FORMATOS_ARROW = (".arrow", ".feather", ".ipc")
+
+COLUMNAS_RESULTADO = ["experimento", "metrica", "test", "n_control", "n_test", "media_control", "media_test",
+                      "diferencia", "estadistico", "p_valor", "p_ajustado", "significativo", "error"]
+
+
+def leer_tabla(ruta, columnas):
+    """
+    Lee solo las columnas indicadas de un fichero Arrow/Feather, Parquet o CSV como una tabla de pyarrow.
+    Los ficheros Arrow se abren con memoria mapeada, así que las columnas numéricas no se copian.
+
+    Params:
+        - ruta: ruta del fichero; el formato se deduce de la extensión.
+        - columnas: lista de columnas a leer.
+
+    Returns:
+        Un pyarrow.Table.
+    """
+    import pyarrow as pa
+
+    extension = os.path.splitext(str(ruta))[1].lower()
+    if extension in FORMATOS_ARROW:
+        fuente = pa.memory_map(str(ruta), "r")
+        try:
+            tabla = pa.ipc.open_file(fuente).read_all()
+        except pa.ArrowInvalid:
+            # formato de flujo (stream) en lugar de fichero
+            fuente.seek(0)
+            tabla = pa.ipc.open_stream(fuente).read_all()
+        return tabla.select(columnas)
+    if extension in (".parquet", ".pq"):
+        import pyarrow.parquet as pq
+
+        return pq.read_table(ruta, columns=columnas, memory_map=True)
+    if extension == ".csv":
+        from pyarrow import csv
+
+        return csv.read_csv(ruta, convert_options=csv.ConvertOptions(include_columns=columnas))
+    raise ValueError(f"Formato no válido para {ruta}. Por favor, usa Arrow/Feather, Parquet o CSV.")
+
+
+def _codificar(columna):
+    """
+    Factoriza una columna de pyarrow con su propio diccionario, sin pasar por objetos de Python fila a fila.
+
+    Returns:
+        Tupla (codigos int64 con -1 para los nulos, array de categorías).
+    """
+    codificada = columna.combine_chunks().dictionary_encode()
+    codigos = codificada.indices.fill_null(-1).to_numpy(zero_copy_only=False).astype(np.int64)
+    return codigos, np.array(codificada.dictionary.to_pylist(), dtype=object)
+
+
+def _a_float(columna):
+    """
+    Convierte una columna numérica (o booleana) de pyarrow en un array float64, con NaN en los nulos.
+    """
+    import pyarrow as pa
+
+    return columna.cast(pa.float64()).to_numpy(zero_copy_only=False)
+
+
+def _grupos_metrica(grupos, j):
+    """
+    Grupos de la métrica j sin sus NaN, a partir de la matriz de métricas ya ordenada por grupo.
+    """
+    valores = grupos.valores[:, j]
+    validos = ~np.isnan(valores)
+    offsets = np.zeros(len(grupos) + 1, dtype=np.int64)
+    np.cumsum(sumas_por_grupo(validos.astype(np.int64), grupos.offsets), out=offsets[1:])
+    return GruposContiguos(grupos.categorias, valores[validos], offsets)
+
+
+def _ejecutar_test(test, grupos, rangos, experimento):
+    """
+    Calcula un test sobre los grupos de una métrica (sin nulos) y devuelve la fila de resultados, sin imprimir nada.
+    """
+    fila = {}
+    control, prueba = experimento.get("categoria_control"), experimento.get("categoria_test")
+    if test in TESTS_PAREJA:
+        if control is None or prueba is None:
+            raise ValueError(f"El test '{test}' necesita 'categoria_control' y 'categoria_test'.")
+        datos_control, datos_test = grupos[control], grupos[prueba]
+        fila.update({"n_control": len(datos_control), "n_test": len(datos_test),
+                     "media_control": datos_control.mean() if len(datos_control) else np.nan,
+                     "media_test": datos_test.mean() if len(datos_test) else np.nan})
+        fila["diferencia"] = fila["media_test"] - fila["media_control"]
+
+    if test == "z":
+        if not (np.isin(datos_control, (0, 1)).all() and np.isin(datos_test, (0, 1)).all()):
+            raise ValueError("El test z necesita una métrica binaria (0/1).")
+        contador = ContadorConversiones(control, prueba).actualizar_conteos(len(datos_control), datos_control.sum(),
+                                                                          len(datos_test), datos_test.sum())
+        estadistico, p_valor = contador.z_test()
+    elif test in ("t", "welch"):
+        resumen_control = AcumuladorMomentos(["valor"]).actualizar(datos_control[:, None])
+        resumen_test = AcumuladorMomentos(["valor"]).actualizar(datos_test[:, None])
+        estadistico, p_valor = test_t_resumenes(resumen_control, resumen_test, varianzas_iguales=(test == "t"))
+        estadistico, p_valor = estadistico[0], p_valor[0]
+    elif test == "mannwhitneyu":
+        sumas, tamaños, empates = rangos.sumas_rangos([grupos.indice(control), grupos.indice(prueba)])
+        # como scipy, con muestras pequeñas sin empates el p-valor es exacto
+        exacto, en_tablas = metodo_mannwhitney(tamaños[0], tamaños[1], empates)
+        if en_tablas:
+            estadistico, p_valor = mannwhitney_exacto(sumas[0] - tamaños[0] * (tamaños[0] + 1) / 2, tamaños[0], tamaños[1])
+        elif exacto:
+            estadistico, p_valor = stats.mannwhitneyu(datos_control, datos_test, method="exact")
+        else:
+            estadistico, p_valor = estadistico_mannwhitney(sumas[0], tamaños[0], tamaños[1], empates)
+    else:
+        categorias = experimento.get("categorias") or grupos.categorias.tolist()
+        indices = [grupos.indice(categoria) for categoria in categorias]
+        if test == "kruskal":
+            estadistico, p_valor = estadistico_kruskal(*rangos.sumas_rangos(indices))
+        else:
+            resumenes = [AcumuladorMomentos(["valor"]).actualizar(grupos[categoria][:, None]) for categoria in categorias]
+            estadistico, p_valor = test_anova_resumenes(resumenes)
+            estadistico, p_valor = estadistico[0], p_valor[0]
+
+    fila.update({"estadistico": float(estadistico), "p_valor": float(p_valor)})
+    return fila
+
+
+def ejecutar_experimento(experimento):
+    """
+    Ejecuta todos los tests de todas las métricas de un experimento. Solo se leen las columnas necesarias, la
+    columna de grupos se factoriza una vez y todas las métricas se ordenan por grupo con una única ordenación.
+    Los errores no detienen el lote: se devuelven en la columna "error".
+
+    Params:
+        - experimento: diccionario con la configuración del experimento (ver la documentación del módulo).
+
+    Returns:
+        Lista de diccionarios, uno por métrica y test.
+    """
+    nombre = experimento.get("nombre", experimento.get("datos"))
+    metricas, tests = list(experimento.get("metricas", [])), list(experimento.get("tests", ["welch"]))
+    alpha = experimento.get("alpha", 0.05)
+    try:
+        invalidos = sorted(set(tests) - set(TESTS))
+        if invalidos:
+            raise ValueError(f"Tests no válidos: {invalidos}. Por favor, elige entre {TESTS}.")
+        tabla = leer_tabla(experimento["datos"], [experimento["columna_grupo"]] + metricas)
+        codigos, categorias = _codificar(tabla.column(experimento["columna_grupo"]))
+        matriz = np.column_stack([_a_float(tabla.column(metrica)) for metrica in metricas])
+        grupos = GruposContiguos.desde_codigos(codigos, categorias, matriz)
+    except Exception as error:
+        return [{"experimento": nombre, "error": f"{type(error).__name__}: {error}"}]
+
+    filas = []
+    for j, metrica in enumerate(metricas):
+        grupos_metrica = _grupos_metrica(grupos, j)
+        rangos = RangosAgrupados(grupos_metrica) if {"mannwhitneyu", "kruskal"}.intersection(tests) else None
+        filas_metrica = []
+        for test in tests:
+            fila = {"experimento": nombre, "metrica": metrica, "test": test}
+            try:
+                fila.update(_ejecutar_test(test, grupos_metrica, rangos, experimento))
+            except Exception as error:
+                fila["error"] = f"{type(error).__name__}: {error}"
+            filas_metrica.append(fila)
+        filas.extend(filas_metrica)
+
+    # corrección por comparaciones múltiples dentro del experimento (todas sus métricas y tests)
+    p_ajustados = ajustar_pvalores([fila.get("p_valor", np.nan) for fila in filas], experimento.get("correccion"))
+    for fila, p_ajustado in zip(filas, p_ajustados):
+        fila["p_ajustado"] = p_ajustado
+        fila["significativo"] = bool(p_ajustado < alpha)
+    return filas
+
+
+def leer_configuracion(ruta):
+    """
+    Lee la configuración y aplica a cada experimento los valores por defecto del primer nivel.
+
+    Returns:
+        Tupla (lista de experimentos, ruta de salida o None).
+    """
+    with open(ruta, encoding="utf-8") as fichero:
+        configuracion = json.load(fichero)
+    por_defecto = {clave: valor for clave, valor in configuracion.items() if clave not in ("experimentos", "salida")}
+    # las rutas de los datos y de la salida son relativas a la carpeta del fichero de configuración
+    carpeta = os.path.dirname(os.path.abspath(ruta))
+    experimentos = []
+    for experimento in configuracion.get("experimentos", []):
+        experimento = {**por_defecto, **experimento}
+        if "datos" in experimento:
+            experimento["datos"] = os.path.join(carpeta, experimento["datos"])
+        experimentos.append(experimento)
+    salida = configuracion.get("salida")
+    return experimentos, os.path.join(carpeta, salida) if salida is not None else None
+
+
+def escribir_resultados(resultados, ruta):
+    """
+    Escribe la tabla de resultados en Parquet o en JSON (una lista de registros), según la extensión.
+    """
+    if str(ruta).lower().endswith((".parquet", ".pq")):
+        resultados.to_parquet(ruta, index=False)
+    elif str(ruta).lower().endswith(".json"):
+        resultados.to_json(ruta, orient="records", force_ascii=False, indent=2)
+    else:
+        raise ValueError("Formato de salida no válido. Por favor, usa .parquet o .json.")
+
+
+def ejecutar_lote(experimentos, n_procesos=None):
+    """
+    Ejecuta los experimentos repartidos entre varios procesos.
+
+    Params:
+        - experimentos: lista de diccionarios de configuración.
+        - n_procesos (opcional): número de procesos. Si es None se usan todos los núcleos.
+
+    Returns:
+        DataFrame con una fila por experimento, métrica y test.
+    """
+    if not experimentos:
+        return pd.DataFrame(columns=COLUMNAS_RESULTADO)
+    n_procesos = min(numero_procesos(n_procesos), len(experimentos))
+    pool = abrir_pool({}, n_procesos)
+    try:
+        resultados = ejecutar_tareas(pool, ejecutar_experimento, [(experimento,) for experimento in experimentos])
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    filas = [fila for filas_experimento in resultados for fila in filas_experimento]
+    return pd.DataFrame(filas).reindex(columns=COLUMNAS_RESULTADO)
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(prog="python -m src.soporte_cli",
+                                     description="Ejecuta por lotes los experimentos A/B de un fichero de configuración JSON.")
+    parser.add_argument("configuracion", help="fichero JSON con los experimentos")
+    parser.add_argument("--salida", help="fichero de resultados (.parquet o .json); por defecto, el de la configuración")
+    parser.add_argument("--n-procesos", type=int, default=None, help="número de procesos; por defecto, todos los núcleos")
+    argumentos = parser.parse_args(argumentos)
+
+    experimentos, salida = leer_configuracion(argumentos.configuracion)
+    salida = argumentos.salida or salida
+    if salida is None:
+        parser.error("falta el fichero de salida: usa --salida o la clave 'salida' de la configuración")
+
+    resultados = ejecutar_lote(experimentos, argumentos.n_procesos)
+    escribir_resultados(resultados, salida)
+
+    errores = resultados["error"].notna().sum()
+    if errores:
+        print(f"{errores} resultados con errores; ver la columna 'error' de {salida}", file=sys.stderr)
+    return 1 if errores else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,8 +2,428 @@
 
 
 import itertools
-from scipy.special import factorial, comb, perm
 from collections import Counter
+from collections.abc import Sequence
+import math
+
+
+class SecuenciaCombinatoria(Sequence):
+    """
+    Secuencia perezosa de agrupaciones de elementos: no genera ninguna tupla hasta que se pide. Se comporta como
+    una lista de solo lectura: tiene len() en O(1), acceso por índice (unranking), `indice()` para obtener la
+    posición de una tupla (ranking) y troceado en tramos disjuntos, de forma que la enumeración se puede repartir
+    entre varios procesos sin materializarla. El orden es el mismo que el de la función de itertools equivalente.
+
+    Las subclases trabajan con tuplas de posiciones de `elementos` y definen cómo pasar de un índice a una tupla
+    (`_desordenar`), de una tupla a su índice (`_ordenar`) y de una tupla a la siguiente (`_siguiente`).
+    """
+
+    def __init__(self, elementos, r, tamaño):
+        self.elementos = list(elementos)
+        self.n = len(self.elementos)
+        self.r = r
+        self.tamaño = int(tamaño)
+
+    def __len__(self):
+        return self.tamaño
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.elementos}, r={self.r}, tamaño={self.tamaño})"
+
+    def __getitem__(self, indice):
+        if isinstance(indice, slice):
+            return TramoCombinatorio(self, range(self.tamaño)[indice])
+        if indice < 0:
+            indice += self.tamaño
+        if not 0 <= indice < self.tamaño:
+            raise IndexError("Índice fuera de rango.")
+        return self._a_elementos(self._desordenar(indice))
+
+    def __iter__(self):
+        return self._iterar()
+
+    def __contains__(self, tupla):
+        try:
+            self.indice(tupla)
+        except ValueError:
+            return False
+        return True
+
+    def indice(self, tupla):
+        """
+        Devuelve la posición de una tupla en la secuencia (ranking). Si hay elementos repetidos la tupla puede
+        aparecer varias veces; se devuelve la primera.
+
+        Params:
+            - tupla: tupla de elementos.
+
+        Returns:
+            Entero con la posición de la tupla.
+        """
+        posiciones = self._a_posiciones(tupla)
+        if posiciones is None or not self._es_valida(posiciones):
+            raise ValueError(f"{tupla} no está en la secuencia.")
+        return self._ordenar(posiciones)
+
+    index = indice
+
+    def dividir(self, n_trozos):
+        """
+        Divide la secuencia en tramos disjuntos y consecutivos de tamaño parecido, por ejemplo para repartirlos entre procesos.
+
+        Params:
+            - n_trozos: número de tramos.
+
+        Returns:
+            Lista de TramoCombinatorio que juntos cubren toda la secuencia.
+        """
+        limites = [self.tamaño * i // n_trozos for i in range(n_trozos + 1)]
+        return [TramoCombinatorio(self, range(inicio, fin)) for inicio, fin in zip(limites[:-1], limites[1:])]
+
+    def iterar_desde(self, inicio, cantidad=None):
+        """
+        Genera las tuplas a partir de la posición `inicio`, sin generar las anteriores.
+
+        Params:
+            - inicio: posición de la primera tupla.
+            - cantidad (opcional): número de tuplas a generar. Si es None se llega hasta el final.
+
+        Returns:
+            Un generador de tuplas.
+        """
+        fin = self.tamaño if cantidad is None else min(self.tamaño, inicio + cantidad)
+        if inicio >= fin:
+            return
+        if inicio == 0:
+            # desde el principio, itertools es mucho más rápido
+            yield from itertools.islice(self._iterar(), fin)
+            return
+        posiciones = self._desordenar(inicio)
+        for _ in range(fin - inicio):
+            yield self._a_elementos(posiciones)
+            posiciones = self._siguiente(list(posiciones))
+
+    def _a_elementos(self, posiciones):
+        return tuple(self.elementos[i] for i in posiciones)
+
+    def _a_posiciones(self, tupla):
+        # con elementos repetidos, cada elemento de la tupla toma la primera de sus apariciones que sea válida
+        # después de las ya elegidas; así se obtiene la tupla de posiciones de menor índice
+        apariciones = {}
+        for posicion, elemento in enumerate(self.elementos):
+            apariciones.setdefault(elemento, []).append(posicion)
+        posiciones = []
+        try:
+            for elemento in tupla:
+                posicion = self._elegir_posicion(apariciones.get(elemento, []), posiciones)
+                if posicion is None:
+                    return None
+                posiciones.append(posicion)
+        except TypeError:
+            return None
+        return tuple(posiciones) if len(posiciones) == self.r else None
+
+    def _elegir_posicion(self, candidatas, posiciones):
+        return candidatas[0] if candidatas else None
+
+    def _es_valida(self, posiciones):
+        return True
+
+
+class Variaciones(SecuenciaCombinatoria):
+    """
+    Variaciones sin repetición de `elementos` tomados de r en r (con r = n son las permutaciones), en el orden de `itertools.permutations`.
+    """
+
+    def _iterar(self):
+        return itertools.permutations(self.elementos, self.r)
+
+    def _elegir_posicion(self, candidatas, posiciones):
+        return next((candidata for candidata in candidatas if candidata not in posiciones), None)
+
+    def _es_valida(self, posiciones):
+        return len(set(posiciones)) == len(posiciones)
+
+    def _desordenar(self, indice):
+        libres = list(range(self.n))
+        posiciones = []
+        for j in range(self.r):
+            # cada elemento elegido en la posición j deja perm(n - j - 1, r - j - 1) variaciones por detrás
+            bloque = math.perm(self.n - j - 1, self.r - j - 1)
+            elegido, indice = divmod(indice, bloque)
+            posiciones.append(libres.pop(elegido))
+        return tuple(posiciones)
+
+    def _ordenar(self, posiciones):
+        libres = list(range(self.n))
+        indice = 0
+        for j, posicion in enumerate(posiciones):
+            elegido = libres.index(posicion)
+            indice += elegido * math.perm(self.n - j - 1, self.r - j - 1)
+            libres.pop(elegido)
+        return indice
+
+    def _siguiente(self, posiciones):
+        usados = set(posiciones)
+        for i in reversed(range(self.r)):
+            usados.discard(posiciones[i])
+            mayores = [v for v in range(posiciones[i] + 1, self.n) if v not in usados]
+            if mayores:
+                posiciones[i] = mayores[0]
+                usados.add(mayores[0])
+                resto = [v for v in range(self.n) if v not in usados][:self.r - i - 1]
+                return tuple(posiciones[:i + 1] + resto)
+        return None
+
+
+class Combinaciones(SecuenciaCombinatoria):
+    """
+    Combinaciones de `elementos` tomados de r en r, en el orden de `itertools.combinations`.
+    """
+
+    def _iterar(self):
+        return itertools.combinations(self.elementos, self.r)
+
+    def _elegir_posicion(self, candidatas, posiciones):
+        minima = posiciones[-1] + 1 if posiciones else 0
+        return next((candidata for candidata in candidatas if candidata >= minima), None)
+
+    def _es_valida(self, posiciones):
+        return all(a < b for a, b in zip(posiciones, posiciones[1:]))
+
+    def _desordenar(self, indice):
+        posiciones = []
+        candidato = 0
+        for j in range(self.r):
+            # saltamos los candidatos cuyo bloque de combinaciones queda entero antes del índice
+            while indice >= math.comb(self.n - candidato - 1, self.r - j - 1):
+                indice -= math.comb(self.n - candidato - 1, self.r - j - 1)
+                candidato += 1
+            posiciones.append(candidato)
+            candidato += 1
+        return tuple(posiciones)
+
+    def _ordenar(self, posiciones):
+        indice = 0
+        anterior = -1
+        for j, posicion in enumerate(posiciones):
+            for candidato in range(anterior + 1, posicion):
+                indice += math.comb(self.n - candidato - 1, self.r - j - 1)
+            anterior = posicion
+        return indice
+
+    def _siguiente(self, posiciones):
+        for i in reversed(range(self.r)):
+            if posiciones[i] != i + self.n - self.r:
+                posiciones[i] += 1
+                for j in range(i + 1, self.r):
+                    posiciones[j] = posiciones[j - 1] + 1
+                return tuple(posiciones)
+        return None
+
+
+class CombinacionesConRepeticion(SecuenciaCombinatoria):
+    """
+    Combinaciones con repetición de `elementos` tomados de r en r, en el orden de `itertools.combinations_with_replacement`.
+    """
+
+    def _iterar(self):
+        return itertools.combinations_with_replacement(self.elementos, self.r)
+
+    def _elegir_posicion(self, candidatas, posiciones):
+        minima = posiciones[-1] if posiciones else 0
+        return next((candidata for candidata in candidatas if candidata >= minima), None)
+
+    def _es_valida(self, posiciones):
+        return all(a <= b for a, b in zip(posiciones, posiciones[1:]))
+
+    def _bloque(self, candidato, restantes):
+        # número de multiconjuntos de tamaño `restantes` con elementos >= candidato
+        return math.comb(self.n - candidato + restantes - 1, restantes)
+
+    def _desordenar(self, indice):
+        posiciones = []
+        candidato = 0
+        for j in range(self.r):
+            while indice >= self._bloque(candidato, self.r - j - 1):
+                indice -= self._bloque(candidato, self.r - j - 1)
+                candidato += 1
+            posiciones.append(candidato)
+        return tuple(posiciones)
+
+    def _ordenar(self, posiciones):
+        indice = 0
+        anterior = 0
+        for j, posicion in enumerate(posiciones):
+            for candidato in range(anterior, posicion):
+                indice += self._bloque(candidato, self.r - j - 1)
+            anterior = posicion
+        return indice
+
+    def _siguiente(self, posiciones):
+        for i in reversed(range(self.r)):
+            if posiciones[i] != self.n - 1:
+                valor = posiciones[i] + 1
+                posiciones[i:] = [valor] * (self.r - i)
+                return tuple(posiciones)
+        return None
+
+
+class ProductoCartesiano(SecuenciaCombinatoria):
+    """
+    Producto cartesiano de varios conjuntos (con r copias del mismo conjunto son las variaciones con repetición),
+    en el orden de `itertools.product`.
+    """
+
+    def __init__(self, conjuntos, tamaño):
+        self.conjuntos = [list(conjunto) for conjunto in conjuntos]
+        self.bases = [len(conjunto) for conjunto in self.conjuntos]
+        super().__init__([], len(self.conjuntos), tamaño)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.conjuntos}, tamaño={self.tamaño})"
+
+    def _iterar(self):
+        return itertools.product(*self.conjuntos)
+
+    def _a_elementos(self, posiciones):
+        return tuple(conjunto[i] for conjunto, i in zip(self.conjuntos, posiciones))
+
+    def _a_posiciones(self, tupla):
+        try:
+            posiciones = tuple(conjunto.index(elemento) for conjunto, elemento in zip(self.conjuntos, tupla))
+        except (ValueError, TypeError):
+            return None
+        return posiciones if len(posiciones) == self.r else None
+
+    def _desordenar(self, indice):
+        posiciones = []
+        for base in reversed(self.bases):
+            indice, digito = divmod(indice, base)
+            posiciones.append(digito)
+        return tuple(reversed(posiciones))
+
+    def _ordenar(self, posiciones):
+        indice = 0
+        for base, digito in zip(self.bases, posiciones):
+            indice = indice * base + digito
+        return indice
+
+    def _siguiente(self, posiciones):
+        for i in reversed(range(self.r)):
+            if posiciones[i] + 1 < self.bases[i]:
+                posiciones[i] += 1
+                return tuple(posiciones)
+            posiciones[i] = 0
+        return None
+
+
+class PermutacionesMulticonjunto(SecuenciaCombinatoria):
+    """
+    Permutaciones distintas de una lista con elementos repetidos (permutaciones de un multiconjunto). Cada una se
+    genera exactamente una vez, en orden lexicográfico según el orden de primera aparición de cada elemento en la
+    lista, con el algoritmo de la siguiente permutación; no se generan las n! permutaciones ni se guardan en un set.
+    """
+
+    def __init__(self, elementos, tamaño):
+        super().__init__(elementos, len(elementos), tamaño)
+        # cada elemento distinto se representa por su orden de primera aparición
+        self.distintos = list(dict.fromkeys(self.elementos))
+        self._codigos = {elemento: codigo for codigo, elemento in enumerate(self.distintos)}
+        self.frecuencias = [0] * len(self.distintos)
+        for elemento in self.elementos:
+            self.frecuencias[self._codigos[elemento]] += 1
+
+    def _a_elementos(self, posiciones):
+        return tuple(self.distintos[i] for i in posiciones)
+
+    def _a_posiciones(self, tupla):
+        try:
+            posiciones = tuple(self._codigos[elemento] for elemento in tupla)
+        except (KeyError, TypeError):
+            return None
+        return posiciones if len(posiciones) == self.r else None
+
+    def _es_valida(self, posiciones):
+        return Counter(posiciones) == Counter(dict(enumerate(self.frecuencias)))
+
+    def _iterar(self):
+        posiciones = [codigo for codigo, frecuencia in enumerate(self.frecuencias) for _ in range(frecuencia)]
+        while posiciones is not None:
+            yield self._a_elementos(posiciones)
+            posiciones = self._siguiente(posiciones)
+
+    def _desordenar(self, indice):
+        restantes = list(self.frecuencias)
+        # número de permutaciones distintas de lo que queda por colocar
+        bloque_total = self.tamaño
+        posiciones = []
+        for quedan in range(self.r, 0, -1):
+            for codigo, frecuencia in enumerate(restantes):
+                if frecuencia == 0:
+                    continue
+                # las que empiezan por `codigo` son una fracción frecuencia / quedan del total
+                bloque = bloque_total * frecuencia // quedan
+                if indice < bloque:
+                    posiciones.append(codigo)
+                    restantes[codigo] -= 1
+                    bloque_total = bloque
+                    break
+                indice -= bloque
+        return tuple(posiciones)
+
+    def _ordenar(self, posiciones):
+        restantes = list(self.frecuencias)
+        bloque_total = self.tamaño
+        indice = 0
+        for quedan, posicion in zip(range(self.r, 0, -1), posiciones):
+            for codigo in range(posicion):
+                indice += bloque_total * restantes[codigo] // quedan
+            bloque_total = bloque_total * restantes[posicion] // quedan
+            restantes[posicion] -= 1
+        return indice
+
+    def _siguiente(self, posiciones):
+        # algoritmo clásico de la siguiente permutación lexicográfica (Narayana Pandita), válido con repetidos
+        i = len(posiciones) - 2
+        while i >= 0 and posiciones[i] >= posiciones[i + 1]:
+            i -= 1
+        if i < 0:
+            return None
+        j = len(posiciones) - 1
+        while posiciones[j] <= posiciones[i]:
+            j -= 1
+        posiciones[i], posiciones[j] = posiciones[j], posiciones[i]
+        posiciones[i + 1:] = reversed(posiciones[i + 1:])
+        return posiciones
+
+
+class TramoCombinatorio(Sequence):
+    """
+    Vista perezosa de una parte (un rango de índices) de una SecuenciaCombinatoria. Es lo que devuelven el
+    troceado (`secuencia[a:b]`) y `dividir()`; se puede enviar a otro proceso porque solo guarda la secuencia
+    original y el rango.
+    """
+
+    def __init__(self, secuencia, rango):
+        self.secuencia = secuencia
+        self.rango = rango
+
+    def __len__(self):
+        return len(self.rango)
+
+    def __repr__(self):
+        return f"TramoCombinatorio({self.secuencia!r}, {self.rango})"
+
+    def __getitem__(self, indice):
+        if isinstance(indice, slice):
+            return TramoCombinatorio(self.secuencia, self.rango[indice])
+        return self.secuencia[self.rango[indice]]
+
+    def __iter__(self):
+        if self.rango.step == 1:
+            return self.secuencia.iterar_desde(self.rango.start, len(self.rango))
+        return (self.secuencia[i] for i in self.rango)
 
 def permutaciones(elementos):
     """
@@ -11,7 +431,7 @@ def permutaciones(elementos):
     args: 
         elementos: lista de elementos a permutar
     returns:    
-        permutaciones_list: lista de todas las permutaciones
+        permutaciones_list: secuencia perezosa (SecuenciaCombinatoria) de todas las permutaciones
         num_permutaciones: número de permutaciones
 
     Ejemplo:
@@ -34,11 +454,11 @@ def permutaciones(elementos):
 
     """
     n = len(elementos)  # Número de elementos
-    # Generar todas las permutaciones usando itertools.permutations
-    permutaciones_list = list(itertools.permutations(elementos))
-    
-    # Contar las permutaciones usando scipy.special.factorial
-    num_permutaciones = factorial(n, exact=True)
+    # Contar las permutaciones usando math.factorial
+    num_permutaciones = math.factorial(n)
+
+    # Secuencia perezosa de todas las permutaciones (mismo orden que itertools.permutations)
+    permutaciones_list = Variaciones(elementos, n, num_permutaciones)
     
     return permutaciones_list, num_permutaciones
 
@@ -52,7 +472,7 @@ def variaciones(elementos, r):
         r: número de elementos a variar
     returns:
 
-        variaciones_list: lista de todas las variaciones
+        variaciones_list: secuencia perezosa (SecuenciaCombinatoria) de todas las variaciones
         num_variaciones: número de variaciones
 
     Ejemplo:
@@ -75,11 +495,11 @@ def variaciones(elementos, r):
     ('C', 'B')
     """
     n = len(elementos)  # Número total de elementos
-    # Generar todas las variaciones usando itertools.permutations
-    variaciones_list = list(itertools.permutations(elementos, r))
-    
-    # Contar las variaciones usando scipy.special.perm
-    num_variaciones = perm(n, r, exact=True)
+    # Contar las variaciones usando math.perm
+    num_variaciones = math.perm(n, r)
+
+    # Secuencia perezosa de todas las variaciones (mismo orden que itertools.permutations)
+    variaciones_list = Variaciones(elementos, r, num_variaciones)
     
     return variaciones_list, num_variaciones
 
@@ -91,7 +511,7 @@ def combinaciones(elementos, r):
         elementos: lista de elementos a combinar
         r: número de elementos a combinar
     returns:
-        combinaciones_list: lista de todas las combinaciones
+        combinaciones_list: secuencia perezosa (SecuenciaCombinatoria) de todas las combinaciones
         num_combinaciones: número de combinaciones
 
     Ejemplo:
@@ -111,11 +531,11 @@ def combinaciones(elementos, r):
     ('B', 'C')
     """
     n = len(elementos)  # Número total de elementos
-    # Generar todas las combinaciones usando itertools.combinations
-    combinaciones_list = list(itertools.combinations(elementos, r))
-    
-    # Contar las combinaciones usando scipy.special.comb
-    num_combinaciones = comb(n, r, exact=True)
+    # Contar las combinaciones usando math.comb
+    num_combinaciones = math.comb(n, r)
+
+    # Secuencia perezosa de todas las combinaciones (mismo orden que itertools.combinations)
+    combinaciones_list = Combinaciones(elementos, r, num_combinaciones)
     
     return combinaciones_list, num_combinaciones
 
@@ -126,7 +546,7 @@ def permutaciones_con_repeticion(elementos):
     args: 
         elementos: lista de elementos a permutar
     returns:
-        permutaciones_list: lista de todas las permutaciones
+        permutaciones_list: secuencia perezosa (SecuenciaCombinatoria) de las permutaciones distintas
         num_permutaciones: número de permutaciones
 
     Ejemplo:    
@@ -149,14 +569,14 @@ def permutaciones_con_repeticion(elementos):
     
     # Calcular el número de permutaciones con repetición
     n = len(elementos)
-    num_permutaciones = factorial(n, exact=True)
+    num_permutaciones = math.factorial(n)
     for count in frec.values():
-        num_permutaciones //= factorial(count, exact=True)
+        num_permutaciones //= math.factorial(count)
     
-    # Generar todas las permutaciones posibles (considerando repetición)
-    permutaciones_list = set(itertools.permutations(elementos))
+    # Secuencia perezosa de las permutaciones distintas, generadas directamente en orden lexicográfico
+    permutaciones_list = PermutacionesMulticonjunto(elementos, num_permutaciones)
     
-    return list(permutaciones_list), num_permutaciones
+    return permutaciones_list, num_permutaciones
 
 
 
@@ -167,7 +587,7 @@ def variaciones_con_repeticion(elementos, r):
         elementos: lista de elementos a variar
         r: número de elementos a variar
     returns:
-        variaciones_list: lista de todas las variaciones
+        variaciones_list: secuencia perezosa (SecuenciaCombinatoria) de todas las variaciones
         num_variaciones: número de variaciones
 
     Ejemplo:
@@ -192,11 +612,11 @@ def variaciones_con_repeticion(elementos, r):
     ('C', 'B')
     ('C', 'C')
     """
-    # Generar todas las variaciones con repetición usando itertools.product
-    variaciones_list = list(itertools.product(elementos, repeat=r))
-    
     # Calcular el número de variaciones con repetición
     num_variaciones = len(elementos) ** r
+
+    # Secuencia perezosa de todas las variaciones con repetición (mismo orden que itertools.product)
+    variaciones_list = ProductoCartesiano([elementos] * r, num_variaciones)
     
     return variaciones_list, num_variaciones
 
@@ -208,7 +628,7 @@ def combinaciones_con_repeticion(elementos, r):
         elementos: lista de elementos a combinar
         r: número de elementos a combinar
     returns:
-        combinaciones_list: lista de todas las combinaciones
+        combinaciones_list: secuencia perezosa (SecuenciaCombinatoria) de todas las combinaciones
         num_combinaciones: número de combinaciones
 
     Ejemplo:
@@ -231,11 +651,11 @@ def combinaciones_con_repeticion(elementos, r):
     ('C', 'C')
     """
     n = len(elementos)  # Número total de elementos
-    # Generar todas las combinaciones con repetición usando itertools.combinations_with_replacement
-    combinaciones_list = list(itertools.combinations_with_replacement(elementos, r))
-    
-    # Calcular el número de combinaciones con repetición usando scipy.special.comb
-    num_combinaciones = comb(n + r - 1, r, exact=True)
+    # Calcular el número de combinaciones con repetición usando math.comb
+    num_combinaciones = math.comb(n + r - 1, r)
+
+    # Secuencia perezosa de todas las combinaciones con repetición (mismo orden que itertools.combinations_with_replacement)
+    combinaciones_list = CombinacionesConRepeticion(elementos, r, num_combinaciones)
     
     return combinaciones_list, num_combinaciones
 
@@ -248,7 +668,7 @@ def producto_cartesiano(*conjuntos):
     args: 
         *conjuntos: lista de conjuntos
     returns:
-        combinaciones_list: lista de todas las combinaciones
+        combinaciones_list: secuencia perezosa (SecuenciaCombinatoria) de todas las combinaciones
         num_combinaciones: número de combinaciones
 
     Ejemplo:
@@ -272,12 +692,12 @@ def producto_cartesiano(*conjuntos):
     ('C', 'y')
 
     """
-    # Generar todas las combinaciones posibles usando itertools.product
-    combinaciones_list = list(itertools.product(*conjuntos))
-    
     # Calcular el número de combinaciones
     num_combinaciones = 1
     for conjunto in conjuntos:
         num_combinaciones *= len(conjunto)
+
+    # Secuencia perezosa de todas las combinaciones (mismo orden que itertools.product)
+    combinaciones_list = ProductoCartesiano(conjuntos, num_combinaciones)
     
     return combinaciones_list, num_combinaciones
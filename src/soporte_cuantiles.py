@@ -0,0 +1,166 @@
+# Tratamiento de datos
+# -----------------------------------------------------------------------
+import numpy as np
+
+# Otras librerias
+# -----------------------------------------------------------------------
+import math
+
+
+# los valores nuevos se añaden en bloques de este tamaño, para que la memoria temporal no dependa de la entrada
+TAMAÑO_BLOQUE = 2**18
+
+class SketchCuantiles:
+    """
+    Resumen aproximado de una distribución para calcular cuantiles sin ordenar todos los datos (sketch de tipo KLL).
+    Los datos se guardan en niveles: cada elemento del nivel h representa 2**h valores originales. Cuando un nivel
+    se llena se ordena y se sube al siguiente la mitad de sus elementos (los pares o los impares, al azar).
+    La memoria es del orden de k·log(n/k) y dos sketches construidos sobre trozos distintos se pueden combinar.
+    Los valores nuevos no se ordenan todos juntos: se parten en tramos de tamaño k que se compactan por separado
+    (todos a la vez, ordenando cada fila de una matriz), así que las ordenaciones son siempre pequeñas.
+
+    Attributes:
+        - k: tamaño del nivel superior; cuanto mayor, más preciso.
+        - n: número de valores (no nulos) resumidos.
+        - minimo, maximo: valores extremos exactos.
+    """
+
+    def __init__(self, error=0.01, semilla=None):
+        """
+        Inicializa un sketch vacío.
+
+        Params:
+            - error (float, opcional): Error de rango máximo que se admite (0.01 equivale a ±1 percentil). Por defecto es 0.01.
+            - semilla (int, opcional): Semilla para que el resultado sea reproducible.
+        """
+        if not 0 < error < 1:
+            raise ValueError("El error debe estar entre 0 y 1.")
+        self.error = error
+        # el error de rango de un sketch KLL es del orden de 1.7 / k; con 5 / error queda por debajo de `error`
+        # con margen también después de combinar sketches o de añadir los datos en muchos trozos
+        self.k = max(8, math.ceil(5 / error))
+        self.n = 0
+        self.minimo = np.inf
+        self.maximo = -np.inf
+        self.niveles = [np.empty(0)]
+        self._rng = np.random.default_rng(semilla)
+
+    def _capacidad(self, nivel):
+        # los niveles más bajos son más pequeños (factor 2/3 por nivel), como en el sketch KLL
+        profundidad = len(self.niveles) - nivel - 1
+        return max(2, math.ceil(self.k * (2 / 3)**profundidad))
+
+    def _compactar(self):
+        nivel = 0
+        while nivel < len(self.niveles):
+            elementos = self.niveles[nivel]
+            if len(elementos) > self._capacidad(nivel):
+                if nivel + 1 == len(self.niveles):
+                    self.niveles.append(np.empty(0))
+                elementos = np.sort(elementos)
+                # si el número de elementos es impar, el último se queda en este nivel
+                sobrante = elementos[len(elementos) - len(elementos) % 2:]
+                pares = elementos[:len(elementos) - len(elementos) % 2]
+                promovidos = pares[self._rng.integers(2)::2]
+                self.niveles[nivel + 1] = np.concatenate([self.niveles[nivel + 1], promovidos])
+                self.niveles[nivel] = sobrante
+            nivel += 1
+
+    def actualizar(self, valores):
+        """
+        Añade valores al sketch. Los nulos se ignoran.
+
+        Params:
+            - valores: array (o pandas.Series) de números.
+
+        Returns:
+            El propio sketch.
+        """
+        valores = np.asarray(valores, dtype=np.float64).ravel()
+        for inicio in range(0, len(valores), TAMAÑO_BLOQUE):
+            bloque = valores[inicio:inicio + TAMAÑO_BLOQUE]
+            bloque = bloque[~np.isnan(bloque)]
+            if len(bloque) == 0:
+                continue
+            self.n += len(bloque)
+            self.minimo = min(self.minimo, bloque.min())
+            self.maximo = max(self.maximo, bloque.max())
+            self._añadir(bloque)
+        return self
+
+    def _añadir(self, valores):
+        # mientras haya más de un tramo completo, cada tramo de `ancho` valores se ordena y se compacta como un
+        # nivel lleno del sketch; lo que no llega a un tramo se queda en el nivel en el que está
+        ancho = self.k + self.k % 2
+        nivel = 0
+        while len(valores) >= 2 * ancho:
+            completos = len(valores) // ancho * ancho
+            self._guardar_en_nivel(nivel, valores[completos:])
+            # `valores` es siempre una copia propia, así que se puede ordenar en el sitio
+            tramos = valores[:completos].reshape(-1, ancho)
+            tramos.sort(axis=1)
+            # cada tramo sube sus elementos pares o sus impares, al azar y de forma independiente
+            impares = self._rng.integers(2, size=(len(tramos), 1), dtype=np.int8).astype(bool)
+            valores = np.where(impares, tramos[:, 1::2], tramos[:, 0::2]).ravel()
+            nivel += 1
+        self._guardar_en_nivel(nivel, valores)
+        self._compactar()
+
+    def _guardar_en_nivel(self, nivel, valores):
+        while len(self.niveles) <= nivel:
+            self.niveles.append(np.empty(0))
+        self.niveles[nivel] = np.concatenate([self.niveles[nivel], valores])
+
+    def combinar(self, otro):
+        """
+        Combina otro sketch con este, por ejemplo el de otro trozo de datos o de otra partición.
+
+        Params:
+            - otro: Otra instancia de SketchCuantiles.
+
+        Returns:
+            El propio sketch, ya actualizado.
+        """
+        while len(self.niveles) < len(otro.niveles):
+            self.niveles.append(np.empty(0))
+        for nivel, elementos in enumerate(otro.niveles):
+            self.niveles[nivel] = np.concatenate([self.niveles[nivel], elementos])
+        self.n += otro.n
+        self.minimo = min(self.minimo, otro.minimo)
+        self.maximo = max(self.maximo, otro.maximo)
+        self._compactar()
+        return self
+
+    def cuantil(self, q):
+        """
+        Devuelve el cuantil aproximado (o varios).
+
+        Params:
+            - q: float o lista de floats entre 0 y 1.
+
+        Returns:
+            Un float, o un array de numpy si se pidieron varios cuantiles. NaN si el sketch está vacío.
+        """
+        q = np.asarray(q, dtype=np.float64)
+        if self.n == 0:
+            return np.full(q.shape, np.nan)[()]
+
+        elementos = np.concatenate(self.niveles)
+        pesos = np.concatenate([np.full(len(e), 2.0**nivel) for nivel, e in enumerate(self.niveles)])
+        orden = np.argsort(elementos, kind="stable")
+        acumulado = np.cumsum(pesos[orden])
+        posiciones = np.searchsorted(acumulado, q * acumulado[-1], side="left")
+        resultado = elementos[orden][np.clip(posiciones, 0, len(elementos) - 1)]
+
+        # los extremos se guardan de forma exacta
+        resultado = np.where(q <= 0, self.minimo, np.where(q >= 1, self.maximo, resultado))
+        return resultado[()]
+
+    def percentil(self, p):
+        """
+        Igual que `cuantil`, pero con percentiles entre 0 y 100 como `np.percentile`.
+        """
+        return self.cuantil(np.asarray(p, dtype=np.float64) / 100)
+
+    def __len__(self):
+        return self.n
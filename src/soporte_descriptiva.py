@@ -1,8 +1,11 @@
+# Para importar las librerías pesadas solo cuando se usan
+# -----------------------------------------------------------------------
+from .soporte_perezoso import importar_perezoso
 
-# Visualización
+
+# Visualización: seaborn y matplotlib se importan dentro de las funciones que dibujan, para que las tablas y los
+# conteos de este módulo se puedan usar sin cargarlas
 # ------------------------------------------------------------------------------
-import seaborn as sns 
-import matplotlib.pyplot as plt
 
 # Otras librerias
 # ------------------------------------------------------------------------------
@@ -14,36 +17,173 @@ from itertools import combinations
 
 # Para hacer tablas de contingencia
 # ------------------------------------------------------------------------------
-import pandas as pd
 import numpy as np
+pd = importar_perezoso("pandas")
+
+# Para calcular percentiles aproximados en conjuntos de datos grandes
+# ------------------------------------------------------------------------------
+from .soporte_cuantiles import SketchCuantiles
+
+# Para convertir las columnas categóricas en códigos enteros
+# ------------------------------------------------------------------------------
+from .soporte_grupos import factorizar
+
+# Para medir el tiempo y la memoria de cada etapa
+# ------------------------------------------------------------------------------
+from .soporte_instrumentacion import etapa
+
+
+# a partir de este número de filas los gráficos de dispersión se dibujan como densidad en modo 'auto'
+MAXIMO_PUNTOS = 50_000
+
 
+def densidad_2d(x, y, bins=100):
+    """
+    Cuenta cuántos puntos caen en cada celda de una rejilla regular (histograma 2D), en una sola pasada y sin ordenar.
+    Los pares con algún nulo o infinito se descartan.
+
+    Params
+        - x, y : arrays (o pandas.Series) de la misma longitud.
+        - bins : int, optional. Número de celdas en cada eje. El valor por defecto es 100.
+
+    Returns
+        Tupla (conteos, bordes_x, bordes_y), con conteos de forma (bins, bins) indexado como [celda_x, celda_y].
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    validos = np.isfinite(x) & np.isfinite(y)
+    x, y = x[validos], y[validos]
+    if len(x) == 0:
+        return np.zeros((bins, bins), dtype=np.int64), np.linspace(0, 1, bins + 1), np.linspace(0, 1, bins + 1)
+
+    bordes, celdas = [], []
+    for valores in (x, y):
+        minimo, maximo = valores.min(), valores.max()
+        if minimo == maximo:
+            minimo, maximo = minimo - 0.5, maximo + 0.5
+        # la celda de cada valor se calcula directamente, sin buscar en los bordes como hace np.histogram2d
+        celda = ((valores - minimo) * (bins / (maximo - minimo))).astype(np.int64)
+        celdas.append(np.minimum(celda, bins - 1))
+        bordes.append(np.linspace(minimo, maximo, bins + 1))
+
+    conteos = np.bincount(celdas[0] * bins + celdas[1], minlength=bins * bins).reshape(bins, bins)
+    return conteos, bordes[0], bordes[1]
+
+
+def dibujar_densidad(ax, conteos, bordes_x, bordes_y):
+    """
+    Dibuja en `ax` una densidad ya calculada con `densidad_2d` (escala logarítmica) y la media de y en cada celda
+    de x, que sirve para ver si la relación es lineal. El coste de dibujar no depende del número de puntos.
 
-def identificar_linealidad(dataframe, lista_combinacion_columnas):
+    Params
+        - ax : matplotlib.axes.Axes. Los ejes donde dibujar.
+        - conteos, bordes_x, bordes_y : la salida de `densidad_2d`.
+
+    Returns
+        No devuelve ningún valor.
+    """
+    from matplotlib.colors import LogNorm
+
+    malla = ax.pcolormesh(bordes_x, bordes_y, np.ma.masked_equal(conteos, 0).T, cmap="viridis",
+                          norm=LogNorm(vmin=1, vmax=max(conteos.max(), 1)))
+    ax.figure.colorbar(malla, ax=ax, label="Número de puntos")
+
+    # media de y en cada celda de x, con los conteos ya calculados
+    centros_y = (bordes_y[:-1] + bordes_y[1:]) / 2
+    por_columna = conteos.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        media_y = (conteos * centros_y).sum(axis=1) / por_columna
+    centros_x = (bordes_x[:-1] + bordes_x[1:]) / 2
+    ax.plot(centros_x[por_columna > 0], media_y[por_columna > 0], color="red", linewidth=1.5, label="Media por tramo")
+    ax.legend()
+
+
+def tablas_contingencia(dataframe, lista_col_categorias):
+    """
+    Calcula las tablas de contingencia de todas las combinaciones de dos columnas categóricas. Cada columna se
+    factoriza una única vez y cada tabla se obtiene contando con `np.bincount` los pares de códigos enteros,
+    en lugar de llamar a `pd.crosstab` (que vuelve a recorrer y agrupar las dos columnas) para cada pareja.
+    Las filas con algún nulo se descartan, como en `pd.crosstab`.
+
+    Params
+        - dataframe : pandas.DataFrame. El DataFrame que contiene los datos.
+        - lista_col_categorias : list of str. Una lista de nombres de columnas categóricas.
+
+    Returns
+        Diccionario {(columna_1, columna_2): (tabla, categorias_1, categorias_2)}, donde tabla es un array de numpy
+        con una fila por categoría de la primera columna y una columna por categoría de la segunda, ordenadas.
+    """
+    factorizadas = {}
+    for columna in lista_col_categorias:
+        codigos, categorias = factorizar(dataframe[columna])
+        codigos = codigos.astype(np.int64)
+        # ordenamos las categorías (como pd.crosstab) reordenando solo los códigos, no los datos
+        try:
+            orden = np.argsort(categorias, kind="stable")
+        except TypeError:
+            orden = np.arange(len(categorias))
+        nuevo_codigo = np.empty(len(categorias) + 1, dtype=np.int64)
+        nuevo_codigo[orden] = np.arange(len(categorias))
+        nuevo_codigo[-1] = -1
+        factorizadas[columna] = (nuevo_codigo[codigos], categorias[orden])
+
+    tablas = {}
+    for columna_1, columna_2 in combinations(lista_col_categorias, 2):
+        codigos_1, categorias_1 = factorizadas[columna_1]
+        codigos_2, categorias_2 = factorizadas[columna_2]
+        validos = (codigos_1 >= 0) & (codigos_2 >= 0)
+        k_1, k_2 = len(categorias_1), len(categorias_2)
+        tabla = np.bincount(codigos_1[validos] * k_2 + codigos_2[validos], minlength=k_1 * k_2).reshape(k_1, k_2)
+        tablas[(columna_1, columna_2)] = (tabla, categorias_1, categorias_2)
+    return tablas
+
+
+def identificar_linealidad(dataframe, lista_combinacion_columnas, modo="auto", bins=100):
     """
     Visualiza la relación lineal entre pares de columnas numéricas especificadas en el DataFrame mediante gráficos de dispersión.
 
     Params
         - dataframe : pandas.DataFrame. El DataFrame que contiene los datos.
         - lista_combinacion_columnas : list of tuple. Una lista de tuplas, donde cada tupla contiene dos nombres de columnas numéricas cuyas relaciones se desean visualizar.
+        - modo : str, optional. 'puntos' (un punto por fila), 'densidad' (histograma 2D calculado con numpy y la media de y por tramo de x; su coste no depende del número de filas) o 'auto' (densidad si hay más de 50000 filas). El valor por defecto es 'auto'.
+        - bins : int, optional. Número de celdas por eje en el modo 'densidad'. El valor por defecto es 100.
 
     Returns
         La función genera una visualización de los gráficos de dispersión y no devuelve ningún valor.
     """
+    import seaborn as sns
+    import matplotlib.pyplot as plt
+
     num_filas = math.ceil(len(lista_combinacion_columnas) / 2)
 
     fig, axes = plt.subplots(nrows=num_filas, ncols=2, figsize=(19, 11))
     axes = axes.flat
 
+    if modo == "auto":
+        modo = "densidad" if len(dataframe) > MAXIMO_PUNTOS else "puntos"
+    elif modo not in ("puntos", "densidad"):
+        raise ValueError("Modo no válido. Por favor, elige 'puntos', 'densidad' o 'auto'.")
+
     for indice, columnas in enumerate(lista_combinacion_columnas):
-        sns.scatterplot(x=columnas[0], y=columnas[1], data=dataframe, ax=axes[indice])
+        if modo == "puntos":
+            with etapa("dibujar_linealidad", filas=len(dataframe), modo=modo):
+                sns.scatterplot(x=columnas[0], y=columnas[1], data=dataframe, ax=axes[indice])
+        else:
+            with etapa("densidad_2d", filas=len(dataframe)):
+                densidad = densidad_2d(dataframe[columnas[0]], dataframe[columnas[1]], bins)
+            with etapa("dibujar_linealidad", modo=modo):
+                dibujar_densidad(axes[indice], *densidad)
+            axes[indice].set_xlabel(columnas[0])
+            axes[indice].set_ylabel(columnas[1])
         axes[indice].set_title(f"Relación entre {columnas[0]} y {columnas[1]}")
 
     if len(lista_combinacion_columnas) % 2 != 0:
         fig.delaxes(axes[-1])
 
     fig.suptitle("Relación Entre Variables Numéricas")
-    plt.tight_layout()
-    plt.show()
+    with etapa("mostrar_figura"):
+        plt.tight_layout()
+        plt.show()
 
 
 def visualizar_tablas_frecuencias(dataframe, lista_categorias):
@@ -57,13 +197,17 @@ def visualizar_tablas_frecuencias(dataframe, lista_categorias):
     Returns
         La función genera una visualización de las tablas de frecuencias y no devuelve ningún valor.
     """
+    import seaborn as sns
+    import matplotlib.pyplot as plt
+
     num_filas = math.ceil(len(lista_categorias) / 2)
 
     fig, axes = plt.subplots(nrows=num_filas, ncols=2, figsize=(19, 11))
     axes = axes.flat
 
     for indice, columna in enumerate(lista_categorias):
-        sns.countplot(x=columna, data=dataframe, ax=axes[indice])
+        with etapa("dibujar_frecuencias", filas=len(dataframe), columna=columna):
+            sns.countplot(x=columna, data=dataframe, ax=axes[indice])
         axes[indice].set_title(f"Distribución de la columna {columna}")
         axes[indice].set_xlabel("")
 
@@ -71,8 +215,9 @@ def visualizar_tablas_frecuencias(dataframe, lista_categorias):
         fig.delaxes(axes[-1])
 
     fig.suptitle("Distribución Variables Categóricas")
-    plt.tight_layout()
-    plt.show()
+    with etapa("mostrar_figura"):
+        plt.tight_layout()
+        plt.show()
 
 
 def visualizar_tablas_contingencia(dataframe, lista_col_categorias):
@@ -86,8 +231,13 @@ def visualizar_tablas_contingencia(dataframe, lista_col_categorias):
     Returns
         La función genera una visualización de las tablas de contingencia y no devuelve ningún valor.
     """
-    # Crear todas las posibles combinaciones de variables categóricas
-    combinaciones_categoricas = list(combinations(lista_col_categorias, 2))
+    import seaborn as sns
+    import matplotlib.pyplot as plt
+
+    # Calcular de una vez las tablas de todas las posibles combinaciones de variables categóricas
+    with etapa("tablas_contingencia", filas=len(dataframe)):
+        tablas = tablas_contingencia(dataframe, lista_col_categorias)
+    combinaciones_categoricas = list(tablas)
 
     num_filas = math.ceil(len(combinaciones_categoricas) / 2)
 
@@ -96,23 +246,27 @@ def visualizar_tablas_contingencia(dataframe, lista_col_categorias):
 
     # Generar las tablas de contingencia para cada relación de variables
     for indice, columnas in enumerate(combinaciones_categoricas):
-        tabla_contingencia = pd.crosstab(dataframe[columnas[0]], dataframe[columnas[1]])
-        sns.heatmap(tabla_contingencia, 
-                    annot=True, 
-                    cmap="YlGnBu",
-                    ax=axes[indice])
+        tabla, categorias_1, categorias_2 = tablas[columnas]
+        tabla_contingencia = pd.DataFrame(tabla, index=pd.Index(categorias_1, name=columnas[0]),
+                                          columns=pd.Index(categorias_2, name=columnas[1]))
+        with etapa("dibujar_contingencia", celdas=tabla.size):
+            sns.heatmap(tabla_contingencia, 
+                        annot=True, 
+                        cmap="YlGnBu",
+                        ax=axes[indice])
         axes[indice].set_title(f"Tabla de contingencia {columnas[0]} y {columnas[1]}")
 
     plt.suptitle("Tablas contingencias del DataFrame")
     if len(combinaciones_categoricas) % 2 != 0:
         fig.delaxes(axes[-1])
 
-    plt.tight_layout()
-    plt.show()
+    with etapa("mostrar_figura"):
+        plt.tight_layout()
+        plt.show()
 
 
 
-def visualizar_medidas_posicion(dataframe, columna, percentiles=[10, 25, 50, 75, 90]):
+def visualizar_medidas_posicion(dataframe, columna, percentiles=[10, 25, 50, 75, 90], metodo="exacto", error=0.01):
     """
     Visualiza un histograma de la columna especificada del DataFrame junto con líneas que representan los percentiles dados.
 
@@ -124,16 +278,31 @@ def visualizar_medidas_posicion(dataframe, columna, percentiles=[10, 25, 50, 75,
     
         - percentiles : list of int, optional. Una lista de percentiles a calcular y mostrar en el histograma. El valor por defecto es [10, 25, 50, 75, 90].
 
+        - metodo : str, optional. 'exacto' (np.percentile, ordena toda la columna) o 'sketch' (percentiles aproximados con SketchCuantiles, en una sola pasada). El valor por defecto es 'exacto'.
+
+        - error : float, optional. Error de rango admitido en el modo 'sketch'. El valor por defecto es 0.01.
+
     Returns
         La función genera una visualización y no devuelve ningún valor.
     """
-    valores_percentiles = np.percentile(dataframe[columna], percentiles)
-
-    sns.histplot(x=columna, 
-                 data=dataframe,
-                 bins=30, 
-                 edgecolor="black", 
-                 color="orange")
+    import seaborn as sns
+    import matplotlib.pyplot as plt
+
+    if metodo not in ("exacto", "sketch"):
+        raise ValueError("Método no válido. Por favor, elige 'exacto' o 'sketch'.")
+
+    with etapa("percentiles", filas=len(dataframe), metodo=metodo):
+        if metodo == "exacto":
+            valores_percentiles = np.percentile(dataframe[columna], percentiles)
+        else:
+            valores_percentiles = SketchCuantiles(error).actualizar(dataframe[columna]).percentil(percentiles)
+
+    with etapa("dibujar_percentiles", filas=len(dataframe)):
+        sns.histplot(x=columna, 
+                     data=dataframe,
+                     bins=30, 
+                     edgecolor="black", 
+                     color="orange")
    
     # Añadir líneas de percentiles
     for percentile, value in zip(percentiles, valores_percentiles):
@@ -0,0 +1,178 @@
+# Tratamiento de datos
+# -----------------------------------------------------------------------
+import numpy as np
+
+# Otras librerias
+# -----------------------------------------------------------------------
+from collections import OrderedDict
+
+
+# Las distribuciones nulas exactas de Mann-Whitney y de Wilcoxon solo dependen de los tamaños, así que con miles
+# de comparaciones pequeñas (por tienda, por día...) se repiten una y otra vez. Aquí se guardan como tablas de
+# conteos (número de ordenaciones con cada valor del estadístico) y cada tabla nueva se construye por programación
+# dinámica a partir de la mayor tabla más pequeña que haya en la caché, en lugar de empezar desde cero.
+# Los conteos se guardan en float64: son exactos hasta 2**53 y después solo pierden precisión relativa (~1e-16).
+
+# a partir de este número de valores posibles de U (n1 * n2) se deja el cálculo a scipy
+MAXIMO_CELDAS_MANNWHITNEY = 20_000
+
+# como en scipy, el p-valor de Mann-Whitney es exacto si algún grupo tiene como mucho este número de valores
+MAXIMO_EXACTO_MANNWHITNEY = 8
+
+
+class DistribucionesExactas:
+    """
+    Caché LRU acotada en memoria con las tablas de conteos de las distribuciones nulas exactas.
+
+    - Mann-Whitney, clave (n2, n1) con n1 <= n2: se guarda la pila de tablas de U para m = 0..n1 con n2 fijo, de forma
+      que la de (n1, n2 + 1) sale de ella con la recurrencia c(m, n, u) = c(m, n - 1, u) + c(m - 1, n, u - n).
+    - Wilcoxon, clave n: tabla de la suma de rangos positivos, con c(n, k) = c(n - 1, k) + c(n - 1, k - n).
+
+    Attributes:
+        - max_bytes: memoria máxima ocupada por las tablas.
+        - aciertos, fallos: contadores de uso de la caché.
+    """
+
+    def __init__(self, max_bytes=64 * 2**20):
+        self.max_bytes = max_bytes
+        self.aciertos = 0
+        self.fallos = 0
+        self._tablas = OrderedDict()
+        self._bytes = 0
+
+    def _obtener(self, clave):
+        tabla = self._tablas.get(clave)
+        if tabla is not None:
+            self.aciertos += 1
+            self._tablas.move_to_end(clave)
+        return tabla
+
+    def _guardar(self, clave, tabla):
+        self.fallos += 1
+        self._tablas[clave] = tabla
+        self._bytes += tabla.nbytes
+        while self._bytes > self.max_bytes and len(self._tablas) > 1:
+            _, descartada = self._tablas.popitem(last=False)
+            self._bytes -= descartada.nbytes
+        return tabla
+
+    def _anterior(self, tipo, condicion):
+        """
+        Clave guardada más grande de `tipo` que cumple `condicion`, de la que partir para construir una tabla nueva.
+        """
+        claves = [clave for clave in self._tablas if clave[0] == tipo and condicion(clave)]
+        return max(claves, default=None)
+
+    def mannwhitney(self, n1, n2):
+        """
+        Conteos de la distribución nula de U para dos grupos de tamaños n1 y n2 (el orden no importa).
+
+        Returns:
+            Array de longitud n1 * n2 + 1 con el número de ordenaciones de cada valor de U; suman comb(n1 + n2, n1).
+        """
+        m, n = min(n1, n2), max(n1, n2)
+        pila = self._obtener(("mannwhitney", n, m))
+        if pila is None:
+            # se parte de la pila guardada con el mismo n1 (o mayor) y el mayor n2 que no se pase
+            anterior = self._anterior("mannwhitney", lambda clave: clave[1] <= n and clave[2] >= m)
+            if anterior is None:
+                inicio, pila = 0, np.zeros((m + 1, 1))
+                pila[:, 0] = 1
+            else:
+                inicio = anterior[1]
+                pila = self._tablas[anterior][:m + 1, :m * inicio + 1].copy()
+            for j in range(inicio + 1, n + 1):
+                nueva = np.zeros((m + 1, m * j + 1))
+                nueva[:, :pila.shape[1]] = pila
+                for i in range(1, m + 1):
+                    nueva[i, j:] += nueva[i - 1, :-j]
+                pila = nueva
+            pila = self._guardar(("mannwhitney", n, m), pila)
+        return pila[m, :m * n + 1]
+
+    def wilcoxon(self, n):
+        """
+        Conteos de la distribución nula de la suma de rangos positivos de n diferencias sin empates ni ceros.
+
+        Returns:
+            Array de longitud n * (n + 1) / 2 + 1 con el número de combinaciones de signos de cada suma; suman 2**n.
+        """
+        tabla = self._obtener(("wilcoxon", n))
+        if tabla is None:
+            anterior = self._anterior("wilcoxon", lambda clave: clave[1] < n)
+            inicio, tabla = (0, np.ones(1)) if anterior is None else (anterior[1], self._tablas[anterior])
+            for j in range(inicio + 1, n + 1):
+                nueva = np.zeros(j * (j + 1) // 2 + 1)
+                nueva[:len(tabla)] = tabla
+                nueva[j:] += tabla
+                tabla = nueva
+            tabla = self._guardar(("wilcoxon", n), tabla)
+        return tabla
+
+    def limpiar(self):
+        """
+        Vacía la caché.
+        """
+        self._tablas.clear()
+        self._bytes = 0
+
+    def __len__(self):
+        return len(self._tablas)
+
+
+# caché compartida por todos los tests exactos
+distribuciones_exactas = DistribucionesExactas()
+
+
+def mannwhitney_exacto(u1, n1, n2):
+    """
+    P-valor bilateral exacto del test de Mann-Whitney sin empates, como el método exacto de `stats.mannwhitneyu`.
+
+    Params:
+        - u1: estadístico U del primer grupo.
+        - n1, n2: tamaños de los grupos.
+
+    Returns:
+        Tupla (U1, p-valor).
+    """
+    conteos = distribuciones_exactas.mannwhitney(n1, n2)
+    u = int(round(max(u1, n1 * n2 - u1)))
+    return u1, min(2 * conteos[u:].sum() / conteos.sum(), 1.0)
+
+
+def metodo_mannwhitney(n1, n2, empates):
+    """
+    Elige, como el método automático de `stats.mannwhitneyu`, si el p-valor de Mann-Whitney es exacto: cuando
+    ningún grupo está vacío, alguno tiene como mucho 8 valores y no hay empates. El resto se calcula con la
+    aproximación normal.
+
+    Params:
+        - n1, n2: tamaños de los grupos (escalares o arrays, por ejemplo uno por segmento).
+        - empates: término de empates (suma de t**3 - t).
+
+    Returns:
+        Tupla (exacto, en_tablas) de booleanos (o arrays de booleanos): en_tablas indica los exactos cuya tabla de
+        conteos no pasa de MAXIMO_CELDAS_MANNWHITNEY y salen de `mannwhitney_exacto`; los demás exactos se dejan
+        al método exacto de scipy.
+    """
+    n1, n2 = np.asarray(n1), np.asarray(n2)
+    menor = np.minimum(n1, n2)
+    exacto = (menor > 0) & (menor <= MAXIMO_EXACTO_MANNWHITNEY) & (np.asarray(empates) == 0)
+    return exacto[()], (exacto & (n1 * n2 <= MAXIMO_CELDAS_MANNWHITNEY))[()]
+
+
+def wilcoxon_exacto(suma_positivos, suma_negativos, n):
+    """
+    P-valor bilateral exacto del test de Wilcoxon sin empates ni ceros, como el método exacto de `stats.wilcoxon`.
+
+    Params:
+        - suma_positivos, suma_negativos: sumas de los rangos de las diferencias positivas y negativas.
+        - n: número de diferencias.
+
+    Returns:
+        Tupla (estadístico, p-valor), con el estadístico igual al mínimo de las dos sumas.
+    """
+    conteos = distribuciones_exactas.wilcoxon(n)
+    k = int(round(suma_positivos))
+    p_valor = 2 * min(conteos[k:].sum(), conteos[:k + 1].sum()) / conteos.sum()
+    return min(suma_positivos, suma_negativos), min(p_valor, 1.0)
@@ -0,0 +1,273 @@
+# Tratamiento de datos
+# -----------------------------------------------------------------------
+import numpy as np
+
+# Otras librerias
+# -----------------------------------------------------------------------
+import os
+import re
+
+# Para calcular las tablas, los conteos y los percentiles que se dibujan
+# -----------------------------------------------------------------------
+from .soporte_descriptiva import tablas_contingencia, densidad_2d, dibujar_densidad
+from .soporte_cuantiles import SketchCuantiles
+
+# Para repartir el trabajo entre varios procesos
+# -----------------------------------------------------------------------
+from .soporte_paralelo import abrir_pool, ejecutar_tareas, numero_procesos
+
+
+# Los gráficos se generan en dos pasos. Primero se calculan, con los datos completos, las "especificaciones" de cada
+# figura: diccionarios pequeños con los conteos ya agregados (frecuencias, tablas de contingencia, histogramas o
+# densidades 2D). Después se dibujan con el backend Agg, sin ventana ni pyplot, repartidos entre varios procesos
+# que escriben directamente los ficheros PNG o SVG. Los procesos no reciben los datos, solo las especificaciones.
+
+FORMATOS = ("png", "svg")
+
+# celdas a partir de las cuales no se escribe el número dentro de cada celda de una tabla de contingencia
+MAXIMO_ANOTACIONES = 400
+
+# cada proceso reutiliza una figura por tamaño en lugar de crear una nueva para cada gráfico
+_figuras = {}
+
+
+def _nombre_fichero(texto):
+    return re.sub(r"[^\w\-]+", "_", str(texto)).strip("_")
+
+
+def _nombres_unicos(nombres):
+    """
+    Añade un sufijo _2, _3... a los nombres de fichero repetidos (sin distinguir mayúsculas, por los sistemas de
+    ficheros que no lo hacen), para que ninguna figura sobrescriba a otra.
+    """
+    usados = set()
+    unicos = []
+    for nombre in nombres:
+        candidato, sufijo = nombre, 1
+        while candidato.lower() in usados:
+            sufijo += 1
+            candidato = f"{nombre}_{sufijo}"
+        usados.add(candidato.lower())
+        unicos.append(candidato)
+    return unicos
+
+
+def especificaciones_frecuencias(dataframe, lista_categorias):
+    """
+    Prepara un gráfico de barras con la frecuencia de cada categoría, para cada columna categórica.
+
+    Params:
+        - dataframe: DataFrame con los datos.
+        - lista_categorias: lista de columnas categóricas.
+
+    Returns:
+        Lista de especificaciones, una por columna.
+    """
+    especificaciones = []
+    for columna in lista_categorias:
+        conteos = dataframe[columna].value_counts()
+        especificaciones.append({"tipo": "frecuencias",
+                                 "nombre": f"frecuencias_{columna}",
+                                 "titulo": f"Distribución de la columna {columna}",
+                                 "categorias": conteos.index.astype(str).to_numpy(),
+                                 "conteos": conteos.to_numpy()})
+    return especificaciones
+
+
+def especificaciones_contingencia(dataframe, lista_col_categorias):
+    """
+    Prepara un mapa de calor para la tabla de contingencia de cada pareja de columnas categóricas. Las tablas se
+    calculan todas juntas con `tablas_contingencia`.
+
+    Params:
+        - dataframe: DataFrame con los datos.
+        - lista_col_categorias: lista de columnas categóricas.
+
+    Returns:
+        Lista de especificaciones, una por pareja.
+    """
+    especificaciones = []
+    for (columna_1, columna_2), (tabla, categorias_1, categorias_2) in tablas_contingencia(dataframe, lista_col_categorias).items():
+        especificaciones.append({"tipo": "contingencia",
+                                 "nombre": f"contingencia_{columna_1}_{columna_2}",
+                                 "titulo": f"Tabla de contingencia {columna_1} y {columna_2}",
+                                 "tabla": tabla,
+                                 "categorias_1": categorias_1.astype(str),
+                                 "categorias_2": categorias_2.astype(str),
+                                 "etiquetas": (columna_2, columna_1)})
+    return especificaciones
+
+
+def especificaciones_percentiles(dataframe, columnas, percentiles=[10, 25, 50, 75, 90], bins=30, metodo="exacto", error=0.01):
+    """
+    Prepara un histograma con líneas en los percentiles indicados, para cada columna numérica.
+
+    Params:
+        - dataframe: DataFrame con los datos.
+        - columnas: lista de columnas numéricas.
+        - percentiles (opcional): percentiles a marcar. Por defecto son [10, 25, 50, 75, 90].
+        - bins (opcional): número de barras del histograma. Por defecto es 30.
+        - metodo (opcional): 'exacto' o 'sketch' (percentiles aproximados con SketchCuantiles). Por defecto es 'exacto'.
+        - error (opcional): error de rango admitido en el modo 'sketch'. Por defecto es 0.01.
+
+    Returns:
+        Lista de especificaciones, una por columna.
+    """
+    if metodo not in ("exacto", "sketch"):
+        raise ValueError("Método no válido. Por favor, elige 'exacto' o 'sketch'.")
+
+    especificaciones = []
+    for columna in columnas:
+        valores = dataframe[columna].to_numpy(dtype=np.float64)
+        valores = valores[np.isfinite(valores)]
+        if metodo == "exacto":
+            valores_percentiles = np.percentile(valores, percentiles) if len(valores) else np.full(len(percentiles), np.nan)
+        else:
+            valores_percentiles = SketchCuantiles(error).actualizar(valores).percentil(percentiles)
+        conteos, bordes = np.histogram(valores, bins=bins)
+        especificaciones.append({"tipo": "percentiles",
+                                 "nombre": f"percentiles_{columna}",
+                                 "titulo": f"Histograma con Percentiles de {columna}",
+                                 "conteos": conteos,
+                                 "bordes": bordes,
+                                 "percentiles": list(percentiles),
+                                 "valores_percentiles": np.atleast_1d(valores_percentiles)})
+    return especificaciones
+
+
+def especificaciones_linealidad(dataframe, lista_combinacion_columnas, bins=100):
+    """
+    Prepara la densidad 2D (con la media de y por tramo de x) de cada pareja de columnas numéricas.
+
+    Params:
+        - dataframe: DataFrame con los datos.
+        - lista_combinacion_columnas: lista de tuplas (columna_x, columna_y).
+        - bins (opcional): número de celdas por eje. Por defecto es 100.
+
+    Returns:
+        Lista de especificaciones, una por pareja.
+    """
+    especificaciones = []
+    for columna_x, columna_y in lista_combinacion_columnas:
+        conteos, bordes_x, bordes_y = densidad_2d(dataframe[columna_x], dataframe[columna_y], bins)
+        especificaciones.append({"tipo": "densidad",
+                                 "nombre": f"linealidad_{columna_x}_{columna_y}",
+                                 "titulo": f"Relación entre {columna_x} y {columna_y}",
+                                 "conteos": conteos,
+                                 "bordes_x": bordes_x,
+                                 "bordes_y": bordes_y,
+                                 "etiquetas": (columna_x, columna_y)})
+    return especificaciones
+
+
+def _dibujar_frecuencias(ax, especificacion):
+    ax.bar(especificacion["categorias"], especificacion["conteos"], color="steelblue", edgecolor="black")
+    ax.set_ylabel("count")
+    ax.tick_params(axis="x", labelrotation=45)
+
+
+def _dibujar_contingencia(ax, especificacion):
+    tabla = especificacion["tabla"]
+    imagen = ax.imshow(tabla, cmap="YlGnBu", aspect="auto")
+    ax.figure.colorbar(imagen, ax=ax)
+    ax.set_xticks(np.arange(tabla.shape[1]), especificacion["categorias_2"], rotation=45)
+    ax.set_yticks(np.arange(tabla.shape[0]), especificacion["categorias_1"])
+    ax.set_xlabel(especificacion["etiquetas"][0])
+    ax.set_ylabel(especificacion["etiquetas"][1])
+    if tabla.size <= MAXIMO_ANOTACIONES:
+        umbral = (tabla.min() + tabla.max()) / 2
+        for (i, j), valor in np.ndenumerate(tabla):
+            ax.text(j, i, valor, ha="center", va="center", color="white" if valor > umbral else "black")
+
+
+def _dibujar_percentiles(ax, especificacion):
+    bordes = especificacion["bordes"]
+    ax.bar(bordes[:-1], especificacion["conteos"], width=np.diff(bordes), align="edge", color="orange", edgecolor="black")
+    for percentil, valor in zip(especificacion["percentiles"], especificacion["valores_percentiles"]):
+        ax.axvline(valor, color="green", linestyle="--", label=f"{percentil} percentil")
+    ax.set_xlabel("Valor")
+    ax.set_ylabel("Frecuencia")
+    ax.legend()
+
+
+def _dibujar_densidad(ax, especificacion):
+    dibujar_densidad(ax, especificacion["conteos"], especificacion["bordes_x"], especificacion["bordes_y"])
+    ax.set_xlabel(especificacion["etiquetas"][0])
+    ax.set_ylabel(especificacion["etiquetas"][1])
+
+
+DIBUJOS = {"frecuencias": _dibujar_frecuencias,
+           "contingencia": _dibujar_contingencia,
+           "percentiles": _dibujar_percentiles,
+           "densidad": _dibujar_densidad}
+
+
+def _figura(tamaño):
+    """
+    Devuelve la figura de este proceso para el tamaño indicado, vacía. Se crea con `Figure` directamente,
+    sin pyplot, así que no depende del backend interactivo ni se queda registrada en memoria.
+    """
+    from matplotlib.figure import Figure
+
+    figura = _figuras.get(tamaño)
+    if figura is None:
+        figura = _figuras[tamaño] = Figure(figsize=tamaño)
+    else:
+        figura.clear()
+    return figura
+
+
+def _renderizar_lote(especificaciones, rutas, dpi):
+    """
+    Dibuja y guarda una lista de especificaciones en este proceso, reutilizando las figuras.
+    """
+    for especificacion, ruta in zip(especificaciones, rutas):
+        figura = _figura(tuple(especificacion.get("tamaño", (10, 6))))
+        ax = figura.add_subplot()
+        DIBUJOS[especificacion["tipo"]](ax, especificacion)
+        ax.set_title(especificacion["titulo"])
+        figura.tight_layout()
+        figura.savefig(ruta, dpi=dpi, format=os.path.splitext(ruta)[1][1:])
+    return rutas
+
+
+def renderizar(especificaciones, directorio, formato="png", dpi=100, n_procesos=None):
+    """
+    Dibuja las figuras y las guarda en ficheros, sin mostrarlas. Las especificaciones se reparten en lotes entre
+    los procesos; cada proceso dibuja con el backend Agg y reutiliza la misma figura para todos sus gráficos.
+
+    Params:
+        - especificaciones: lista de especificaciones (las de las funciones `especificaciones_*`, que se pueden
+          concatenar). Cada una puede llevar una clave "tamaño" con el tamaño de la figura en pulgadas.
+        - directorio: carpeta donde se guardan los ficheros; se crea si no existe.
+        - formato (opcional): 'png' o 'svg'. Por defecto es 'png'.
+        - dpi (opcional): resolución de los PNG. Por defecto es 100.
+        - n_procesos (opcional): número de procesos. Si es None se usan todos los núcleos.
+
+    Returns:
+        Lista con la ruta de cada fichero, en el mismo orden que las especificaciones. Si dos especificaciones
+        dan el mismo nombre de fichero, a la segunda se le añade un sufijo (_2, _3...).
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato no válido. Por favor, elige uno de {FORMATOS}.")
+    os.makedirs(directorio, exist_ok=True)
+    nombres = _nombres_unicos([_nombre_fichero(especificacion["nombre"]) for especificacion in especificaciones])
+    rutas = [os.path.join(directorio, f"{nombre}.{formato}") for nombre in nombres]
+    if not especificaciones:
+        return rutas
+
+    # varios lotes por proceso para repartir bien la carga, pero con muchos gráficos por lote para reutilizar la figura
+    n_procesos = min(numero_procesos(n_procesos), len(especificaciones))
+    n_lotes = min(len(especificaciones), n_procesos * 4)
+    tareas = [(especificaciones[inicio::n_lotes], rutas[inicio::n_lotes], dpi) for inicio in range(n_lotes)]
+
+    pool = abrir_pool({}, n_procesos)
+    try:
+        ejecutar_tareas(pool, _renderizar_lote, tareas)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        else:
+            # en el proceso actual las figuras no se guardan entre llamadas
+            _figuras.clear()
+    return rutas
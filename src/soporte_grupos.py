@@ -0,0 +1,451 @@
+# Para importar las librerías pesadas solo cuando se usan
+# -----------------------------------------------------------------------
+from .soporte_perezoso import importar_perezoso
+
+# Tratamiento de datos
+# -----------------------------------------------------------------------
+import numpy as np
+pd = importar_perezoso("pandas")
+
+# Para pruebas estadísticas
+# -----------------------------------------------------------------------
+stats = importar_perezoso("scipy.stats")
+
+# Otras librerias
+# -----------------------------------------------------------------------
+from collections import OrderedDict
+
+
+# tests que comparan solo la categoría de control con la de test
+TESTS_PAREJA = ("z", "t", "welch", "mannwhitneyu")
+
+
+def factorizar(serie):
+    """
+    Convierte una columna categórica en códigos enteros en un único paso.
+
+    Params:
+        - serie: pandas.Series (o array) con las categorías.
+
+    Returns:
+        Tupla (codigos, categorias). Los códigos son enteros en el orden de aparición de las categorías
+        (el mismo orden que devuelve `unique()`) y valen -1 para los nulos.
+    """
+    codigos, categorias = pd.factorize(serie, sort=False)
+    # con menos de 2**15 categorías usamos int16, para el que numpy ordena de forma estable por radix sort en O(n)
+    tipo = np.int16 if len(categorias) < 2**15 else np.int64
+    return codigos.astype(tipo, copy=False), np.asarray(categorias)
+
+
+class GruposContiguos:
+    """
+    Guarda una columna de respuesta ordenada por grupo, de forma que cada grupo es un bloque contiguo
+    del array y se puede recuperar como una vista de numpy sin copiar datos.
+
+    Attributes:
+        - categorias: array con las categorías en orden de aparición.
+        - valores: array de numpy con todos los valores, ordenados por grupo.
+        - offsets: array de enteros de tamaño k+1; el grupo i ocupa valores[offsets[i]:offsets[i+1]].
+    """
+
+    def __init__(self, categorias, valores, offsets):
+        self.categorias = categorias
+        self.valores = valores
+        self.offsets = offsets
+        self._posiciones = {categoria: indice for indice, categoria in enumerate(categorias.tolist())}
+
+    @classmethod
+    def desde_codigos(cls, codigos, categorias, valores):
+        """
+        Construye los grupos a partir de códigos ya factorizados.
+
+        Params:
+            - codigos: array de enteros con el grupo de cada fila (-1 para los nulos, que se descartan).
+            - categorias: array con el nombre de cada código.
+            - valores: array (1D, o 2D con una columna por métrica) con los valores de respuesta.
+
+        Returns:
+            Una instancia de GruposContiguos.
+        """
+        validos = codigos >= 0
+        if not validos.all():
+            codigos = codigos[validos]
+            valores = valores[validos]
+
+        tamaños = np.bincount(codigos, minlength=len(categorias))
+        offsets = np.zeros(len(categorias) + 1, dtype=np.int64)
+        np.cumsum(tamaños, out=offsets[1:])
+
+        # una única ordenación estable: cada grupo queda contiguo y conserva el orden original de sus filas
+        orden = np.argsort(codigos, kind="stable")
+        return cls(categorias, valores[orden], offsets)
+
+    @classmethod
+    def desde_dataframe(cls, dataframe, columna_grupo, columna_respuesta):
+        """
+        Construye los grupos de una o varias columnas de respuesta con un único recorrido del DataFrame.
+
+        Params:
+            - dataframe: DataFrame que contiene los datos.
+            - columna_grupo: Nombre de la columna que contiene las categorías.
+            - columna_respuesta: Nombre (o lista de nombres) de la columna de respuesta.
+
+        Returns:
+            Una instancia de GruposContiguos.
+        """
+        codigos, categorias = factorizar(dataframe[columna_grupo])
+        valores = dataframe[columna_respuesta].to_numpy()
+        return cls.desde_codigos(codigos, categorias, valores)
+
+    def __len__(self):
+        return len(self.categorias)
+
+    def __iter__(self):
+        return iter(self.categorias.tolist())
+
+    def __contains__(self, categoria):
+        return categoria in self._posiciones
+
+    def __getitem__(self, categoria):
+        indice = self.indice(categoria)
+        return self.valores[self.offsets[indice]:self.offsets[indice + 1]]
+
+    def indice(self, categoria):
+        """
+        Devuelve la posición de una categoría.
+
+        Params:
+            - categoria: Valor de la categoría.
+
+        Returns:
+            Entero con la posición de la categoría en `categorias`.
+        """
+        try:
+            return self._posiciones[categoria]
+        except KeyError:
+            raise KeyError(f"La categoría {categoria} no existe en los datos.") from None
+
+    @property
+    def tamaños(self):
+        """
+        Número de filas de cada grupo, en el orden de `categorias`.
+        """
+        return np.diff(self.offsets)
+
+    def seleccionar(self, categorias=None):
+        """
+        Devuelve las vistas de los grupos pedidos.
+
+        Params:
+            - categorias (opcional): Lista de categorías. Si es None se devuelven todas.
+
+        Returns:
+            Lista de arrays de numpy (vistas, sin copia), uno por categoría.
+        """
+        if categorias is None:
+            categorias = self.categorias.tolist()
+        return [self[categoria] for categoria in categorias]
+
+    def subconjunto(self, categorias):
+        """
+        Crea unos grupos nuevos solo con las categorías pedidas, en el orden indicado.
+
+        Params:
+            - categorias: Lista de categorías a conservar.
+
+        Returns:
+            Una instancia de GruposContiguos (los valores se copian una vez, concatenando los bloques).
+        """
+        indices = [self.indice(categoria) for categoria in categorias]
+        valores = np.concatenate([self.valores[self.offsets[i]:self.offsets[i + 1]] for i in indices])
+        offsets = np.zeros(len(indices) + 1, dtype=np.int64)
+        np.cumsum(self.tamaños[indices], out=offsets[1:])
+        return GruposContiguos(self.categorias[indices], valores, offsets)
+
+
+def sumas_por_grupo(valores, offsets):
+    """
+    Suma por bloques contiguos las filas de un array (1D o 2D), sin bucles de Python.
+
+    Params:
+        - valores: array de numpy ordenado por grupo.
+        - offsets: límites de los grupos, de tamaño k+1.
+
+    Returns:
+        Array con una fila por grupo (los grupos vacíos suman 0).
+    """
+    tamaños = np.diff(offsets)
+    forma = (len(tamaños),) + valores.shape[1:]
+    sumas = np.zeros(forma, dtype=np.result_type(valores.dtype, np.float64))
+    no_vacios = tamaños > 0
+    if no_vacios.any():
+        # reduceat no admite bloques vacíos, así que solo le pasamos los que tienen filas
+        sumas[no_vacios] = np.add.reduceat(valores, offsets[:-1][no_vacios], axis=0)
+    return sumas
+
+
+def rangos_columnas(valores):
+    """
+    Calcula los rangos (promediando los empates) de cada columna de una matriz y el término de empates
+    que necesitan las correcciones de Kruskal-Wallis y Mann-Whitney, todo de forma vectorizada.
+
+    Params:
+        - valores: array de numpy de forma (n, m), una columna por métrica.
+
+    Returns:
+        Tupla (rangos, empates): los rangos con la misma forma que `valores` y, por columna, la suma de t**3 - t
+        sobre todos los grupos de empates de tamaño t.
+    """
+    n, m = valores.shape
+    orden = np.argsort(valores, axis=0, kind="stable")
+    ordenados = np.take_along_axis(valores, orden, axis=0)
+
+    # recorremos todas las columnas a la vez como un único vector, marcando dónde empieza cada racha de empates
+    planos = ordenados.T.ravel()
+    inicio = np.ones(n * m, dtype=bool)
+    inicio[1:] = planos[1:] != planos[:-1]
+    inicio[::n] = True
+    posiciones = np.flatnonzero(inicio)
+    longitudes = np.diff(np.append(posiciones, n * m))
+
+    # el rango medio de una racha que ocupa las posiciones [a, a + t) de su columna es a + (t + 1) / 2
+    rango_medio = (posiciones % n) + (longitudes + 1) / 2
+    rangos_ordenados = np.repeat(rango_medio, longitudes).reshape(m, n).T
+
+    rangos = np.empty((n, m), dtype=np.float64)
+    np.put_along_axis(rangos, orden, rangos_ordenados, axis=0)
+
+    t = longitudes.astype(np.float64)
+    empates = np.bincount(posiciones // n, weights=t**3 - t, minlength=m)
+    return rangos, empates
+
+
+def momentos_por_grupo(valores, offsets):
+    """
+    Calcula tamaño, media y suma de cuadrados centrada (M2) de cada grupo y columna.
+
+    Params:
+        - valores: array de numpy (n, m) ordenado por grupo.
+        - offsets: límites de los grupos, de tamaño k+1.
+
+    Returns:
+        Tupla (n, medias, m2) con arrays de forma (k,) y (k, m).
+    """
+    tamaños = np.diff(offsets)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        medias = sumas_por_grupo(valores, offsets) / tamaños[:, None]
+    desviaciones = valores - np.repeat(medias, tamaños, axis=0)
+    m2 = sumas_por_grupo(desviaciones**2, offsets)
+    return tamaños, medias, m2
+
+
+def estadistico_kruskal(sumas_rangos, tamaños, empates):
+    """
+    Calcula el estadístico H de Kruskal-Wallis (corregido por empates) y su p-valor a partir de las sumas de rangos.
+
+    Params:
+        - sumas_rangos: array (k,) o (k, m) con la suma de rangos de cada grupo.
+        - tamaños: array (k,) con el tamaño de cada grupo, o (k, m) si cambia de una columna a otra.
+        - empates: término de empates (suma de t**3 - t), uno por columna.
+
+    Returns:
+        Tupla (H, p-valor).
+    """
+    tamaños = np.asarray(tamaños, dtype=np.float64)
+    n, k = tamaños.sum(axis=0), len(tamaños)
+    if np.ndim(sumas_rangos) == 2 and tamaños.ndim == 1:
+        tamaños = tamaños[:, None]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        h = 12 / (n * (n + 1)) * (np.asarray(sumas_rangos)**2 / tamaños).sum(axis=0) - 3 * (n + 1)
+        h = h / (1 - np.asarray(empates) / (n**3 - n))
+    return h, stats.chi2.sf(h, k - 1)
+
+
+def estadistico_mannwhitney(suma_rangos_1, n1, n2, empates):
+    """
+    Calcula el estadístico U del primer grupo y el p-valor bilateral con la aproximación normal, corrección de
+    continuidad y de empates (el método asintótico de `stats.mannwhitneyu`).
+
+    Params:
+        - suma_rangos_1: suma de rangos del primer grupo (escalar o array por columna).
+        - n1, n2: tamaños de los grupos.
+        - empates: término de empates (suma de t**3 - t).
+
+    Returns:
+        Tupla (U1, p-valor).
+    """
+    n = n1 + n2
+    u1 = suma_rangos_1 - n1 * (n1 + 1) / 2
+    u_max = np.maximum(u1, n1 * n2 - u1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        sigma = np.sqrt(n1 * n2 / 12 * ((n + 1) - empates / (n * (n - 1))))
+        z = (u_max - n1 * n2 / 2 - 0.5) / sigma
+    return u1, np.clip(2 * stats.norm.sf(z), 0, 1)
+
+
+def huella_array(valores):
+    """
+    Calcula una huella de 64 bits del contenido de un array, en O(n) y sin ordenar.
+
+    Params:
+        - valores: array de numpy.
+
+    Returns:
+        Tupla (tamaño, tipo, huella) que sirve como clave de caché.
+    """
+    hashes = pd.util.hash_array(np.asarray(valores).ravel())
+    # se pondera por la posición para que la huella dependa también del orden de las filas
+    with np.errstate(over="ignore"):
+        huella = np.bitwise_xor.reduce(hashes * (np.arange(len(hashes), dtype=np.uint64) * np.uint64(0x9E3779B97F4A7C15) + np.uint64(1)))
+    return valores.shape, str(valores.dtype), int(huella)
+
+
+def _rangos_ordenados(ordenados):
+    """
+    Rangos medios y término de empates de un array ya ordenado, en O(n).
+    """
+    n = len(ordenados)
+    inicio = np.ones(n, dtype=bool)
+    inicio[1:] = ordenados[1:] != ordenados[:-1]
+    posiciones = np.flatnonzero(inicio)
+    longitudes = np.diff(np.append(posiciones, n))
+    rangos = np.repeat(posiciones + (longitudes + 1) / 2, longitudes)
+    t = longitudes.astype(np.float64)
+    return rangos, (t**3 - t).sum()
+
+
+class RangosAgrupados:
+    """
+    Orden global de una columna de respuesta separada en grupos. Con él se obtienen en O(n), sin volver a ordenar,
+    los rangos combinados y el término de empates de cualquier subconjunto de grupos: todos (Kruskal-Wallis)
+    o una pareja (Mann-Whitney).
+
+    Attributes:
+        - valores_ordenados: los valores de todos los grupos, ordenados de menor a mayor.
+        - codigos_ordenados: el grupo (posición en `categorias`) de cada valor ordenado.
+        - grupos_con_nulos: conjunto con los grupos que tienen algún NaN.
+    """
+
+    def __init__(self, grupos):
+        valores = np.asarray(grupos.valores, dtype=np.float64)
+        codigos = np.repeat(np.arange(len(grupos), dtype=np.int32), grupos.tamaños)
+        orden = np.argsort(valores, kind="stable")
+        self.valores_ordenados = valores[orden]
+        self.codigos_ordenados = codigos[orden]
+        self.n_grupos = len(grupos)
+        self.grupos_con_nulos = set(self.codigos_ordenados[np.isnan(self.valores_ordenados)].tolist())
+
+    @property
+    def nbytes(self):
+        return self.valores_ordenados.nbytes + self.codigos_ordenados.nbytes
+
+    def sumas_rangos(self, indices):
+        """
+        Rangos combinados de los grupos indicados.
+
+        Params:
+            - indices: lista con las posiciones de los grupos a comparar.
+
+        Returns:
+            Tupla (sumas de rangos, tamaños, término de empates), en el orden de `indices`.
+        """
+        seleccionados = np.zeros(self.n_grupos, dtype=bool)
+        seleccionados[indices] = True
+        mascara = seleccionados[self.codigos_ordenados]
+        codigos = self.codigos_ordenados[mascara]
+        rangos, empates = _rangos_ordenados(self.valores_ordenados[mascara])
+        sumas = np.bincount(codigos, weights=rangos, minlength=self.n_grupos)[indices]
+        tamaños = np.bincount(codigos, minlength=self.n_grupos)[indices]
+        return sumas, tamaños, empates
+
+
+class RangosSignados:
+    """
+    Rangos con signo de las diferencias entre dos grupos emparejados (test de Wilcoxon), con los ceros descartados
+    como hace scipy por defecto. Solo guarda las sumas de rangos positivos y negativos, el número de diferencias
+    no nulas y el término de empates, así que ocupa muy poco en la caché.
+    """
+
+    def __init__(self, primero, segundo):
+        diferencias = np.asarray(primero, dtype=np.float64) - np.asarray(segundo, dtype=np.float64)
+        self.n_total = len(diferencias)
+        self.con_nulos = bool(np.isnan(diferencias).any())
+        diferencias = diferencias[diferencias != 0]
+        orden = np.argsort(np.abs(diferencias), kind="stable")
+        rangos, self.empates = _rangos_ordenados(np.abs(diferencias)[orden])
+        positivos = diferencias[orden] > 0
+        self.n = len(diferencias)
+        self.suma_positivos = rangos[positivos].sum()
+        self.suma_negativos = rangos[~positivos].sum()
+        self.nbytes = 64
+
+    def aproximacion_normal(self):
+        """
+        Estadístico (mínimo de las sumas de rangos) y p-valor bilateral con la aproximación normal y corrección
+        por empates, como el método asintótico de `stats.wilcoxon`.
+        """
+        n = self.n
+        media = n * (n + 1) / 4
+        with np.errstate(invalid="ignore", divide="ignore"):
+            error = np.sqrt((n * (n + 1) * (2 * n + 1) - self.empates / 2) / 24)
+            z = (self.suma_positivos - media) / error
+        return min(self.suma_positivos, self.suma_negativos), 2 * stats.norm.sf(abs(z))
+
+
+class CacheRangos:
+    """
+    Caché LRU acotada en memoria para los rangos de las pruebas no paramétricas. Las entradas se identifican por
+    la huella de los datos y la columna, de forma que varias instancias (o varios tests sobre la misma instancia)
+    reutilizan la misma ordenación. Cuando se supera `max_bytes` se descartan las entradas usadas hace más tiempo.
+
+    Attributes:
+        - max_bytes: memoria máxima ocupada por las entradas.
+        - aciertos, fallos: contadores de uso de la caché.
+    """
+
+    def __init__(self, max_bytes=512 * 2**20):
+        self.max_bytes = max_bytes
+        self.aciertos = 0
+        self.fallos = 0
+        self._entradas = OrderedDict()
+        self._bytes = 0
+
+    def obtener(self, clave, calcular):
+        """
+        Devuelve la entrada de `clave`, calculándola con `calcular()` si no está en la caché.
+
+        Params:
+            - clave: clave hashable.
+            - calcular: función sin argumentos que calcula la entrada (un objeto con atributo `nbytes`).
+
+        Returns:
+            La entrada.
+        """
+        if clave in self._entradas:
+            self.aciertos += 1
+            self._entradas.move_to_end(clave)
+            return self._entradas[clave]
+
+        self.fallos += 1
+        entrada = calcular()
+        self._entradas[clave] = entrada
+        self._bytes += entrada.nbytes
+        while self._bytes > self.max_bytes and len(self._entradas) > 1:
+            _, descartada = self._entradas.popitem(last=False)
+            self._bytes -= descartada.nbytes
+        return entrada
+
+    def limpiar(self):
+        """
+        Vacía la caché.
+        """
+        self._entradas.clear()
+        self._bytes = 0
+
+    def __len__(self):
+        return len(self._entradas)
+
+
+# caché compartida por todas las instancias de Pruebas_no_parametricas
+cache_rangos = CacheRangos()
+
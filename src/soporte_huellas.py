@@ -0,0 +1,301 @@
+# Para importar las librerías pesadas solo cuando se usan
+# -----------------------------------------------------------------------
+from .soporte_perezoso import importar_perezoso
+
+# Tratamiento de datos
+# -----------------------------------------------------------------------
+import numpy as np
+pd = importar_perezoso("pandas")
+
+# Para leer las columnas clave de cualquier formato
+# -----------------------------------------------------------------------
+from .soporte_tablas import tipo_tabla, numero_filas, a_pandas
+
+# Otras librerias
+# -----------------------------------------------------------------------
+import math
+import os
+
+
+# Cada fila se resume en una huella de 64 bits calculada a partir de sus columnas clave con el hash de pandas
+# (columna a columna y vectorizado, sin construir una tabla de filas completas). La huella no depende del formato
+# de entrada (pandas, Polars o PyArrow) ni del trozo en que llegue la fila, así que el índice se puede ir ampliando
+# día a día y guardar en disco para contar duplicados frente al histórico. Dos filas distintas solo comparten huella
+# con una probabilidad del orden de n**2 / 2**65 (menos de 1 entre 1000 con cien millones de filas).
+
+METODOS_INDICE = ("exacto", "bloom")
+
+
+def huellas_filas(datos, columnas=None):
+    """
+    Calcula la huella de 64 bits de cada fila.
+
+    Params:
+        - datos: DataFrame de pandas o de Polars, LazyFrame de Polars o tabla de PyArrow.
+        - columnas (opcional): columnas clave. Si es None se usan todas.
+
+    Returns:
+        Array uint64 con una huella por fila. Las filas iguales tienen la misma huella, y todos los nulos (None,
+        NaN, NaT o los nulos de Polars y PyArrow) cuentan como el mismo valor.
+    """
+    tabla = a_pandas(datos, columnas)
+    flotantes = tabla.select_dtypes(include="floating").columns
+    if len(flotantes):
+        # para duplicated() 0.0 y -0.0 son el mismo valor, pero su hash es distinto
+        tabla = tabla.copy(deep=False)
+        for columna in flotantes:
+            tabla[columna] = tabla[columna] + 0.0
+    return pd.util.hash_pandas_object(tabla, index=False).to_numpy(dtype=np.uint64)
+
+
+def trozos_filas(datos, tamaño_chunk=100_000, columnas=None):
+    """
+    Recorre los datos en trozos de como mucho `tamaño_chunk` filas, sin copiarlos (salvo un LazyFrame de Polars,
+    del que solo se leen las columnas indicadas).
+    """
+    tipo = tipo_tabla(datos)
+    if tipo == "polars_lazy":
+        datos = (datos if columnas is None else datos.select(list(columnas))).collect()
+    for inicio in range(0, numero_filas(datos), tamaño_chunk):
+        yield datos.iloc[inicio:inicio + tamaño_chunk] if tipo == "pandas" else datos.slice(inicio, tamaño_chunk)
+
+
+def _buscar(ordenadas, huellas):
+    """
+    Posición de inserción de cada huella en un array ordenado y si ya estaba en él.
+    """
+    posiciones = np.searchsorted(ordenadas, huellas)
+    if not len(ordenadas):
+        return posiciones, np.zeros(len(huellas), dtype=bool)
+    return posiciones, ordenadas[np.minimum(posiciones, len(ordenadas) - 1)] == huellas
+
+
+def _insertar(ordenadas, posiciones, nuevas):
+    """
+    Inserta en un array ordenado unas huellas nuevas, ya ordenadas, en sus posiciones de `np.searchsorted`, en O(n)
+    (`np.insert` volvería a ordenar las posiciones).
+    """
+    resultado = np.empty(len(ordenadas) + len(nuevas), dtype=np.uint64)
+    destino = posiciones + np.arange(len(nuevas))
+    antiguas = np.ones(len(resultado), dtype=bool)
+    antiguas[destino] = False
+    resultado[destino] = nuevas
+    resultado[antiguas] = ordenadas
+    return resultado
+
+
+class IndiceHuellas:
+    """
+    Índice compacto de huellas de filas para detectar duplicados de forma incremental, trozo a trozo y frente a los
+    datos de días anteriores.
+
+    - 'exacto': huellas distintas ordenadas (8 bytes por fila). Las huellas nuevas se guardan en memoria en unos pocos
+      tramos ordenados, de tamaños crecientes: cada lote añade un tramo y los dos últimos se fusionan mientras el
+      anterior no sea más del doble que el último (como en un árbol LSM), así que cada huella se fusiona O(log n)
+      veces en lugar de reescribir todo el índice en cada lote. Si se abre desde un fichero, el histórico se lee como
+      memoria mapeada y las huellas nuevas se quedan aparte hasta llamar a `guardar`.
+    - 'bloom': filtro de Bloom particionado (unos 1.8 bytes por fila con un error del 0.1%), con un array de bits por
+      función hash. No guarda las huellas y puede dar falsos positivos (filas nuevas contadas como duplicadas) con
+      probabilidad `error`, pero nunca falsos negativos. Si se abre desde un fichero, los bits se actualizan en él.
+
+    Attributes:
+        - columnas: columnas clave (None para todas).
+        - metodo: 'exacto' o 'bloom'.
+        - ruta: fichero .npy del índice, o None si solo está en memoria.
+    """
+
+    def __init__(self, columnas=None, metodo="exacto", capacidad=10_000_000, error=0.001, ruta=None):
+        """
+        Crea un índice vacío o abre uno guardado.
+
+        Params:
+            - columnas (opcional): columnas clave de las huellas. Si es None se usan todas.
+            - metodo (opcional): 'exacto' o 'bloom'. Por defecto es 'exacto'.
+            - capacidad (opcional): número de filas distintas previstas, para dimensionar el filtro de Bloom.
+              Por defecto es 10 millones.
+            - error (opcional): probabilidad de falso positivo del filtro de Bloom a plena capacidad. Por defecto es 0.001.
+            - ruta (opcional): fichero .npy del índice. Si existe se abre con memoria mapeada.
+        """
+        if metodo not in METODOS_INDICE:
+            raise ValueError(f"Método no válido. Por favor, elige uno de {METODOS_INDICE}.")
+        self.columnas = None if columnas is None else list(columnas)
+        self.metodo = metodo
+        self.ruta = ruta
+        existe = ruta is not None and os.path.exists(ruta)
+
+        if metodo == "exacto":
+            self._historico = np.load(ruta, mmap_mode="r") if existe else np.empty(0, dtype=np.uint64)
+            self._tramos = []
+            if self._historico.ndim != 1:
+                raise ValueError(f"El fichero {ruta} no contiene un índice exacto.")
+        elif existe:
+            self._bits = np.load(ruta, mmap_mode="r+")
+            if self._bits.ndim != 2:
+                raise ValueError(f"El fichero {ruta} no contiene un filtro de Bloom.")
+        else:
+            # tamaño óptimo: m = -n·ln(error) / ln(2)**2 bits repartidos entre k = log2(1 / error) funciones hash
+            k = max(1, round(-math.log2(error)))
+            bits = -capacidad * math.log(error) / math.log(2)**2
+            self._bits = np.zeros((k, max(1, math.ceil(bits / k / 8))), dtype=np.uint8)
+            if ruta is not None:
+                np.save(ruta, self._bits)
+                self._bits = np.load(ruta, mmap_mode="r+")
+
+    def _posiciones(self, huellas):
+        """
+        Bit de cada huella en cada partición del filtro de Bloom, por doble hash: h1 + i·h2.
+        """
+        k, bytes_particion = self._bits.shape
+        h1, h2 = huellas & np.uint64(0xFFFFFFFF), (huellas >> np.uint64(32)) | np.uint64(1)
+        with np.errstate(over="ignore"):
+            return [(h1 + np.uint64(i) * h2) % np.uint64(bytes_particion * 8) for i in range(k)]
+
+    def contiene(self, huellas):
+        """
+        Comprueba qué huellas están ya en el índice.
+
+        Params:
+            - huellas: array uint64 (por ejemplo de `huellas_filas`). Si vienen ordenadas la búsqueda es más rápida.
+
+        Returns:
+            Array booleano con True para las huellas ya vistas.
+        """
+        huellas = np.asarray(huellas, dtype=np.uint64)
+        if self.metodo == "exacto":
+            vistas = _buscar(self._historico, huellas)[1]
+            for tramo in self._tramos:
+                vistas |= _buscar(tramo, huellas)[1]
+            return vistas
+        vistas = np.ones(len(huellas), dtype=bool)
+        for particion, posiciones in zip(self._bits, self._posiciones(huellas)):
+            vistas &= ((particion[posiciones >> np.uint64(3)] >> (posiciones & np.uint64(7)).astype(np.uint8)) & 1) == 1
+        return vistas
+
+    def añadir(self, huellas):
+        """
+        Añade un lote de huellas al índice.
+
+        Params:
+            - huellas: array uint64.
+
+        Returns:
+            Array booleano con True para las filas duplicadas: las que ya estaban en el índice o repiten una fila
+            anterior del mismo lote.
+        """
+        huellas = np.asarray(huellas, dtype=np.uint64)
+        # una sola ordenación da las huellas distintas del lote; en cada racha de huellas iguales, la primera fila
+        # es la de menor posición (la ordenación no estable es unas cuatro veces más rápida)
+        orden = np.argsort(huellas)
+        ordenadas = huellas[orden]
+        inicio = np.ones(len(huellas), dtype=bool)
+        inicio[1:] = ordenadas[1:] != ordenadas[:-1]
+        unicas = ordenadas[inicio]
+        primera = np.zeros(len(huellas), dtype=bool)
+        if len(huellas):
+            primera[np.minimum.reduceat(orden, np.flatnonzero(inicio))] = True
+
+        if self.metodo == "exacto":
+            en_indice = self.contiene(unicas)
+            self._añadir_tramo(unicas[~en_indice])
+        else:
+            en_indice = self.contiene(unicas)
+            for particion, posiciones in zip(self._bits, self._posiciones(unicas[~en_indice])):
+                np.bitwise_or.at(particion, posiciones >> np.uint64(3),
+                                 np.left_shift(1, (posiciones & np.uint64(7)).astype(np.uint8)).astype(np.uint8))
+
+        duplicadas = np.empty(len(huellas), dtype=bool)
+        duplicadas[orden] = en_indice[np.cumsum(inicio) - 1]
+        return duplicadas | ~primera
+
+    def _añadir_tramo(self, nuevas):
+        """
+        Añade un tramo de huellas ordenadas que no están en el índice y fusiona los últimos tramos mientras el
+        anterior no sea más del doble que el último.
+        """
+        if not len(nuevas):
+            return
+        self._tramos.append(nuevas)
+        while len(self._tramos) > 1 and len(self._tramos[-2]) <= 2 * len(self._tramos[-1]):
+            ultimo = self._tramos.pop()
+            anterior = self._tramos.pop()
+            self._tramos.append(_insertar(anterior, np.searchsorted(anterior, ultimo), ultimo))
+
+    def actualizar(self, datos, tamaño_chunk=100_000):
+        """
+        Calcula las huellas de las columnas clave de los datos, trozo a trozo, y las añade al índice.
+
+        Params:
+            - datos: DataFrame de pandas o de Polars, LazyFrame de Polars o tabla de PyArrow.
+            - tamaño_chunk (opcional): filas por trozo; acota la memoria de las huellas. Por defecto es 100000.
+
+        Returns:
+            Número de filas duplicadas (dentro de los datos o frente a lo que ya había en el índice).
+        """
+        duplicados = 0
+        for trozo in trozos_filas(datos, tamaño_chunk, self.columnas):
+            duplicados += int(self.añadir(huellas_filas(trozo, self.columnas)).sum())
+        return duplicados
+
+    def guardar(self, ruta=None):
+        """
+        Guarda el índice en un fichero .npy (y lo vuelve a abrir con memoria mapeada desde él).
+
+        Params:
+            - ruta (opcional): fichero de destino. Si es None se usa el del índice.
+        """
+        ruta = self.ruta if ruta is None else ruta
+        if ruta is None:
+            raise ValueError("El índice no tiene fichero: indica una ruta.")
+        if self.metodo == "bloom":
+            if isinstance(self._bits, np.memmap) and ruta == self.ruta:
+                self._bits.flush()
+            else:
+                np.save(ruta, self._bits)
+                self._bits = np.load(ruta, mmap_mode="r+")
+        else:
+            # todas las partes ya están ordenadas y no comparten huellas
+            todas = np.asarray(self._historico)
+            for tramo in self._tramos:
+                todas = _insertar(todas, np.searchsorted(todas, tramo), tramo)
+            self._historico = None
+            temporal = f"{ruta}.tmp.npy"
+            np.save(temporal, todas)
+            os.replace(temporal, ruta)
+            self._historico = np.load(ruta, mmap_mode="r")
+            self._tramos = []
+        self.ruta = ruta
+
+    @property
+    def nbytes(self):
+        if self.metodo == "bloom":
+            return self._bits.nbytes
+        return self._historico.nbytes + sum(tramo.nbytes for tramo in self._tramos)
+
+    def __len__(self):
+        """
+        Número de huellas distintas del índice (en el filtro de Bloom, estimado a partir de los bits activos).
+        """
+        if self.metodo == "exacto":
+            return len(self._historico) + sum(len(tramo) for tramo in self._tramos)
+        bits = self._bits.shape[1] * 8
+        activos = np.unpackbits(self._bits, axis=1).sum(axis=1, dtype=np.int64)
+        if (activos == bits).any():
+            return int(np.iinfo(np.int64).max)
+        return int(round(np.mean(-bits * np.log1p(-activos / bits))))
+
+
+def contar_duplicados(datos, indice=None, tamaño_chunk=100_000):
+    """
+    Cuenta las filas duplicadas con un índice de huellas, trozo a trozo y sin comparar filas completas.
+
+    Params:
+        - datos: DataFrame de pandas o de Polars, LazyFrame de Polars o tabla de PyArrow.
+        - indice (opcional): IndiceHuellas con el histórico; se actualiza con los datos. Si es None se usa uno
+          nuevo y exacto sobre todas las columnas, y el resultado es el de `duplicated().sum()` salvo en columnas
+          de texto con nulos de varios tipos: aquí None y NaN son el mismo valor, y para pandas no.
+        - tamaño_chunk (opcional): filas por trozo. Por defecto es 100000.
+
+    Returns:
+        Número de filas duplicadas.
+    """
+    return (IndiceHuellas() if indice is None else indice).actualizar(datos, tamaño_chunk)
@@ -0,0 +1,251 @@
+# Para importar las librerías pesadas solo cuando se usan
+# -----------------------------------------------------------------------
+from .soporte_perezoso import importar_perezoso
+
+# Tratamiento de datos
+# -----------------------------------------------------------------------
+pd = importar_perezoso("pandas")
+
+# Otras librerias
+# -----------------------------------------------------------------------
+import contextlib
+import json
+import threading
+import time
+import tracemalloc
+
+
+# Las funciones de los módulos de soporte marcan sus etapas (separar en grupos, ordenar, el test de scipy, los
+# describe, el dibujo...) con `etapa(nombre, filas)`. Mientras no haya ningún receptor registrado, `etapa` devuelve
+# siempre el mismo contexto vacío y el coste es el de una llamada a función. Con algún receptor, al salir de cada
+# etapa se le pasa un registro (un diccionario) con el tiempo real, el tiempo de CPU, las filas y, si se pidió,
+# el pico de memoria reservada durante la etapa (medido con tracemalloc, que sí tiene un coste apreciable).
+# Las etapas se pueden anidar; la ruta del registro indica dentro de qué otras etapas se ejecutó.
+# Solo se registra lo que ocurre en el proceso principal, no en los procesos de un pool.
+
+_receptores = []
+_estado = {"memoria": False, "tracemalloc_propio": False}
+_pilas = threading.local()
+
+
+class _EtapaNula:
+    """
+    Contexto vacío que se devuelve cuando la instrumentación está desactivada.
+    """
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        return False
+
+
+_ETAPA_NULA = _EtapaNula()
+
+
+class _Etapa:
+    """
+    Mide una etapa y, al salir, envía su registro a todos los receptores.
+    """
+    def __init__(self, nombre, filas, datos):
+        self.nombre = nombre
+        self.filas = filas
+        self.datos = datos
+
+    def __enter__(self):
+        pila = getattr(_pilas, "pila", None)
+        if pila is None:
+            pila = _pilas.pila = []
+        self.ruta = "/".join([etapa.nombre for etapa in pila] + [self.nombre])
+        self.memoria = _estado["memoria"] and tracemalloc.is_tracing()
+        if self.memoria:
+            # tracemalloc solo guarda un pico: antes de reiniciarlo se lo apuntamos a la etapa que nos contiene
+            actual, pico = tracemalloc.get_traced_memory()
+            if pila:
+                pila[-1].pico = max(pila[-1].pico, pico)
+            tracemalloc.reset_peak()
+            self.memoria_inicial = self.pico = actual
+        pila.append(self)
+        self.inicio = time.time()
+        self.inicio_cpu = time.process_time()
+        self.inicio_reloj = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo, excepcion, traza):
+        tiempo = time.perf_counter() - self.inicio_reloj
+        tiempo_cpu = time.process_time() - self.inicio_cpu
+        pila = _pilas.pila
+        pila.pop()
+        registro = {"etapa": self.nombre,
+                    "ruta": self.ruta,
+                    "inicio": self.inicio,
+                    "tiempo": tiempo,
+                    "tiempo_cpu": tiempo_cpu,
+                    "filas": self.filas,
+                    "memoria_pico": None,
+                    "error": None if tipo is None else tipo.__name__}
+        if self.memoria and tracemalloc.is_tracing():
+            self.pico = max(self.pico, tracemalloc.get_traced_memory()[1])
+            registro["memoria_pico"] = self.pico - self.memoria_inicial
+            if pila:
+                pila[-1].pico = max(pila[-1].pico, self.pico)
+        registro.update(self.datos)
+        for receptor in list(_receptores):
+            receptor(registro)
+        return False
+
+
+def etapa(nombre, filas=None, **datos):
+    """
+    Marca una etapa para la instrumentación. Se usa como contexto: `with etapa("separar_grupos", filas=n): ...`.
+
+    Params:
+        - nombre: nombre de la etapa.
+        - filas (opcional): número de filas que procesa la etapa.
+        - **datos: información adicional que se añade al registro (por ejemplo el nombre del test).
+
+    Returns:
+        Un contexto; si no hay receptores registrados, uno vacío que no mide nada.
+    """
+    if not _receptores:
+        return _ETAPA_NULA
+    return _Etapa(nombre, filas, datos)
+
+
+def registrar(receptor, memoria=False):
+    """
+    Activa la instrumentación añadiendo un receptor, que se llamará con el registro de cada etapa.
+
+    Params:
+        - receptor: función (o instancia de `Recolector` o `EscritorJsonl`) que recibe un diccionario por etapa.
+        - memoria (opcional): si es True se mide también el pico de memoria con tracemalloc. Por defecto es False.
+
+    Returns:
+        El receptor, para poder eliminarlo después con `eliminar`.
+    """
+    _receptores.append(receptor)
+    if memoria:
+        _estado["memoria"] = True
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _estado["tracemalloc_propio"] = True
+    return receptor
+
+
+def eliminar(receptor):
+    """
+    Quita un receptor. Cuando no queda ninguno, la instrumentación se desactiva y, si la instrumentación había
+    arrancado tracemalloc, lo detiene.
+    """
+    if receptor in _receptores:
+        _receptores.remove(receptor)
+    if not _receptores:
+        if _estado["tracemalloc_propio"]:
+            tracemalloc.stop()
+        _estado.update(memoria=False, tracemalloc_propio=False)
+
+
+@contextlib.contextmanager
+def instrumentar(receptor=None, memoria=False):
+    """
+    Registra un receptor mientras dura el bloque:
+
+        with instrumentar() as recolector:
+            pruebas.test_kruskal(categorias)
+        recolector.resumen()
+
+    Params:
+        - receptor (opcional): receptor a registrar. Si es None se usa un `Recolector` nuevo.
+        - memoria (opcional): si es True se mide también el pico de memoria. Por defecto es False.
+
+    Returns:
+        El receptor.
+    """
+    receptor = registrar(Recolector() if receptor is None else receptor, memoria)
+    try:
+        yield receptor
+    finally:
+        eliminar(receptor)
+        if hasattr(receptor, "cerrar"):
+            receptor.cerrar()
+
+
+class Recolector:
+    """
+    Receptor que guarda los registros en memoria, para agregarlos entre varias ejecuciones.
+    """
+    def __init__(self):
+        self.registros = []
+
+    def __call__(self, registro):
+        self.registros.append(registro)
+
+    def limpiar(self):
+        self.registros = []
+
+    def resumen(self):
+        """
+        Returns:
+            DataFrame con el resumen por etapa (ver `resumen_etapas`).
+        """
+        return resumen_etapas(self.registros)
+
+
+class EscritorJsonl:
+    """
+    Receptor que añade cada registro como una línea JSON al final de un fichero.
+
+    Params:
+        - ruta: ruta del fichero; se crea si no existe.
+    """
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self.fichero = None
+
+    def __call__(self, registro):
+        if self.fichero is None:
+            self.fichero = open(self.ruta, "a", encoding="utf-8")
+        self.fichero.write(json.dumps(registro, ensure_ascii=False, default=str) + "\n")
+
+    def cerrar(self):
+        if self.fichero is not None:
+            self.fichero.close()
+            self.fichero = None
+
+
+def leer_registros(ruta):
+    """
+    Lee los registros de un fichero escrito por `EscritorJsonl`.
+
+    Returns:
+        Lista de diccionarios.
+    """
+    with open(ruta, encoding="utf-8") as fichero:
+        return [json.loads(linea) for linea in fichero if linea.strip()]
+
+
+def resumen_etapas(registros):
+    """
+    Agrega los registros por etapa (con su ruta), por ejemplo de varias ejecuciones.
+
+    Params:
+        - registros: lista de diccionarios de `Recolector` o de `leer_registros`.
+
+    Returns:
+        DataFrame con una fila por ruta y las columnas llamadas, tiempo_total, tiempo_medio, tiempo_cpu_total,
+        filas_total, filas_por_segundo y memoria_pico (el máximo), ordenado de mayor a menor tiempo total.
+    """
+    columnas = ["ruta", "etapa", "llamadas", "tiempo_total", "tiempo_medio", "tiempo_cpu_total", "filas_total",
+                "filas_por_segundo", "memoria_pico"]
+    if not registros:
+        return pd.DataFrame(columns=columnas)
+    tabla = pd.DataFrame(registros)
+    tabla["filas"] = pd.to_numeric(tabla["filas"], errors="coerce")
+    tabla["memoria_pico"] = pd.to_numeric(tabla["memoria_pico"], errors="coerce")
+    resumen = tabla.groupby(["ruta", "etapa"], sort=False).agg(llamadas=("tiempo", "size"),
+                                                               tiempo_total=("tiempo", "sum"),
+                                                               tiempo_medio=("tiempo", "mean"),
+                                                               tiempo_cpu_total=("tiempo_cpu", "sum"),
+                                                               filas_total=("filas", lambda filas: filas.sum(min_count=1)),
+                                                               memoria_pico=("memoria_pico", "max")).reset_index()
+    resumen["filas_por_segundo"] = resumen["filas_total"] / resumen["tiempo_total"]
+    return resumen[columnas].sort_values("tiempo_total", ascending=False, ignore_index=True)
@@ -0,0 +1,220 @@
+# Para importar las librerías pesadas solo cuando se usan
+# -----------------------------------------------------------------------
+from .soporte_perezoso import importar_perezoso
+
+# Tratamiento de datos
+# -----------------------------------------------------------------------
+import numpy as np
+pd = importar_perezoso("pandas")
+
+# Para pruebas estadísticas
+# -----------------------------------------------------------------------
+stats = importar_perezoso("scipy.stats")
+
+# Para separar los datos en grupos
+# -----------------------------------------------------------------------
+from .soporte_grupos import GruposContiguos, sumas_por_grupo
+from .soporte_tablas import a_numpy, factorizar_columna
+
+
+METODOS_NORMALIDAD = ("shapiro", "kolmogorov", "dagostino", "jarque_bera", "anderson")
+
+# por encima de este tamaño el p-valor del test de Shapiro-Wilk de scipy deja de ser fiable
+MAXIMO_SHAPIRO = 5000
+
+
+def momentos_centrales(valores, offsets):
+    """
+    Calcula en una pasada (más la de la media) el tamaño, la media y los momentos centrales 2, 3 y 4 de cada grupo
+    y columna, ignorando los NaN.
+
+    Params:
+        - valores: array (n, m) ordenado por grupo.
+        - offsets: límites de los grupos, de tamaño k+1.
+
+    Returns:
+        Tupla (n, media, m2, m3, m4) con arrays de forma (k, m); los momentos son los sesgados (divididos por n).
+    """
+    validos = ~np.isnan(valores)
+    tamaños = np.diff(offsets)
+    n = sumas_por_grupo(validos.astype(np.float64), offsets)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        media = sumas_por_grupo(np.where(validos, valores, 0.0), offsets) / n
+        desviaciones = np.where(validos, valores - np.repeat(media, tamaños, axis=0), 0.0)
+        cuadrados = desviaciones**2
+        m2 = sumas_por_grupo(cuadrados, offsets) / n
+        m3 = sumas_por_grupo(cuadrados * desviaciones, offsets) / n
+        m4 = sumas_por_grupo(cuadrados**2, offsets) / n
+    return n, media, m2, m3, m4
+
+
+def dagostino_momentos(n, m2, m3, m4):
+    """
+    Test de normalidad de D'Agostino-Pearson (K²) a partir de los momentos, con las mismas fórmulas que `stats.normaltest`.
+    Funciona con arrays de cualquier forma. Necesita al menos 8 observaciones.
+
+    Returns:
+        Tupla (K², p-valor).
+    """
+    with np.errstate(invalid="ignore", divide="ignore"):
+        asimetria = m3 / m2**1.5
+        curtosis = m4 / m2**2
+
+        # test de asimetría
+        y = asimetria * np.sqrt(((n + 1) * (n + 3)) / (6.0 * (n - 2)))
+        beta2 = (3.0 * (n**2 + 27 * n - 70) * (n + 1) * (n + 3)) / ((n - 2.0) * (n + 5) * (n + 7) * (n + 9))
+        w2 = -1 + np.sqrt(2 * (beta2 - 1))
+        delta = 1 / np.sqrt(0.5 * np.log(w2))
+        alfa = np.sqrt(2.0 / (w2 - 1))
+        y = np.where(y == 0, 1, y)
+        z_asimetria = delta * np.log(y / alfa + np.sqrt((y / alfa)**2 + 1))
+
+        # test de curtosis
+        esperada = 3.0 * (n - 1) / (n + 1)
+        varianza = 24.0 * n * (n - 2) * (n - 3) / ((n + 1) * (n + 1.0) * (n + 3) * (n + 5))
+        x = (curtosis - esperada) / np.sqrt(varianza)
+        raiz_beta1 = 6.0 * (n * n - 5 * n + 2) / ((n + 7) * (n + 9)) * np.sqrt((6.0 * (n + 3) * (n + 5)) / (n * (n - 2) * (n - 3)))
+        a = 6.0 + 8.0 / raiz_beta1 * (2.0 / raiz_beta1 + np.sqrt(1 + 4.0 / (raiz_beta1**2)))
+        termino1 = 1 - 2 / (9.0 * a)
+        denominador = 1 + x * np.sqrt(2 / (a - 4.0))
+        termino2 = np.sign(denominador) * np.where(denominador == 0.0, np.nan, ((1 - 2.0 / a) / np.abs(denominador))**(1 / 3.0))
+        z_curtosis = (termino1 - termino2) / np.sqrt(2 / (9.0 * a))
+
+        k2 = z_asimetria**2 + z_curtosis**2
+    return k2, stats.chi2.sf(k2, 2)
+
+
+def jarque_bera_momentos(n, m2, m3, m4):
+    """
+    Test de Jarque-Bera a partir de los momentos, igual que `stats.jarque_bera`. Funciona con arrays de cualquier forma.
+
+    Returns:
+        Tupla (JB, p-valor).
+    """
+    with np.errstate(invalid="ignore", divide="ignore"):
+        asimetria = m3 / m2**1.5
+        curtosis = m4 / m2**2
+        jb = n / 6 * (asimetria**2 + (curtosis - 3)**2 / 4)
+    return jb, stats.chi2.sf(jb, 2)
+
+
+def anderson_darling(muestra):
+    """
+    Test de Anderson-Darling contra una normal con media y desviación estimadas, para cada columna de una matriz.
+    El p-valor usa la aproximación de D'Agostino y Stephens (1986) con el estadístico ajustado A²*.
+
+    Params:
+        - muestra: array (n, m) sin nulos.
+
+    Returns:
+        Tupla (A², p-valor), un valor por columna.
+    """
+    n = muestra.shape[0]
+    ordenada = np.sort(muestra, axis=0)
+    z = (ordenada - ordenada.mean(axis=0)) / ordenada.std(axis=0, ddof=1)
+    log_cdf = stats.norm.logcdf(z)
+    log_sf = stats.norm.logsf(z)
+    i = np.arange(1, n + 1)[:, None]
+    a2 = -n - ((2 * i - 1) * (log_cdf + log_sf[::-1])).sum(axis=0) / n
+
+    ajustado = a2 * (1 + 0.75 / n + 2.25 / n**2)
+    p_valor = np.select([ajustado >= 0.6, ajustado >= 0.34, ajustado >= 0.2],
+                        [np.exp(1.2937 - 5.709 * ajustado + 0.0186 * ajustado**2),
+                         np.exp(0.9177 - 4.279 * ajustado - 1.38 * ajustado**2),
+                         1 - np.exp(-8.318 + 42.796 * ajustado - 59.938 * ajustado**2)],
+                        1 - np.exp(-13.436 + 101.14 * ajustado - 223.73 * ajustado**2))
+    return a2, np.clip(p_valor, 0, 1)
+
+
+def submuestra_estratificada(grupos, tamaño_muestra, semilla=None):
+    """
+    Toma, de forma reproducible, hasta `tamaño_muestra` filas al azar (sin reemplazo) de cada grupo.
+
+    Params:
+        - grupos: GruposContiguos con los valores.
+        - tamaño_muestra: número máximo de filas por grupo.
+        - semilla (opcional): semilla del generador; cada grupo usa una semilla derivada de ella.
+
+    Returns:
+        Lista de arrays, uno por grupo.
+    """
+    semillas = np.random.SeedSequence(semilla).spawn(len(grupos))
+    muestras = []
+    for indice, semilla_grupo in enumerate(semillas):
+        bloque = grupos.valores[grupos.offsets[indice]:grupos.offsets[indice + 1]]
+        if len(bloque) > tamaño_muestra:
+            elegidas = np.random.default_rng(semilla_grupo).choice(len(bloque), tamaño_muestra, replace=False)
+            bloque = bloque[np.sort(elegidas)]
+        muestras.append(bloque)
+    return muestras
+
+
+def normalidad_por_grupos(dataframe, columnas, columna_grupo=None, metodo="dagostino", alpha=0.05,
+                          tamaño_muestra=MAXIMO_SHAPIRO, semilla=0):
+    """
+    Evalúa la normalidad de muchas columnas numéricas a la vez, opcionalmente dentro de cada grupo.
+
+    'dagostino' y 'jarque_bera' se calculan con todos los datos a partir de los momentos de cada grupo, con
+    operaciones vectorizadas sobre todas las columnas. 'shapiro', 'kolmogorov' y 'anderson' necesitan los datos
+    ordenados, así que se aplican sobre una submuestra estratificada y reproducible de `tamaño_muestra` filas
+    por grupo (Shapiro-Wilk no es fiable por encima de 5000). 'kolmogorov' compara con una normal de la media y la
+    desviación de los datos (no con la normal estándar).
+
+    Params:
+        - dataframe: DataFrame con los datos (de pandas o de Polars, LazyFrame de Polars o tabla de PyArrow).
+        - columnas: lista de columnas numéricas.
+        - columna_grupo (opcional): columna categórica; si es None se evalúa cada columna entera.
+        - metodo (opcional): uno de METODOS_NORMALIDAD. Por defecto es 'dagostino'.
+        - alpha (opcional): nivel de significancia. Por defecto es 0.05.
+        - tamaño_muestra (opcional): filas por grupo en los métodos que usan submuestra. Por defecto es 5000.
+        - semilla (opcional): semilla de la submuestra. Por defecto es 0.
+
+    Returns:
+        DataFrame con las columnas columna, grupo, metodo, n, estadistico, p_valor y normal.
+    """
+    if metodo not in METODOS_NORMALIDAD:
+        raise ValueError(f"Método no válido. Por favor, elige uno de {METODOS_NORMALIDAD}.")
+
+    columnas = list(columnas)
+    valores = a_numpy(dataframe, columnas)
+    if columna_grupo is None:
+        grupos = GruposContiguos(np.array([None], dtype=object), valores, np.array([0, len(valores)]))
+    else:
+        codigos, categorias = factorizar_columna(dataframe, columna_grupo)
+        grupos = GruposContiguos.desde_codigos(codigos, categorias, valores)
+
+    if metodo in ("dagostino", "jarque_bera"):
+        n, _, m2, m3, m4 = momentos_centrales(grupos.valores, grupos.offsets)
+        funcion = dagostino_momentos if metodo == "dagostino" else jarque_bera_momentos
+        estadistico, p_valor = funcion(n, m2, m3, m4)
+    else:
+        n = np.zeros((len(grupos), len(columnas)))
+        estadistico = np.full((len(grupos), len(columnas)), np.nan)
+        p_valor = np.full((len(grupos), len(columnas)), np.nan)
+        for g, muestra in enumerate(submuestra_estratificada(grupos, tamaño_muestra, semilla)):
+            for c in range(len(columnas)):
+                datos = muestra[:, c][~np.isnan(muestra[:, c])]
+                n[g, c] = len(datos)
+                if len(datos) < 3:
+                    continue
+                if metodo == "shapiro":
+                    estadistico[g, c], p_valor[g, c] = stats.shapiro(datos)
+                elif metodo == "kolmogorov":
+                    estadistico[g, c], p_valor[g, c] = stats.kstest(datos, "norm", args=(datos.mean(), datos.std(ddof=1)))
+            if metodo == "anderson":
+                completas = [c for c in range(len(columnas)) if n[g, c] == len(muestra) and len(muestra) >= 8]
+                if completas:
+                    estadistico[g, completas], p_valor[g, completas] = anderson_darling(muestra[:, completas])
+                for c in set(range(len(columnas))) - set(completas):
+                    datos = muestra[:, c][~np.isnan(muestra[:, c])]
+                    if len(datos) >= 8:
+                        a2, p = anderson_darling(datos[:, None])
+                        estadistico[g, c], p_valor[g, c] = a2[0], p[0]
+
+    return pd.DataFrame({"columna": np.tile(columnas, len(grupos)),
+                         "grupo": np.repeat(grupos.categorias, len(columnas)),
+                         "metodo": metodo,
+                         "n": np.asarray(n).ravel().astype(np.int64),
+                         "estadistico": np.asarray(estadistico).ravel(),
+                         "p_valor": np.asarray(p_valor).ravel(),
+                         "normal": np.asarray(p_valor).ravel() > alpha})
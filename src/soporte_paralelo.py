@@ -0,0 +1,68 @@
+# Para repartir el trabajo entre varios procesos
+# -----------------------------------------------------------------------
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+import os
+
+
+# cada proceso del pool guarda aquí los datos una única vez, en lugar de recibirlos con cada tarea; en el proceso
+# principal se queda siempre vacío
+datos_proceso = {}
+
+
+def _inicializar_proceso(datos):
+    datos_proceso.clear()
+    datos_proceso.update(datos)
+
+
+def _llamar_con_datos_proceso(funcion, *argumentos):
+    return funcion(datos_proceso, *argumentos)
+
+
+def abrir_pool(datos, n_procesos):
+    """
+    Prepara la ejecución de tareas: con un solo proceso no se crea pool y las tareas se ejecutan en el proceso actual;
+    con varios, se crea un pool en el que cada proceso recibe los datos una vez mediante el inicializador.
+
+    Params:
+        - datos: diccionario con los datos compartidos por todas las tareas.
+        - n_procesos: número de procesos.
+
+    Returns:
+        Un ProcessPoolExecutor, o None si se trabaja en el proceso actual.
+    """
+    if n_procesos == 1:
+        return None
+    return ProcessPoolExecutor(max_workers=n_procesos, initializer=_inicializar_proceso, initargs=(datos,))
+
+
+def ejecutar_tareas(pool, funcion, tareas, datos=None):
+    """
+    Ejecuta `funcion(*tarea)` para cada tarea, en serie si no hay pool o repartido entre sus procesos.
+
+    Params:
+        - pool: el resultado de `abrir_pool`.
+        - funcion: función definida a nivel de módulo (para poder enviarla a otros procesos).
+        - tareas: lista de tuplas de argumentos.
+        - datos (opcional): los mismos datos que se pasaron a `abrir_pool`. Si se indican, la función se llama como
+          `funcion(datos, *tarea)`: en serie con estos datos y en el pool con la copia que recibió cada proceso.
+
+    Returns:
+        Lista con el resultado de cada tarea, en el mismo orden.
+    """
+    if pool is None:
+        if datos is None:
+            return [funcion(*tarea) for tarea in tareas]
+        return [funcion(datos, *tarea) for tarea in tareas]
+    if datos is None:
+        return list(pool.map(funcion, *zip(*tareas)))
+    return list(pool.map(_llamar_con_datos_proceso, repeat(funcion, len(tareas)), *zip(*tareas)))
+
+
+def numero_procesos(n_procesos):
+    """
+    Número de procesos a usar: todos los núcleos si es None.
+    """
+    if n_procesos is None:
+        return os.cpu_count() or 1
+    return max(1, int(n_procesos))
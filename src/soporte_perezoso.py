@@ -0,0 +1,50 @@
+# Para importar módulos solo cuando se usan
+# -----------------------------------------------------------------------
+import importlib
+
+
+class ModuloPerezoso:
+    """
+    Sustituto de un módulo que no lo importa hasta que se accede a alguno de sus atributos. Sirve para que importar
+    los módulos de soporte sea rápido: pandas, scipy o statsmodels solo se cargan cuando se ejecuta una función
+    que los necesita.
+
+    Attributes:
+        - nombre: nombre completo del módulo (por ejemplo 'scipy.stats').
+    """
+
+    def __init__(self, nombre):
+        self.nombre = nombre
+        self._modulo = None
+
+    def cargar(self):
+        """
+        Importa el módulo (si no se había importado ya) y lo devuelve.
+        """
+        if self._modulo is None:
+            self._modulo = importlib.import_module(self.nombre)
+        return self._modulo
+
+    def __getattr__(self, atributo):
+        # solo se llama para los atributos que no tiene la instancia, es decir, los del módulo; los internos se
+        # excluyen para que copiar o serializar el objeto no provoque la importación (ni una recursión infinita)
+        if atributo.startswith("__") or atributo in ("nombre", "_modulo"):
+            raise AttributeError(atributo)
+        return getattr(self.cargar(), atributo)
+
+    def __repr__(self):
+        estado = "cargado" if self._modulo is not None else "sin cargar"
+        return f"<módulo perezoso '{self.nombre}' ({estado})>"
+
+
+def importar_perezoso(nombre):
+    """
+    Devuelve un módulo que se importa la primera vez que se usa.
+
+    Params:
+        - nombre: nombre completo del módulo, por ejemplo 'pandas' o 'scipy.stats'.
+
+    Returns:
+        Una instancia de ModuloPerezoso, que se usa igual que el módulo.
+    """
+    return ModuloPerezoso(nombre)
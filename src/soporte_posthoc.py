@@ -0,0 +1,239 @@
+# Para importar las librerías pesadas solo cuando se usan
+# -----------------------------------------------------------------------
+from .soporte_perezoso import importar_perezoso
+
+# Tratamiento de datos
+# -----------------------------------------------------------------------
+import numpy as np
+pd = importar_perezoso("pandas")
+
+# Para pruebas estadísticas
+# -----------------------------------------------------------------------
+stats = importar_perezoso("scipy.stats")
+
+# Para separar los datos en grupos
+# -----------------------------------------------------------------------
+from .soporte_grupos import estadistico_mannwhitney
+
+
+CORRECCIONES = ("holm", "bh", "bonferroni", None)
+
+
+def ajustar_pvalores(p_valores, metodo="holm"):
+    """
+    Corrige los p-valores por comparaciones múltiples.
+
+    Params:
+        - p_valores: array de p-valores; los NaN se ignoran y se devuelven como NaN.
+        - metodo (opcional): 'holm' (Holm-Bonferroni), 'bh' (Benjamini-Hochberg), 'bonferroni' o None (sin corrección).
+          Por defecto es 'holm'.
+
+    Returns:
+        Array con los p-valores ajustados, en el mismo orden.
+    """
+    if metodo not in CORRECCIONES:
+        raise ValueError(f"Corrección no válida. Por favor, elige una de {CORRECCIONES}.")
+    p_valores = np.asarray(p_valores, dtype=np.float64)
+    ajustados = np.full(p_valores.shape, np.nan)
+    validos = ~np.isnan(p_valores)
+    p, m = p_valores[validos], validos.sum()
+    if metodo is None or m == 0:
+        ajustados[validos] = p
+        return ajustados
+
+    if metodo == "bonferroni":
+        ajustados[validos] = np.minimum(p * m, 1)
+        return ajustados
+
+    orden = np.argsort(p, kind="stable")
+    ordenados = p[orden]
+    if metodo == "holm":
+        escalados = np.maximum.accumulate(ordenados * (m - np.arange(m)))
+    else:
+        escalados = np.minimum.accumulate((ordenados * m / np.arange(1, m + 1))[::-1])[::-1]
+    resultado = np.empty(m)
+    resultado[orden] = np.minimum(escalados, 1)
+    ajustados[validos] = resultado
+    return ajustados
+
+
+def comparaciones_rangos(valores_ordenados, codigos_ordenados, n_grupos):
+    """
+    Recorre el orden global de los datos (el de `RangosAgrupados`) y obtiene todo lo necesario para las comparaciones
+    por parejas basadas en rangos, sin volver a ordenar ni a separar los datos de cada pareja. Los valores se agrupan
+    en bloques de valores iguales; para cada grupo i basta saber cuántos de sus datos hay por debajo de cada bloque
+    y dentro de él para obtener, con una suma por grupo, la U de Mann-Whitney de i frente a todos los demás.
+    El coste es O(n·k) en lugar de las k(k-1)/2 pasadas de O(n log n) de hacerlo pareja a pareja. Los NaN se descartan.
+
+    Params:
+        - valores_ordenados: array con los valores de todos los grupos ordenados de menor a mayor.
+        - codigos_ordenados: array con el grupo de cada valor.
+        - n_grupos: número de grupos.
+
+    Returns:
+        Diccionario con:
+            - tamaños: array (k,) con el número de datos de cada grupo.
+            - sumas_rangos: array (k,) con la suma de los rangos combinados de todos los grupos.
+            - empates: término de empates (suma de t**3 - t) de todos los datos.
+            - u: matriz (k, k) donde u[i, j] es la U de Mann-Whitney del grupo i frente al j.
+            - empates_pares: matriz (k, k) con el término de empates de cada pareja.
+    """
+    validos = ~np.isnan(valores_ordenados)
+    valores, codigos = valores_ordenados[validos], codigos_ordenados[validos]
+    k, n = n_grupos, len(valores)
+
+    inicio = np.ones(n, dtype=bool)
+    inicio[1:] = valores[1:] != valores[:-1]
+    posiciones = np.flatnonzero(inicio)
+    longitudes = np.diff(np.append(posiciones, n))
+    hay_empates = n > len(posiciones)
+    bloques = np.cumsum(inicio) - 1 if hay_empates else None
+
+    tamaños = np.bincount(codigos, minlength=k).astype(np.float64)
+    rangos = np.repeat(posiciones + (longitudes + 1) / 2, longitudes)
+    sumas_rangos = np.bincount(codigos, weights=rangos, minlength=k)
+
+    u = np.zeros((k, k))
+    # el término de empates de la pareja (i, j) es Σ (a + b)³ - (a + b) sobre los bloques, con a y b los datos de
+    # i y de j en cada bloque; desarrollado queda propios[i] + propios[j] + 3·(cruzados[i, j] + cruzados[j, i])
+    propios = np.zeros(k)
+    cruzados = np.zeros((k, k))
+    for i in range(k):
+        es_i = (codigos == i).astype(np.float64)
+        if hay_empates:
+            # datos del grupo i en cada bloque y por debajo de él; los empatados cuentan la mitad
+            en_bloque = np.bincount(bloques, weights=es_i, minlength=len(posiciones))
+            por_debajo = np.cumsum(en_bloque) - en_bloque + 0.5 * en_bloque
+            u[:, i] = np.bincount(codigos, weights=por_debajo[bloques], minlength=k)
+            propios[i] = (en_bloque**3 - en_bloque).sum()
+            cruzados[:, i] = np.bincount(codigos, weights=en_bloque[bloques]**2, minlength=k)
+        else:
+            u[:, i] = np.bincount(codigos, weights=np.cumsum(es_i) - es_i, minlength=k)
+    empates_pares = propios[:, None] + propios[None, :] + 3 * (cruzados + cruzados.T)
+
+    t = longitudes.astype(np.float64)
+    return {"tamaños": tamaños,
+            "sumas_rangos": sumas_rangos,
+            "empates": (t**3 - t).sum(),
+            "u": u,
+            "empates_pares": empates_pares}
+
+
+def _tabla_parejas(categorias, diferencia, estadistico, p_valor, correccion, alpha, prueba):
+    """
+    Construye la tabla de resultados con una fila por pareja (i < j) a partir de matrices (k, k).
+    """
+    i, j = np.triu_indices(len(categorias), 1)
+    p = p_valor[i, j]
+    ajustado = ajustar_pvalores(p, correccion)
+    return pd.DataFrame({"grupo_1": categorias[i],
+                         "grupo_2": categorias[j],
+                         "prueba": prueba,
+                         "diferencia": diferencia[i, j],
+                         "estadistico": estadistico[i, j],
+                         "p_valor": p,
+                         "p_ajustado": ajustado,
+                         "significativo": ajustado < alpha})
+
+
+def test_dunn(categorias, comparaciones, correccion="holm", alpha=0.05):
+    """
+    Test de Dunn para todas las parejas, con los rangos combinados de todos los grupos (los mismos de Kruskal-Wallis)
+    y corrección por empates.
+
+    Params:
+        - categorias: array con el nombre de cada grupo.
+        - comparaciones: diccionario devuelto por `comparaciones_rangos`.
+        - correccion (opcional): ver `ajustar_pvalores`. Por defecto es 'holm'.
+        - alpha (opcional): nivel de significancia. Por defecto es 0.05.
+
+    Returns:
+        DataFrame con una fila por pareja; la diferencia es la de los rangos medios (grupo_1 - grupo_2).
+    """
+    tamaños = comparaciones["tamaños"]
+    n = tamaños.sum()
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rangos_medios = comparaciones["sumas_rangos"] / tamaños
+        diferencia = rangos_medios[:, None] - rangos_medios[None, :]
+        varianza = (n * (n + 1) / 12 - comparaciones["empates"] / (12 * (n - 1))) \
+                   * (1 / tamaños[:, None] + 1 / tamaños[None, :])
+        z = diferencia / np.sqrt(varianza)
+    return _tabla_parejas(np.asarray(categorias), diferencia, z, 2 * stats.norm.sf(np.abs(z)), correccion, alpha, "Dunn")
+
+
+def test_mannwhitney_parejas(categorias, comparaciones, correccion="holm", alpha=0.05):
+    """
+    Test de Mann-Whitney U para todas las parejas (cada pareja con sus propios rangos), con el p-valor asintótico
+    corregido por continuidad y por empates, igual que el método asintótico de `stats.mannwhitneyu`.
+
+    Params:
+        - categorias: array con el nombre de cada grupo.
+        - comparaciones: diccionario devuelto por `comparaciones_rangos`.
+        - correccion (opcional): ver `ajustar_pvalores`. Por defecto es 'holm'.
+        - alpha (opcional): nivel de significancia. Por defecto es 0.05.
+
+    Returns:
+        DataFrame con una fila por pareja; la diferencia es la probabilidad de superioridad U / (n1·n2) - 0.5.
+    """
+    tamaños = comparaciones["tamaños"]
+    n1, n2 = tamaños[:, None], tamaños[None, :]
+    u = comparaciones["u"]
+    u1, p_valor = estadistico_mannwhitney(u + n1 * (n1 + 1) / 2, n1, n2, comparaciones["empates_pares"])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        diferencia = u1 / (n1 * n2) - 0.5
+    return _tabla_parejas(np.asarray(categorias), diferencia, u1, p_valor, correccion, alpha, "Mann-Whitney U")
+
+
+def test_tukey(categorias, tamaños, medias, m2, alpha=0.05):
+    """
+    Test HSD de Tukey (Tukey-Kramer si los tamaños son distintos) a partir de (n, media, M2) de cada grupo, con la
+    varianza combinada del ANOVA. Igual que `stats.tukey_hsd`. El p-valor ya controla el error de todas las parejas,
+    así que no se corrige de nuevo.
+
+    Params:
+        - categorias: array con el nombre de cada grupo.
+        - tamaños, medias, m2: arrays (k,) con los estadísticos suficientes de cada grupo.
+        - alpha (opcional): nivel de significancia y de los intervalos de confianza. Por defecto es 0.05.
+
+    Returns:
+        DataFrame con una fila por pareja, la diferencia de medias (grupo_1 - grupo_2) y su intervalo de confianza.
+    """
+    tamaños = np.asarray(tamaños, dtype=np.float64)
+    k, n = len(tamaños), tamaños.sum()
+    grados = n - k
+    with np.errstate(invalid="ignore", divide="ignore"):
+        varianza_comun = np.sum(m2) / grados
+        diferencia = medias[:, None] - medias[None, :]
+        error = np.sqrt(varianza_comun / 2 * (1 / tamaños[:, None] + 1 / tamaños[None, :]))
+        q = np.abs(diferencia) / error
+    p_valor = stats.studentized_range.sf(q, k, grados)
+    critico = stats.studentized_range.ppf(1 - alpha, k, grados)
+
+    tabla = _tabla_parejas(np.asarray(categorias), diferencia, q, p_valor, None, alpha, "Tukey HSD")
+    i, j = np.triu_indices(k, 1)
+    tabla["inferior"] = diferencia[i, j] - critico * error[i, j]
+    tabla["superior"] = diferencia[i, j] + critico * error[i, j]
+    return tabla
+
+
+def test_welch_parejas(categorias, tamaños, medias, m2, correccion="holm", alpha=0.05):
+    """
+    Test t de Welch para todas las parejas a partir de (n, media, M2) de cada grupo.
+
+    Params:
+        - categorias: array con el nombre de cada grupo.
+        - tamaños, medias, m2: arrays (k,) con los estadísticos suficientes de cada grupo.
+        - correccion (opcional): ver `ajustar_pvalores`. Por defecto es 'holm'.
+        - alpha (opcional): nivel de significancia. Por defecto es 0.05.
+
+    Returns:
+        DataFrame con una fila por pareja y la diferencia de medias (grupo_1 - grupo_2).
+    """
+    tamaños = np.asarray(tamaños, dtype=np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        varianza_media = m2 / (tamaños - 1) / tamaños
+        va, vb = varianza_media[:, None], varianza_media[None, :]
+        diferencia = medias[:, None] - medias[None, :]
+        t = diferencia / np.sqrt(va + vb)
+        grados = (va + vb)**2 / (va**2 / (tamaños[:, None] - 1) + vb**2 / (tamaños[None, :] - 1))
+    return _tabla_parejas(np.asarray(categorias), diferencia, t, 2 * stats.t.sf(np.abs(t), grados), correccion, alpha, "t de Welch")
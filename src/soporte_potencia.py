@@ -0,0 +1,288 @@
+# Para importar las librerías pesadas solo cuando se usan
+# -----------------------------------------------------------------------
+from .soporte_perezoso import importar_perezoso
+
+# Tratamiento de datos
+# -----------------------------------------------------------------------
+import numpy as np
+pd = importar_perezoso("pandas")
+
+# Para pruebas estadísticas
+# -----------------------------------------------------------------------
+stats = importar_perezoso("scipy.stats")
+
+# Para calcular rangos y estadísticos por grupo
+# -----------------------------------------------------------------------
+from .soporte_grupos import rangos_columnas, sumas_por_grupo, estadistico_kruskal, estadistico_mannwhitney
+
+# Para repartir el trabajo entre varios procesos
+# -----------------------------------------------------------------------
+from .soporte_paralelo import abrir_pool, ejecutar_tareas, numero_procesos
+
+
+TESTS_ANALITICOS = ("z", "t")
+
+TESTS_SIMULADOS = ("mannwhitneyu", "kruskal")
+
+ALTERNATIVAS = ("two-sided", "larger", "smaller")
+
+DISTRIBUCIONES = ("normal", "exponencial", "lognormal", "uniforme")
+
+# número máximo de valores simulados (réplicas × observaciones) que se generan de una vez
+VALORES_LOTE = 2**24
+
+# veces que se duplica la cota superior del tamaño muestral antes de dar la potencia por inalcanzable
+MAXIMO_DUPLICACIONES = 64
+
+
+def _rejilla(**parametros):
+    """
+    Combina todos los valores de cada parámetro (producto cartesiano) y devuelve un diccionario de arrays planos.
+    """
+    nombres = list(parametros)
+    valores = [np.atleast_1d(np.asarray(parametros[nombre])) for nombre in nombres]
+    mallas = np.meshgrid(*valores, indexing="ij")
+    return {nombre: malla.ravel() for nombre, malla in zip(nombres, mallas)}
+
+
+def _potencia(efecto, n1, n2, alpha, test, alternativa):
+    """
+    Potencia de los tests z y t de dos muestras independientes para arrays de parámetros (ya combinados).
+    """
+    escala = np.sqrt(n1 * n2 / (n1 + n2))
+    no_centralidad = efecto * escala
+    if test == "z":
+        distribucion, centrada = stats.norm(loc=no_centralidad), stats.norm
+    else:
+        grados = n1 + n2 - 2
+        distribucion, centrada = stats.nct(grados, no_centralidad), stats.t(grados)
+
+    if alternativa == "two-sided":
+        critico = centrada.isf(alpha / 2)
+        potencia = distribucion.sf(critico) + distribucion.cdf(-critico)
+    elif alternativa == "larger":
+        potencia = distribucion.sf(centrada.isf(alpha))
+    else:
+        potencia = distribucion.cdf(-centrada.isf(alpha))
+
+    # la t no central de scipy devuelve NaN con no centralidades muy grandes; ahí la aproximación normal es exacta a efectos prácticos
+    if test == "t" and np.isnan(potencia).any():
+        potencia = np.where(np.isnan(potencia), _potencia(efecto, n1, n2, alpha, "z", alternativa), potencia)
+    return potencia
+
+
+def efecto_proporciones(proporcion_1, proporcion_2):
+    """
+    Tamaño del efecto h de Cohen entre dos proporciones (como `proportion_effectsize` de statsmodels),
+    para usarlo con el test z en `potencia_analitica` y `tamaño_muestral`.
+
+    Params:
+        - proporcion_1, proporcion_2: proporciones (o arrays de proporciones).
+
+    Returns:
+        El tamaño del efecto, 2·arcsin(√p1) - 2·arcsin(√p2).
+    """
+    return 2 * np.arcsin(np.sqrt(proporcion_1)) - 2 * np.arcsin(np.sqrt(proporcion_2))
+
+
+def potencia_analitica(efecto, n, alpha=0.05, ratio=1.0, test="t", alternativa="two-sided"):
+    """
+    Calcula la potencia de los tests z y t de dos muestras independientes para todas las combinaciones de los
+    parámetros a la vez, de forma vectorizada. Da lo mismo que `NormalIndPower` y `TTestIndPower` de statsmodels.
+
+    Params:
+        - efecto: tamaño del efecto estandarizado (d de Cohen, o h de Cohen para proporciones), escalar o lista.
+        - n: tamaño del primer grupo, escalar o lista.
+        - alpha (opcional): nivel de significancia, escalar o lista. Por defecto es 0.05.
+        - ratio (opcional): tamaño del segundo grupo dividido por el del primero, escalar o lista. Por defecto es 1.
+        - test (opcional): 'z' o 't'. Por defecto es 't'.
+        - alternativa (opcional): 'two-sided', 'larger' o 'smaller'. Por defecto es 'two-sided'.
+
+    Returns:
+        DataFrame con una fila por combinación y las columnas efecto, n_grupo_1, n_grupo_2, alpha, ratio y potencia.
+    """
+    if test not in TESTS_ANALITICOS:
+        raise ValueError(f"Test no válido. Por favor, elige uno de {TESTS_ANALITICOS}.")
+    if alternativa not in ALTERNATIVAS:
+        raise ValueError(f"Alternativa no válida. Por favor, elige una de {ALTERNATIVAS}.")
+
+    rejilla = _rejilla(efecto=efecto, n=n, alpha=alpha, ratio=ratio)
+    n1 = rejilla["n"].astype(np.float64)
+    n2 = n1 * rejilla["ratio"]
+    potencia = _potencia(rejilla["efecto"], n1, n2, rejilla["alpha"], test, alternativa)
+    return pd.DataFrame({"efecto": rejilla["efecto"],
+                         "n_grupo_1": n1,
+                         "n_grupo_2": n2,
+                         "alpha": rejilla["alpha"],
+                         "ratio": rejilla["ratio"],
+                         "potencia": potencia})
+
+
+def tamaño_muestral(efecto, potencia=0.8, alpha=0.05, ratio=1.0, test="t", alternativa="two-sided"):
+    """
+    Calcula el tamaño muestral necesario para alcanzar una potencia, para todas las combinaciones de los parámetros
+    a la vez. Con el test z se usa la fórmula cerrada como punto de partida y con ambos tests se ajusta por bisección,
+    de forma vectorizada, sobre la potencia exacta.
+
+    Params:
+        - efecto: tamaño del efecto estandarizado, escalar o lista. Con 'larger' tiene que ser positivo, con
+          'smaller' negativo y con 'two-sided' distinto de 0.
+        - potencia (opcional): potencia deseada, escalar o lista. Por defecto es 0.8.
+        - alpha (opcional): nivel de significancia, escalar o lista. Por defecto es 0.05.
+        - ratio (opcional): tamaño del segundo grupo dividido por el del primero, escalar o lista. Por defecto es 1.
+        - test (opcional): 'z' o 't'. Por defecto es 't'.
+        - alternativa (opcional): 'two-sided', 'larger' o 'smaller'. Por defecto es 'two-sided'.
+
+    Returns:
+        DataFrame con una fila por combinación, el tamaño exacto (n_grupo_1, como el `solve_power` de statsmodels)
+        y los tamaños redondeados hacia arriba de cada grupo (n_necesario_1, n_necesario_2). En las combinaciones
+        en las que la potencia no se alcanza con ningún tamaño (efecto nulo o de signo contrario a la alternativa,
+        o potencia 1) los tamaños son nulos (NaN y <NA>).
+    """
+    if test not in TESTS_ANALITICOS:
+        raise ValueError(f"Test no válido. Por favor, elige uno de {TESTS_ANALITICOS}.")
+    if alternativa not in ALTERNATIVAS:
+        raise ValueError(f"Alternativa no válida. Por favor, elige una de {ALTERNATIVAS}.")
+
+    rejilla = _rejilla(efecto=efecto, potencia=potencia, alpha=alpha, ratio=ratio)
+    efecto, objetivo, a, r = rejilla["efecto"], rejilla["potencia"], rejilla["alpha"], rejilla["ratio"]
+    if alternativa == "larger":
+        alcanzable = efecto > 0
+    elif alternativa == "smaller":
+        alcanzable = efecto < 0
+    else:
+        alcanzable = efecto != 0
+    alcanzable &= objetivo < 1
+    # en las combinaciones inalcanzables se busca con un efecto y una potencia cualesquiera y al final se descartan
+    d = np.where(alcanzable, efecto, 1.0)
+    buscada = np.where(alcanzable, objetivo, 0.5)
+
+    # aproximación normal: n1 = (z_alpha + z_beta)² · (1 + 1/ratio) / d²
+    z_alpha = stats.norm.isf(a / 2 if alternativa == "two-sided" else a)
+    aproximado = (z_alpha + stats.norm.ppf(buscada))**2 * (1 + 1 / r) / d**2
+
+    # la potencia crece con n, así que se busca por bisección entre una cota inferior y otra superior
+    inferior = 2.0 / np.minimum(r, 1.0) if test == "t" else np.full_like(aproximado, 1e-8)
+    superior = np.maximum(aproximado * 2, inferior * 2)
+    for _ in range(MAXIMO_DUPLICACIONES):
+        corto = alcanzable & (_potencia(d, superior, superior * r, a, test, alternativa) < buscada)
+        if not corto.any():
+            break
+        superior = np.where(corto, superior * 2, superior)
+    else:
+        alcanzable &= _potencia(d, superior, superior * r, a, test, alternativa) >= buscada
+    for _ in range(100):
+        medio = (inferior + superior) / 2
+        suficiente = _potencia(d, medio, medio * r, a, test, alternativa) >= buscada
+        superior = np.where(suficiente, medio, superior)
+        inferior = np.where(suficiente, inferior, medio)
+        if np.all(superior - inferior < 1e-6 * superior):
+            break
+
+    superior = np.where(alcanzable, superior, np.nan)
+    return pd.DataFrame({"efecto": efecto,
+                         "potencia": objetivo,
+                         "alpha": a,
+                         "ratio": r,
+                         "n_grupo_1": superior,
+                         "n_necesario_1": pd.array(np.ceil(superior - 1e-9), dtype="Int64"),
+                         "n_necesario_2": pd.array(np.ceil(superior * r - 1e-9), dtype="Int64")})
+
+
+def _generar_muestras(rng, distribucion, tamaño, n_replicas):
+    """
+    Genera una matriz (tamaño, n_replicas) de valores con varianza 1, para que los desplazamientos estén en desviaciones típicas.
+    """
+    if distribucion == "normal":
+        return rng.standard_normal((tamaño, n_replicas))
+    if distribucion == "exponencial":
+        return rng.standard_exponential((tamaño, n_replicas))
+    if distribucion == "lognormal":
+        return rng.lognormal(0.0, 1.0, (tamaño, n_replicas)) / np.sqrt((np.e - 1) * np.e)
+    return rng.random((tamaño, n_replicas)) * np.sqrt(12)
+
+
+def _lote_potencia(test, distribucion, tamaños, desplazamientos, alpha, semilla, n_replicas):
+    """
+    Simula `n_replicas` experimentos a la vez (una columna por experimento) y cuenta en cuántos se rechaza la
+    hipótesis nula. Los rangos de todas las réplicas se calculan juntos con `rangos_columnas`.
+    """
+    rng = np.random.default_rng(semilla)
+    tamaños = np.asarray(tamaños)
+    offsets = np.concatenate([[0], np.cumsum(tamaños)])
+    valores = _generar_muestras(rng, distribucion, int(offsets[-1]), n_replicas)
+    valores += np.repeat(desplazamientos, tamaños)[:, None]
+
+    rangos, empates = rangos_columnas(valores)
+    sumas = sumas_por_grupo(rangos, offsets)
+    if test == "mannwhitneyu":
+        _, p_valor = estadistico_mannwhitney(sumas[0], tamaños[0], tamaños[1], empates)
+    else:
+        _, p_valor = estadistico_kruskal(sumas, tamaños, empates)
+    return int((p_valor < alpha).sum())
+
+
+def potencia_simulada(efecto, n, test="mannwhitneyu", n_grupos=2, alpha=0.05, ratio=1.0, distribucion="normal",
+                      n_simulaciones=2000, n_procesos=None, semilla=None, tamaño_lote=None):
+    """
+    Estima por simulación de Monte Carlo la potencia de los tests de Mann-Whitney U y de Kruskal-Wallis para todas
+    las combinaciones de efecto, n, alpha y ratio. Cada combinación se simula por lotes de réplicas, con los rangos
+    de todo el lote calculados a la vez, y los lotes se reparten entre los procesos. Cada lote tiene su propia semilla,
+    derivada de `semilla`, así que el resultado no depende del número de procesos.
+
+    Params:
+        - efecto: desplazamiento del último grupo respecto al resto, en desviaciones típicas; escalar o lista.
+        - n: tamaño de cada grupo (el del primero si hay ratio), escalar o lista.
+        - test (opcional): 'mannwhitneyu' o 'kruskal'. Por defecto es 'mannwhitneyu'.
+        - n_grupos (opcional): número de grupos con Kruskal-Wallis (con Mann-Whitney siempre son 2). Por defecto es 2.
+        - alpha (opcional): nivel de significancia, escalar o lista. Por defecto es 0.05.
+        - ratio (opcional): tamaño del último grupo dividido por el de los demás, escalar o lista. Por defecto es 1.
+        - distribucion (opcional): 'normal', 'exponencial', 'lognormal' o 'uniforme'. Por defecto es 'normal'.
+        - n_simulaciones (opcional): número de experimentos simulados por combinación. Por defecto es 2000.
+        - n_procesos (opcional): número de procesos. Si es None se usan todos los núcleos.
+        - semilla (opcional): semilla para que el resultado sea reproducible.
+        - tamaño_lote (opcional): réplicas por lote. Si es None se elige según el tamaño de las muestras.
+
+    Returns:
+        DataFrame con una fila por combinación, la potencia estimada y su error estándar de Monte Carlo.
+        Los p-valores usan la aproximación normal (como el método asintótico de scipy).
+    """
+    if test not in TESTS_SIMULADOS:
+        raise ValueError(f"Test no válido. Por favor, elige uno de {TESTS_SIMULADOS}.")
+    if distribucion not in DISTRIBUCIONES:
+        raise ValueError(f"Distribución no válida. Por favor, elige una de {DISTRIBUCIONES}.")
+    if test == "mannwhitneyu":
+        n_grupos = 2
+
+    rejilla = _rejilla(efecto=efecto, n=n, alpha=alpha, ratio=ratio)
+    semillas = np.random.SeedSequence(semilla).spawn(len(rejilla["n"]))
+
+    tareas, combinacion = [], []
+    for indice, semilla_punto in enumerate(semillas):
+        n_grupo = int(rejilla["n"][indice])
+        tamaños = [n_grupo] * (n_grupos - 1) + [max(1, int(round(n_grupo * rejilla["ratio"][indice])))]
+        desplazamientos = np.zeros(n_grupos)
+        desplazamientos[-1] = rejilla["efecto"][indice]
+        lote = tamaño_lote or max(1, min(n_simulaciones, VALORES_LOTE // sum(tamaños)))
+        cantidades = [min(lote, n_simulaciones - inicio) for inicio in range(0, n_simulaciones, lote)]
+        for semilla_lote, cantidad in zip(semilla_punto.spawn(len(cantidades)), cantidades):
+            tareas.append((test, distribucion, tamaños, desplazamientos, rejilla["alpha"][indice], semilla_lote, cantidad))
+            combinacion.append(indice)
+
+    n_procesos = min(numero_procesos(n_procesos), len(tareas))
+    pool = abrir_pool({}, n_procesos)
+    try:
+        rechazos = ejecutar_tareas(pool, _lote_potencia, tareas)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    potencia = np.bincount(combinacion, weights=rechazos, minlength=len(semillas)) / n_simulaciones
+    return pd.DataFrame({"efecto": rejilla["efecto"],
+                         "n_grupo": rejilla["n"],
+                         "alpha": rejilla["alpha"],
+                         "ratio": rejilla["ratio"],
+                         "test": test,
+                         "distribucion": distribucion,
+                         "potencia": potencia,
+                         "error_estandar": np.sqrt(potencia * (1 - potencia) / n_simulaciones)})
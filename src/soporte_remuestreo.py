@@ -0,0 +1,236 @@
+# Para importar las librerías pesadas solo cuando se usan
+# -----------------------------------------------------------------------
+from .soporte_perezoso import importar_perezoso
+
+# Tratamiento de datos
+# -----------------------------------------------------------------------
+import numpy as np
+
+# Para pruebas estadísticas
+# -----------------------------------------------------------------------
+stats = importar_perezoso("scipy.stats")
+
+# Para repartir el trabajo entre varios procesos
+# -----------------------------------------------------------------------
+from .soporte_paralelo import abrir_pool, ejecutar_tareas, numero_procesos
+
+
+# memoria (en bytes) que como máximo ocupa la matriz de índices de un lote
+MEMORIA_LOTE = 256 * 2**20
+
+ESTADISTICOS_PERMUTACION = ("diferencia_medias", "diferencia_medianas", "rango_suma", "kruskal")
+
+ESTADISTICOS_BOOTSTRAP = ("diferencia_medias", "diferencia_medianas", "diferencia_proporciones")
+
+def _estadistico_lote(valores, offsets, estadistico):
+    """
+    Calcula el estadístico para cada fila de una matriz (lote, n) cuyas columnas están ordenadas por grupo.
+    """
+    if estadistico == "diferencia_medias":
+        n1 = offsets[1]
+        return valores[:, :n1].mean(axis=1) - valores[:, n1:].mean(axis=1)
+    if estadistico == "diferencia_medianas":
+        n1 = offsets[1]
+        return np.median(valores[:, :n1], axis=1) - np.median(valores[:, n1:], axis=1)
+    if estadistico == "rango_suma":
+        n1, n = offsets[1], valores.shape[1]
+        return valores[:, :n1].sum(axis=1) - n1 * (n + 1) / 2
+    # kruskal: con los rangos fijos, la corrección por empates es la misma en todas las permutaciones
+    n = valores.shape[1]
+    tamaños = np.diff(offsets)
+    sumas = np.add.reduceat(valores, offsets[:-1], axis=1)
+    return 12 / (n * (n + 1)) * (sumas**2 / tamaños).sum(axis=1) - 3 * (n + 1)
+
+
+def _lote_permutaciones(datos, semilla, tamaño):
+    valores, offsets = datos["valores"], datos["offsets"]
+    rng = np.random.default_rng(semilla)
+
+    # matriz de índices: cada fila es una permutación de las n observaciones
+    indices = np.tile(np.arange(len(valores), dtype=datos["tipo_indices"]), (tamaño, 1))
+    permutados = valores[rng.permuted(indices, axis=1)]
+    simulados = _estadistico_lote(permutados, offsets, datos["estadistico"])
+    if datos["dos_colas"]:
+        simulados = np.abs(simulados)
+    return int((simulados >= datos["umbral"]).sum())
+
+
+def test_permutacion(grupos, estadistico="diferencia_medias", n_permutaciones=10_000, alpha=0.05, parada_temprana=True,
+                     confianza=0.999, n_procesos=None, semilla=None, tamaño_lote=None):
+    """
+    Test de permutación para comparar grupos. Las permutaciones se generan por lotes como matrices de índices y el
+    estadístico se calcula de forma vectorizada para todo el lote; los lotes se reparten entre varios procesos,
+    cada uno con su propia semilla derivada de `semilla`, de forma que el resultado es reproducible.
+
+    Params:
+        - grupos: Lista de arrays, uno por grupo. Los nulos se descartan.
+        - estadistico (str, opcional): 'diferencia_medias', 'diferencia_medianas', 'rango_suma' (dos grupos)
+          o 'kruskal' (dos o más grupos). Por defecto es 'diferencia_medias'.
+        - n_permutaciones (int, opcional): Número máximo de permutaciones. Por defecto es 10000.
+        - alpha (float, opcional): Nivel de significancia usado para la parada temprana. Por defecto es 0.05.
+        - parada_temprana (bool, opcional): Si es True, se deja de permutar en cuanto el intervalo de Clopper-Pearson
+          del p-valor queda entero por encima o por debajo de alpha.
+        - confianza (float, opcional): Confianza de ese intervalo. Por defecto es 0.999.
+        - n_procesos (int, opcional): Número de procesos. Si es None se usan todos los núcleos.
+        - semilla (int, opcional): Semilla para que el resultado sea reproducible.
+        - tamaño_lote (int, opcional): Permutaciones por lote. Si es None se calcula para que la matriz de índices
+          de un lote no supere MEMORIA_LOTE.
+
+    Returns:
+        Diccionario con estadistico, p_valor, n_permutaciones (las realizadas) y parada_temprana (si se paró antes).
+    """
+    if estadistico not in ESTADISTICOS_PERMUTACION:
+        raise ValueError(f"Estadístico no válido. Por favor, elige uno de {ESTADISTICOS_PERMUTACION}.")
+
+    grupos = [np.asarray(grupo, dtype=np.float64) for grupo in grupos]
+    grupos = [grupo[~np.isnan(grupo)] for grupo in grupos]
+    if estadistico != "kruskal" and len(grupos) != 2:
+        raise ValueError(f"El estadístico {estadistico} solo compara dos grupos y hay {len(grupos)}.")
+
+    valores = np.concatenate(grupos)
+    offsets = np.concatenate([[0], np.cumsum([len(grupo) for grupo in grupos])])
+    if estadistico in ("rango_suma", "kruskal"):
+        # los rangos se calculan una sola vez: permutar las etiquetas no los cambia
+        valores = stats.rankdata(valores)
+
+    dos_colas = estadistico != "kruskal"
+    observado = _estadistico_lote(valores[None, :], offsets, estadistico)[0]
+    referencia = abs(observado) if dos_colas else observado
+    # pequeña tolerancia para que los empates numéricos con el observado cuenten como extremos
+    umbral = referencia - 1e-12 * max(1.0, abs(referencia))
+
+    tipo_indices = np.int32 if len(valores) < 2**31 else np.int64
+    if tamaño_lote is None:
+        tamaño_lote = int(np.clip(MEMORIA_LOTE // (len(valores) * 16), 1, 2_000))
+    n_procesos = numero_procesos(n_procesos)
+
+    datos = {"valores": valores, "offsets": offsets, "estadistico": estadistico,
+             "dos_colas": dos_colas, "umbral": umbral, "tipo_indices": tipo_indices}
+
+    n_lotes = -(-n_permutaciones // tamaño_lote)
+    tamaños = [tamaño_lote] * (n_lotes - 1) + [n_permutaciones - tamaño_lote * (n_lotes - 1)]
+    semillas = np.random.SeedSequence(semilla).spawn(n_lotes)
+    lotes = list(zip(semillas, tamaños))
+
+    # sin parada temprana se lanza todo de una vez; con ella, por rondas de un lote por proceso
+    ronda = n_procesos if parada_temprana else n_lotes
+    extremos = realizadas = 0
+    parado = False
+    pool = abrir_pool(datos, min(n_procesos, n_lotes))
+    try:
+        for inicio in range(0, n_lotes, ronda):
+            bloque = lotes[inicio:inicio + ronda]
+            extremos += sum(ejecutar_tareas(pool, _lote_permutaciones, bloque, datos))
+            realizadas += sum(tamaño for _, tamaño in bloque)
+
+            if parada_temprana and realizadas < n_permutaciones:
+                inferior = stats.beta.ppf((1 - confianza) / 2, extremos, realizadas - extremos + 1) if extremos else 0.0
+                superior = stats.beta.ppf(1 - (1 - confianza) / 2, extremos + 1, realizadas - extremos)
+                if superior < alpha or inferior > alpha:
+                    parado = True
+                    break
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    return {"estadistico": observado,
+            "p_valor": (extremos + 1) / (realizadas + 1),
+            "n_permutaciones": realizadas,
+            "parada_temprana": parado}
+
+
+def _pesos_bootstrap(rng, tamaño, n, metodo_pesos):
+    """
+    Genera una matriz (tamaño, n) con cuántas veces aparece cada observación en cada réplica.
+    """
+    if metodo_pesos == "poisson":
+        return rng.poisson(1.0, size=(tamaño, n)).astype(np.int32)
+    # multinomial: n extracciones con reemplazo por réplica, contadas con un único bincount
+    extracciones = rng.integers(0, n, size=(tamaño, n)) + (np.arange(tamaño) * n)[:, None]
+    return np.bincount(extracciones.ravel(), minlength=tamaño * n).reshape(tamaño, n).astype(np.int32)
+
+
+def _estadistico_ponderado(valores, pesos, estadistico):
+    """
+    Calcula el estadístico de cada réplica a partir de los pesos. Para la mediana, `valores` debe estar ordenado.
+    """
+    totales = pesos.sum(axis=1)
+    if estadistico == "diferencia_medianas":
+        acumulado = np.cumsum(pesos, axis=1)
+        posiciones = (acumulado < totales[:, None] / 2).sum(axis=1)
+        return valores[np.minimum(posiciones, len(valores) - 1)]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (pesos @ valores) / totales
+
+
+def _lote_bootstrap(datos, semilla, tamaño):
+    rng = np.random.default_rng(semilla)
+    estimaciones = []
+    for valores in (datos["control"], datos["test"]):
+        pesos = _pesos_bootstrap(rng, tamaño, len(valores), datos["metodo_pesos"])
+        estimaciones.append(_estadistico_ponderado(valores, pesos, datos["estadistico"]))
+    return estimaciones[1] - estimaciones[0]
+
+
+def intervalo_bootstrap(control, test, estadistico="diferencia_medias", n_replicas=10_000, confianza=0.95,
+                        metodo_pesos="poisson", n_procesos=None, semilla=None, tamaño_lote=None):
+    """
+    Intervalo de confianza bootstrap (percentil) para la diferencia test - control. Cada réplica se representa con
+    una matriz de pesos (Poisson o multinomial) en lugar de copiar los datos remuestreados, y las réplicas se procesan
+    en lotes de tamaño fijo, de forma que la memoria no depende del número total de réplicas. Los lotes se reparten
+    entre varios procesos con semillas derivadas de `semilla`.
+
+    Params:
+        - control, test: arrays con los datos de cada grupo. Los nulos se descartan.
+        - estadistico (str, opcional): 'diferencia_medias', 'diferencia_medianas' o 'diferencia_proporciones'
+          (datos 0/1). Por defecto es 'diferencia_medias'.
+        - n_replicas (int, opcional): Número de réplicas bootstrap. Por defecto es 10000.
+        - confianza (float, opcional): Nivel de confianza del intervalo. Por defecto es 0.95.
+        - metodo_pesos (str, opcional): 'poisson' (más rápido, aproximado) o 'multinomial' (bootstrap clásico).
+        - n_procesos (int, opcional): Número de procesos. Si es None se usan todos los núcleos.
+        - semilla (int, opcional): Semilla para que el resultado sea reproducible.
+        - tamaño_lote (int, opcional): Réplicas por lote. Si es None se calcula para no superar MEMORIA_LOTE.
+
+    Returns:
+        Diccionario con estimacion, inferior, superior, error_estandar y n_replicas.
+    """
+    if estadistico not in ESTADISTICOS_BOOTSTRAP:
+        raise ValueError(f"Estadístico no válido. Por favor, elige uno de {ESTADISTICOS_BOOTSTRAP}.")
+    if metodo_pesos not in ("poisson", "multinomial"):
+        raise ValueError("Método de pesos no válido. Por favor, elige 'poisson' o 'multinomial'.")
+
+    control, test = [np.asarray(grupo, dtype=np.float64) for grupo in (control, test)]
+    control, test = control[~np.isnan(control)], test[~np.isnan(test)]
+    if estadistico == "diferencia_medianas":
+        # ordenando una sola vez, la mediana ponderada de cada réplica sale de la suma acumulada de sus pesos
+        control, test = np.sort(control), np.sort(test)
+        estimacion = np.median(test) - np.median(control)
+    else:
+        estimacion = test.mean() - control.mean()
+
+    if tamaño_lote is None:
+        # pesos int32 más, para las medianas, su suma acumulada
+        tamaño_lote = int(np.clip(MEMORIA_LOTE // (max(len(control), len(test)) * 16), 1, 2_000))
+    n_procesos = numero_procesos(n_procesos)
+
+    n_lotes = -(-n_replicas // tamaño_lote)
+    tamaños = [tamaño_lote] * (n_lotes - 1) + [n_replicas - tamaño_lote * (n_lotes - 1)]
+    lotes = list(zip(np.random.SeedSequence(semilla).spawn(n_lotes), tamaños))
+    datos = {"control": control, "test": test, "estadistico": estadistico, "metodo_pesos": metodo_pesos}
+
+    pool = abrir_pool(datos, min(n_procesos, n_lotes))
+    try:
+        replicas = np.concatenate(ejecutar_tareas(pool, _lote_bootstrap, lotes, datos))
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    # con pesos de Poisson una réplica puede dejar un grupo vacío; esas réplicas se descartan
+    replicas = replicas[~np.isnan(replicas)]
+    inferior, superior = np.quantile(replicas, [(1 - confianza) / 2, 1 - (1 - confianza) / 2])
+    return {"estimacion": estimacion,
+            "inferior": inferior,
+            "superior": superior,
+            "error_estandar": replicas.std(ddof=1),
+            "n_replicas": len(replicas)}
+
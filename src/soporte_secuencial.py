@@ -0,0 +1,171 @@
+# Tratamiento de datos
+# -----------------------------------------------------------------------
+import numpy as np
+
+# Otras librerias
+# -----------------------------------------------------------------------
+import math
+
+
+class ContadorConversiones:
+    """
+    Guarda solo las exposiciones y las conversiones de los grupos de control y de test, de forma que el test Z
+    de proporciones se puede consultar en cualquier momento sin volver a recorrer el histórico. Los eventos se
+    añaden por lotes en O(tamaño del lote).
+
+    Incluye además un modo secuencial (mSPRT, mixture sequential probability ratio test) que da un p-valor
+    "siempre válido": se puede consultar después de cada lote tantas veces como se quiera sin inflar el error de tipo I.
+
+    Attributes:
+        - categoria_control, categoria_test: valores de las categorías de cada grupo.
+        - exposiciones: array [control, test] con el número de usuarios expuestos.
+        - conversiones: array [control, test] con el número de conversiones.
+        - tau: desviación típica de la distribución a priori del efecto usada por el mSPRT.
+        - p_valor_secuencial: p-valor siempre válido tras el último lote.
+    """
+
+    def __init__(self, categoria_control, categoria_test, tau=0.01):
+        """
+        Inicializa un contador vacío.
+
+        Params:
+            - categoria_control: Valor de la categoría de control.
+            - categoria_test: Valor de la categoría de prueba.
+            - tau (opcional): Tamaño de efecto (diferencia de proporciones) esperado, usado como desviación típica
+              de la mezcla del mSPRT. Por defecto es 0.01.
+        """
+        self.categoria_control = categoria_control
+        self.categoria_test = categoria_test
+        self.tau = tau
+        self.exposiciones = np.zeros(2, dtype=np.int64)
+        self.conversiones = np.zeros(2, dtype=np.int64)
+        self.p_valor_secuencial = 1.0
+
+    @classmethod
+    def desde_dataframe(cls, dataframe, columna_grupo, columna_respuesta, categoria_control, categoria_test, tau=0.01):
+        """
+        Crea un contador con los datos de un DataFrame.
+
+        Params:
+            - dataframe: DataFrame que contiene los datos.
+            - columna_grupo: Nombre de la columna que contiene las categorías.
+            - columna_respuesta: Nombre de la columna con las conversiones (0/1).
+            - categoria_control, categoria_test: Valores de las categorías de control y de prueba.
+            - tau (opcional): Ver `__init__`.
+
+        Returns:
+            Una instancia de ContadorConversiones.
+        """
+        contador = cls(categoria_control, categoria_test, tau)
+        return contador.actualizar(dataframe[columna_grupo].to_numpy(), dataframe[columna_respuesta].to_numpy())
+
+    def actualizar(self, grupos, conversiones):
+        """
+        Añade un lote de eventos.
+
+        Params:
+            - grupos: array con la categoría de cada evento; los de otras categorías se ignoran.
+            - conversiones: array con 0/1 (o True/False) para cada evento; los nulos no cuentan como exposición.
+
+        Returns:
+            El propio contador.
+        """
+        grupos = np.asarray(grupos)
+        conversiones = np.asarray(conversiones, dtype=np.float64)
+        validos = ~np.isnan(conversiones)
+        es_control = (grupos == self.categoria_control) & validos
+        es_test = (grupos == self.categoria_test) & validos
+        return self.actualizar_conteos(es_control.sum(), conversiones[es_control].sum(),
+                                       es_test.sum(), conversiones[es_test].sum())
+
+    def actualizar_conteos(self, exposiciones_control, conversiones_control, exposiciones_test, conversiones_test):
+        """
+        Añade conteos ya agregados (por ejemplo, los de un minuto de tráfico).
+
+        Params:
+            - exposiciones_control, conversiones_control: Conteos del grupo de control.
+            - exposiciones_test, conversiones_test: Conteos del grupo de test.
+
+        Returns:
+            El propio contador.
+        """
+        self.exposiciones += np.array([exposiciones_control, exposiciones_test], dtype=np.int64)
+        self.conversiones += np.array([conversiones_control, conversiones_test], dtype=np.int64)
+        # el p-valor siempre válido es el mínimo de 1 / Λ sobre todos los momentos en que se ha mirado
+        self.p_valor_secuencial = min(self.p_valor_secuencial, 1 / self.razon_verosimilitud())
+        return self
+
+    def combinar(self, otro):
+        """
+        Suma los conteos de otro contador (por ejemplo, el de otra partición de los datos).
+
+        Params:
+            - otro: Otra instancia de ContadorConversiones con las mismas categorías.
+
+        Returns:
+            El propio contador.
+        """
+        return self.actualizar_conteos(otro.exposiciones[0], otro.conversiones[0], otro.exposiciones[1], otro.conversiones[1])
+
+    @property
+    def proporciones(self):
+        """
+        Tasa de conversión de control y de test.
+        """
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self.conversiones / self.exposiciones
+
+    def z_test(self):
+        """
+        Test Z de proporciones con la proporción combinada, igual que `proportions_ztest` con [control, test].
+
+        Returns:
+            Tupla (estadístico Z, p-valor). NaN si algún grupo no tiene datos.
+        """
+        n_control, n_test = self.exposiciones
+        if n_control == 0 or n_test == 0:
+            return np.nan, np.nan
+        p_control, p_test = self.proporciones
+        p_combinada = self.conversiones.sum() / self.exposiciones.sum()
+        error = np.sqrt(p_combinada * (1 - p_combinada) * (1 / n_control + 1 / n_test))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            z = (p_control - p_test) / error
+        # 2·P(Z > |z|) = erfc(|z| / √2), sin necesidad de scipy
+        return z, math.erfc(abs(z) / math.sqrt(2)) if np.isfinite(z) else np.nan
+
+    def razon_verosimilitud(self):
+        """
+        Razón de verosimilitudes del mSPRT con mezcla normal N(0, tau²) sobre la diferencia de proporciones,
+        usando la aproximación normal de la diferencia observada.
+
+        Returns:
+            El valor Λ (1 si todavía no hay datos suficientes).
+        """
+        n_control, n_test = self.exposiciones
+        if n_control == 0 or n_test == 0:
+            return 1.0
+        p_control, p_test = self.proporciones
+        varianza = p_control * (1 - p_control) / n_control + p_test * (1 - p_test) / n_test
+        if varianza <= 0:
+            return 1.0
+        tau2 = self.tau**2
+        diferencia = p_test - p_control
+        return np.sqrt(varianza / (varianza + tau2)) * np.exp(tau2 * diferencia**2 / (2 * varianza * (varianza + tau2)))
+
+    def resultado_secuencial(self, alpha=0.05):
+        """
+        Devuelve el estado del experimento en modo secuencial.
+
+        Params:
+            - alpha (opcional): Nivel de significancia. Por defecto es 0.05.
+
+        Returns:
+            Diccionario con exposiciones, conversiones, diferencia (test - control), p_valor_siempre_valido
+            y significativo (True si ya se puede parar el experimento rechazando la hipótesis nula).
+        """
+        p_control, p_test = self.proporciones
+        return {"exposiciones": self.exposiciones.tolist(),
+                "conversiones": self.conversiones.tolist(),
+                "diferencia": p_test - p_control,
+                "p_valor_siempre_valido": self.p_valor_secuencial,
+                "significativo": bool(self.p_valor_secuencial < alpha)}
@@ -0,0 +1,187 @@
+# Para importar las librerías pesadas solo cuando se usan
+# -----------------------------------------------------------------------
+from .soporte_perezoso import importar_perezoso
+
+# Tratamiento de datos
+# -----------------------------------------------------------------------
+import numpy as np
+pd = importar_perezoso("pandas")
+
+# Para pruebas estadísticas
+# -----------------------------------------------------------------------
+stats = importar_perezoso("scipy.stats")
+
+# Para separar los datos en grupos y calcular los tests
+# -----------------------------------------------------------------------
+from .soporte_grupos import momentos_por_grupo, estadistico_kruskal, estadistico_mannwhitney, TESTS_PAREJA
+from .soporte_exactas import mannwhitney_exacto, metodo_mannwhitney
+from .soporte_acumuladores import AcumuladorMomentos, test_t_resumenes, test_anova_resumenes
+from .soporte_posthoc import ajustar_pvalores
+from .soporte_tablas import numero_filas, a_numpy, factorizar_columna
+from .soporte_instrumentacion import etapa
+
+
+# Para repetir la comparación dentro de cada segmento (cada combinación de valores de una o varias columnas) no se
+# filtra el DataFrame segmento a segmento: se codifica cada fila con un número de segmento, se ordena todo una sola
+# vez por (segmento, grupo) -o por (segmento, valor) para los tests de rangos- y los tests se calculan para todos los
+# segmentos a la vez sobre bloques contiguos, con bincount y reduceat. El coste es el de una ordenación de los datos
+# más O(número de segmentos), aunque haya decenas de miles de segmentos.
+
+TESTS_SEGMENTO = ("z", "t", "welch", "anova", "mannwhitneyu", "kruskal")
+
+
+def _codificar_segmentos(dataframe, columnas_segmento):
+    """
+    Combina los códigos de las columnas de segmento en un único código por fila (-1 si alguna columna es nula).
+
+    Returns:
+        Tupla (codigo de segmento por fila, lista de códigos por columna, lista de categorías por columna).
+    """
+    codigos, categorias = zip(*[factorizar_columna(dataframe, columna) for columna in columnas_segmento])
+    validos = np.logical_and.reduce([codigo >= 0 for codigo in codigos])
+    parcial = codigos[0][validos].astype(np.int64)
+    for codigo, categoria in zip(codigos[1:], categorias[1:]):
+        # se vuelve a factorizar tras cada columna, así los códigos no pasan del número de combinaciones que
+        # aparecen en los datos y el producto no se desborda aunque haya muchas columnas con muchas categorías;
+        # np.unique conserva el orden lexicográfico de las columnas
+        _, parcial = np.unique(parcial * len(categoria) + codigo[validos], return_inverse=True)
+    combinado = np.full(len(codigos[0]), -1, dtype=np.int64)
+    combinado[validos] = parcial
+    return combinado, codigos, categorias
+
+
+def _resumenes(tamaños, medias, m2):
+    """
+    Un AcumuladorMomentos por grupo, con los segmentos como columnas, para usar los tests a partir de resúmenes.
+    """
+    vacio = np.full(tamaños.shape[0], np.nan)
+    return [AcumuladorMomentos.desde_resumen(range(tamaños.shape[0]), tamaños[:, j], medias[:, j], m2[:, j], vacio, vacio)
+            for j in range(tamaños.shape[1])]
+
+
+def _rangos_por_segmento(valores, segmento, inicios, n_segmentos):
+    """
+    Rangos medios dentro de cada segmento y término de empates por segmento, con los datos ya ordenados por
+    (segmento, valor).
+    """
+    n = len(valores)
+    nuevo = np.ones(n, dtype=bool)
+    nuevo[1:] = (segmento[1:] != segmento[:-1]) | (valores[1:] != valores[:-1])
+    posiciones = np.flatnonzero(nuevo)
+    longitudes = np.diff(np.append(posiciones, n))
+    rangos = np.repeat(posiciones - inicios[segmento[posiciones]] + (longitudes + 1) / 2, longitudes)
+    t = longitudes.astype(np.float64)
+    return rangos, np.bincount(segmento[posiciones], weights=t**3 - t, minlength=n_segmentos)
+
+
+def pruebas_por_segmento(dataframe, columnas_segmento, columna_grupo, columna_respuesta, test="t", categorias=None,
+                         correccion="bh", alpha=0.05):
+    """
+    Repite el mismo test dentro de cada segmento de los datos, para todos los segmentos a la vez, y corrige los
+    p-valores por comparaciones múltiples. Las filas con algún nulo en las columnas de segmento, en el grupo o en la
+    respuesta se descartan.
+
+    Params:
+        - dataframe: DataFrame que contiene los datos (también de Polars o una tabla de PyArrow).
+        - columnas_segmento: nombre o lista de nombres de las columnas que definen los segmentos.
+        - columna_grupo: nombre de la columna que contiene las categorías.
+        - columna_respuesta: nombre de la columna de respuesta (0/1 para el test z).
+        - test (opcional): 'z', 't', 'welch', 'anova', 'mannwhitneyu' o 'kruskal'. Por defecto es 't'.
+        - categorias (opcional): categorías a comparar; en los tests de dos grupos, [control, test]. Si es None se
+          usan todas.
+        - correccion (opcional): 'bh' (Benjamini-Hochberg), 'holm', 'bonferroni' o None. Por defecto es 'bh'.
+        - alpha (opcional): nivel de significancia. Por defecto es 0.05.
+
+    Returns:
+        DataFrame con una fila por segmento: las columnas de segmento, test, n, en los tests de dos grupos n_control,
+        n_test, media_control, media_test y diferencia (test - control), y estadistico, p_valor, p_ajustado y
+        significativo. Los segmentos en los que falta alguna categoría tienen p-valor NaN y no cuentan en la corrección.
+    """
+    if test not in TESTS_SEGMENTO:
+        raise ValueError(f"Test no válido. Por favor, elige uno de {TESTS_SEGMENTO}.")
+    columnas_segmento = [columnas_segmento] if isinstance(columnas_segmento, str) else list(columnas_segmento)
+
+    with etapa("separar_segmentos", filas=numero_filas(dataframe)):
+        combinado, codigos_segmento, categorias_segmento = _codificar_segmentos(dataframe, columnas_segmento)
+        codigos_grupo, nombres_grupo = factorizar_columna(dataframe, columna_grupo)
+        valores = a_numpy(dataframe, [columna_respuesta])[:, 0]
+
+        categorias = list(nombres_grupo) if categorias is None else list(categorias)
+        if test in TESTS_PAREJA and len(categorias) != 2:
+            raise ValueError(f"El test {test} solo compara dos grupos y hay {len(categorias)}.")
+        # posición de cada grupo en `categorias`; la última casilla recoge los nulos (código -1)
+        posicion = np.full(len(nombres_grupo) + 1, -1, dtype=np.int64)
+        indices = {nombre: i for i, nombre in enumerate(nombres_grupo)}
+        for j, categoria in enumerate(categorias):
+            if categoria not in indices:
+                raise KeyError(f"La categoría {categoria} no existe en los datos.")
+            posicion[indices[categoria]] = j
+        grupo = posicion[codigos_grupo]
+
+        filas = np.flatnonzero((combinado >= 0) & (grupo >= 0) & ~np.isnan(valores))
+        # una única ordenación: por valor dentro de cada segmento para los rangos, por grupo para los momentos
+        clave = valores[filas] if test in ("mannwhitneyu", "kruskal") else grupo[filas]
+        filas = filas[np.lexsort((clave, combinado[filas]))]
+        combinado, grupo, valores = combinado[filas], grupo[filas], valores[filas]
+
+        nuevo = np.ones(len(filas), dtype=bool)
+        nuevo[1:] = combinado[1:] != combinado[:-1]
+        inicios = np.flatnonzero(nuevo)
+        segmento = np.cumsum(nuevo) - 1
+        n_segmentos, k = len(inicios), len(categorias)
+        celda = segmento * k + grupo
+        tamaños = np.bincount(celda, minlength=n_segmentos * k).reshape(n_segmentos, k)
+
+    resultado = pd.DataFrame({columna: categorias_segmento[j][codigos_segmento[j][filas[inicios]]]
+                              for j, columna in enumerate(columnas_segmento)})
+    resultado["test"] = test
+    resultado["n"] = tamaños.sum(axis=1)
+
+    with etapa(f"test_{test}", filas=len(filas), segmentos=n_segmentos), np.errstate(invalid="ignore", divide="ignore"):
+        if test in ("mannwhitneyu", "kruskal"):
+            rangos, empates = _rangos_por_segmento(valores, segmento, inicios, n_segmentos)
+            sumas = np.bincount(celda, weights=rangos, minlength=n_segmentos * k).reshape(n_segmentos, k)
+            if test == "kruskal":
+                estadistico, p_valor = estadistico_kruskal(sumas.T, tamaños.T, empates)
+            else:
+                n1, n2 = tamaños[:, 0], tamaños[:, 1]
+                estadistico, p_valor = estadistico_mannwhitney(sumas[:, 0], n1, n2, empates)
+                # como scipy, los segmentos pequeños sin empates usan la distribución exacta (en caché, salvo que
+                # la tabla sea demasiado grande); son pocos, así que se calculan uno a uno
+                exactos, en_tablas = metodo_mannwhitney(n1, n2, empates)
+                for s in np.flatnonzero(en_tablas):
+                    estadistico[s], p_valor[s] = mannwhitney_exacto(estadistico[s], n1[s], n2[s])
+                finales = np.append(inicios[1:], len(filas))
+                for s in np.flatnonzero(exactos & ~en_tablas):
+                    tramo = slice(inicios[s], finales[s])
+                    valores_segmento, grupo_segmento = valores[tramo], grupo[tramo]
+                    estadistico[s], p_valor[s] = stats.mannwhitneyu(valores_segmento[grupo_segmento == 0],
+                                                                    valores_segmento[grupo_segmento == 1], method="exact")
+            medias = np.bincount(celda, weights=valores, minlength=n_segmentos * k).reshape(n_segmentos, k) / tamaños
+        else:
+            _, medias, m2 = momentos_por_grupo(valores[:, None], np.append(0, np.cumsum(tamaños.ravel())))
+            medias, m2 = medias.reshape(n_segmentos, k), m2.reshape(n_segmentos, k)
+            if test == "z":
+                conversiones = medias * tamaños
+                p_combinada = conversiones.sum(axis=1) / tamaños.sum(axis=1)
+                error = np.sqrt(p_combinada * (1 - p_combinada) * (1 / tamaños[:, 0] + 1 / tamaños[:, 1]))
+                estadistico = (medias[:, 0] - medias[:, 1]) / error
+                p_valor = 2 * stats.norm.sf(np.abs(estadistico))
+            elif test == "anova":
+                estadistico, p_valor = test_anova_resumenes(_resumenes(tamaños, medias, m2))
+            else:
+                control, prueba = _resumenes(tamaños, medias, m2)
+                estadistico, p_valor = test_t_resumenes(control, prueba, varianzas_iguales=(test == "t"))
+
+    if test in TESTS_PAREJA:
+        resultado["n_control"], resultado["n_test"] = tamaños[:, 0], tamaños[:, 1]
+        resultado["media_control"], resultado["media_test"] = medias[:, 0], medias[:, 1]
+        resultado["diferencia"] = medias[:, 1] - medias[:, 0]
+
+    # si falta alguna categoría en el segmento no hay test
+    incompletos = (tamaños == 0).any(axis=1)
+    resultado["estadistico"] = np.where(incompletos, np.nan, estadistico)
+    resultado["p_valor"] = np.where(incompletos, np.nan, p_valor)
+    resultado["p_ajustado"] = ajustar_pvalores(resultado["p_valor"].to_numpy(), correccion)
+    resultado["significativo"] = resultado["p_ajustado"] < alpha
+    return resultado
@@ -0,0 +1,408 @@
+# Para importar las librerías pesadas solo cuando se usan
+# -----------------------------------------------------------------------
+from .soporte_perezoso import importar_perezoso
+
+# Tratamiento de datos
+# -----------------------------------------------------------------------
+import numpy as np
+pd = importar_perezoso("pandas")
+
+# Para separar los datos en grupos
+# -----------------------------------------------------------------------
+from .soporte_grupos import GruposContiguos, factorizar
+
+
+# Las clases y funciones de análisis aceptan, además de un DataFrame de pandas, un DataFrame o un LazyFrame de Polars
+# o una tabla de PyArrow. Con estos últimos no se convierte la tabla entera a pandas: se seleccionan solo las
+# columnas necesarias (en un LazyFrame la selección y los filtros se aplican antes de leer los datos) y la separación
+# en grupos, los conteos y los agregados de `exploracion_dataframe` los calcula el propio motor. A numpy solo llegan
+# los arrays de cada grupo, ya contiguos, y a pandas solo las tablas de resultados, que son pequeñas.
+# Ni Polars ni PyArrow son dependencias: solo se importan si los datos ya vienen en esos formatos.
+
+PERCENTILES = [0.25, 0.5, 0.75]
+
+
+def tipo_tabla(datos):
+    """
+    Identifica el formato de los datos sin importar Polars ni PyArrow.
+
+    Returns:
+        'pandas', 'polars', 'polars_lazy' o 'arrow'.
+    """
+    modulo = type(datos).__module__.split(".")[0]
+    if modulo == "polars":
+        return "polars_lazy" if type(datos).__name__ == "LazyFrame" else "polars"
+    if modulo == "pyarrow":
+        if type(datos).__name__ != "Table":
+            raise TypeError("De PyArrow solo se aceptan tablas (pyarrow.Table).")
+        return "arrow"
+    return "pandas"
+
+
+def es_nativa(datos):
+    """
+    True si los datos son de Polars o de PyArrow.
+    """
+    return tipo_tabla(datos) != "pandas"
+
+
+def _polars():
+    import polars as pl
+
+    return pl
+
+
+def _seleccionar(datos, columnas):
+    """
+    Devuelve solo las columnas indicadas, como DataFrame de Polars o tabla de PyArrow (un LazyFrame se ejecuta
+    leyendo solo esas columnas).
+    """
+    tipo = tipo_tabla(datos)
+    if tipo == "polars_lazy":
+        return datos.select(columnas).collect()
+    return datos.select(columnas)
+
+
+def numero_filas(datos):
+    """
+    Número de filas, o None en un LazyFrame, donde no se sabe sin ejecutar la consulta.
+    """
+    tipo = tipo_tabla(datos)
+    if tipo == "polars_lazy":
+        return None
+    if tipo == "arrow":
+        return datos.num_rows
+    return len(datos)
+
+
+def _esquema(datos):
+    tipo = tipo_tabla(datos)
+    if tipo == "polars_lazy":
+        return dict(datos.collect_schema())
+    if tipo == "polars":
+        return dict(datos.schema)
+    return {campo.name: campo.type for campo in datos.schema}
+
+
+def columnas_por_tipo(datos):
+    """
+    Columnas numéricas y categóricas (de texto), equivalentes a `select_dtypes(include="number")` y
+    `select_dtypes(include="O")` de pandas.
+
+    Returns:
+        Tupla (lista de columnas numéricas, lista de columnas categóricas).
+    """
+    if not es_nativa(datos):
+        return datos.select_dtypes(include="number").columns.tolist(), datos.select_dtypes(include="O").columns.tolist()
+
+    numericas, categoricas = [], []
+    if tipo_tabla(datos) == "arrow":
+        import pyarrow as pa
+
+        for columna, tipo in _esquema(datos).items():
+            if pa.types.is_integer(tipo) or pa.types.is_floating(tipo) or pa.types.is_decimal(tipo):
+                numericas.append(columna)
+            elif pa.types.is_string(tipo) or pa.types.is_large_string(tipo) or pa.types.is_dictionary(tipo):
+                categoricas.append(columna)
+    else:
+        pl = _polars()
+        for columna, tipo in _esquema(datos).items():
+            if tipo.is_numeric():
+                numericas.append(columna)
+            elif tipo == pl.String or isinstance(tipo, (pl.Categorical, pl.Enum)):
+                categoricas.append(columna)
+    return numericas, categoricas
+
+
+def a_numpy(datos, columnas):
+    """
+    Matriz float64 (n, m) con las columnas indicadas; los nulos pasan a NaN.
+    """
+    columnas = list(columnas)
+    tipo = tipo_tabla(datos)
+    if tipo == "pandas":
+        return datos[columnas].to_numpy(dtype=np.float64)
+    if tipo == "arrow":
+        import pyarrow as pa
+
+        tabla = datos.select(columnas)
+        return np.column_stack([tabla.column(columna).cast(pa.float64()).to_numpy() for columna in columnas]) \
+            if columnas else np.empty((tabla.num_rows, 0))
+    pl = _polars()
+    return _seleccionar(datos, [pl.col(columna).cast(pl.Float64) for columna in columnas]).to_numpy()
+
+
+def factorizar_columna(datos, columna):
+    """
+    Igual que `factorizar`, pero para una columna de cualquier formato. En Polars y PyArrow se usa la codificación
+    por diccionario de Arrow, que respeta el orden de aparición.
+
+    Returns:
+        Tupla (codigos, categorias), con -1 para los nulos.
+    """
+    if not es_nativa(datos):
+        return factorizar(datos[columna])
+    serie = _seleccionar(datos, [columna])
+    serie = serie.get_column(columna).to_arrow() if tipo_tabla(datos) != "arrow" else serie.column(columna)
+    codificada = serie.combine_chunks().dictionary_encode() if hasattr(serie, "combine_chunks") else serie.dictionary_encode()
+    categorias = np.asarray(codificada.dictionary.to_pylist(), dtype=object)
+    tipo = np.int16 if len(categorias) < 2**15 else np.int64
+    codigos = codificada.indices.fill_null(-1).to_numpy(zero_copy_only=False).astype(tipo)
+    return codigos, categorias
+
+
+def grupos_contiguos(datos, columna_grupo, columna_respuesta):
+    """
+    Igual que `GruposContiguos.desde_dataframe`, pero para cualquier formato. En Polars y PyArrow la separación se
+    hace en el propio motor, con una agregación por grupo (en orden de aparición) que junta los valores de cada
+    grupo en una lista; esas listas, una detrás de otra, ya son los grupos contiguos. Los nulos del grupo se descartan.
+
+    Params:
+        - datos: DataFrame de pandas o de Polars, LazyFrame de Polars o tabla de PyArrow.
+        - columna_grupo: nombre de la columna que contiene las categorías.
+        - columna_respuesta: nombre (o lista de nombres) de la columna de respuesta.
+
+    Returns:
+        Una instancia de GruposContiguos.
+    """
+    tipo = tipo_tabla(datos)
+    if tipo == "pandas":
+        return GruposContiguos.desde_dataframe(datos, columna_grupo, columna_respuesta)
+
+    respuestas = [columna_respuesta] if isinstance(columna_respuesta, str) else list(columna_respuesta)
+    if tipo == "arrow":
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        tabla = datos.select([columna_grupo] + respuestas)
+        tabla = tabla.filter(pc.is_valid(tabla.column(columna_grupo)))
+        # sin hilos, Arrow devuelve los grupos en orden de aparición y los valores de cada uno en el orden original
+        agregado = tabla.group_by(columna_grupo, use_threads=False).aggregate([(columna, "list") for columna in respuestas])
+        categorias = np.asarray(agregado.column(columna_grupo).to_pylist(), dtype=object)
+        listas = [agregado.column(f"{columna}_list").combine_chunks() for columna in respuestas]
+        tamaños = pc.list_value_length(listas[0]).to_numpy(zero_copy_only=False)
+        valores = [pc.list_flatten(lista).cast(pa.float64()).to_numpy(zero_copy_only=False) for lista in listas]
+    else:
+        pl = _polars()
+        agregado = (datos.lazy()
+                    .select(pl.col(columna_grupo), *[pl.col(columna).cast(pl.Float64) for columna in respuestas])
+                    .filter(pl.col(columna_grupo).is_not_null())
+                    .group_by(columna_grupo, maintain_order=True)
+                    .agg(pl.col(respuestas))
+                    .collect())
+        categorias = agregado.get_column(columna_grupo).to_numpy()
+        tamaños = agregado.get_column(respuestas[0]).list.len().to_numpy()
+        valores = [agregado.get_column(columna).explode().to_numpy() for columna in respuestas]
+
+    offsets = np.zeros(len(categorias) + 1, dtype=np.int64)
+    np.cumsum(tamaños, out=offsets[1:])
+    valores = valores[0] if isinstance(columna_respuesta, str) else np.column_stack(valores)
+    return GruposContiguos(categorias, valores, offsets)
+
+
+def referencias_columnas(datos, columnas):
+    """
+    Objetos que guardan los datos de las columnas indicadas, para usarlos como clave de caché (con `misma_clave`)
+    sin recorrer los datos. Cambian cuando se reasigna una columna o se filtran, ordenan o borran filas, pero
+    no cuando se modifican valores en el sitio (por ejemplo con `loc`). Las tablas de Polars y PyArrow no se
+    modifican en el sitio, así que para ellas basta con la propia tabla.
+    """
+    if es_nativa(datos):
+        return (datos,)
+    referencias = []
+    for columna in columnas:
+        serie = datos[columna]
+        if isinstance(serie.array, pd.arrays.NumpyExtensionArray):
+            # el array de numpy de la serie es una vista nueva en cada acceso; se guarda el bloque del que sale
+            array = serie.to_numpy()
+            while isinstance(array.base, np.ndarray):
+                array = array.base
+            referencias.append(array)
+        else:
+            referencias.append(serie.array)
+    return tuple(referencias)
+
+
+def misma_clave(clave_a, clave_b):
+    """
+    Compara dos claves de caché (nombres, referencias): los nombres con `==` y las referencias de
+    `referencias_columnas` con `is`, para no comparar los datos.
+    """
+    if clave_a is None:
+        return False
+    (nombres_a, referencias_a), (nombres_b, referencias_b) = clave_a, clave_b
+    return (nombres_a == nombres_b and len(referencias_a) == len(referencias_b)
+            and all(a is b for a, b in zip(referencias_a, referencias_b)))
+
+
+def a_pandas(datos, columnas=None):
+    """
+    Convierte a pandas solo las columnas indicadas (todas si es None).
+    """
+    if not es_nativa(datos):
+        return datos if columnas is None else datos[list(columnas)]
+    if columnas is not None:
+        datos = _seleccionar(datos, list(columnas))
+    elif tipo_tabla(datos) == "polars_lazy":
+        datos = datos.collect()
+    return datos.to_pandas()
+
+
+def _resumen_categoricas(conteos, columna_control, columnas_categoricas):
+    """
+    A partir de los conteos (control, columna, valor, n) calcula count, unique, top y freq de cada columna categórica
+    por categoría de control, como `describe(include="O")`.
+    """
+    resumenes = {}
+    for (categoria, columna), grupo in conteos.groupby(["control", "columna"], sort=False):
+        mayor = grupo["n"].to_numpy().argmax()
+        resumenes.setdefault(categoria, {})[columna] = {"count": grupo["n"].sum(), "unique": len(grupo),
+                                                        "top": grupo["valor"].iloc[mayor], "freq": grupo["n"].iloc[mayor]}
+    return {categoria: pd.DataFrame(por_columna).T.reindex(columnas_categoricas).dropna(how="all")
+            for categoria, por_columna in resumenes.items()}
+
+
+def _informe_polars(datos, columna_control, columnas_numericas, columnas_categoricas):
+    pl = _polars()
+    lf = datos.lazy()
+    esquema = _esquema(datos)
+    flotantes = [columna for columna in columnas_numericas if esquema[columna].is_float()]
+    # pandas cuenta los NaN como nulos: en Polars los pasamos a nulos antes de agregar
+    lf = lf.with_columns([pl.col(columna).fill_nan(None) for columna in flotantes])
+
+    generales = lf.select(pl.len().alias("filas"), *[pl.col(columna).null_count() for columna in esquema]).collect().row(0)
+    filas, nulos = generales[0], dict(zip(esquema, generales[1:]))
+    duplicados = filas - lf.unique().select(pl.len()).collect().item()
+
+    valores_categoricas = {}
+    for columna in columnas_categoricas:
+        top = (lf.filter(pl.col(columna).is_not_null()).group_by(columna).agg(pl.len().alias("count"))
+                 .sort(["count", columna], descending=[True, False]).head(5).collect())
+        valores_categoricas[columna] = pd.DataFrame({"count": top.get_column("count").to_numpy()},
+                                                    index=pd.Index(top.get_column(columna).to_list(), name=columna))
+
+    conteos = pl.concat([lf.filter(pl.col(columna).is_not_null())
+                           .group_by(pl.col(columna_control).alias("control"), pl.col(columna).cast(pl.String).alias("valor"),
+                                     maintain_order=True).agg(pl.len().alias("n"))
+                           .select("control", pl.lit(columna).alias("columna"), "valor", "n")
+                         for columna in columnas_categoricas]).collect().to_pandas() if columnas_categoricas else None
+
+    agregados = []
+    for columna in columnas_numericas:
+        agregados += [pl.col(columna).count().alias(f"{columna}|count"),
+                      pl.col(columna).mean().alias(f"{columna}|mean"),
+                      pl.col(columna).std().alias(f"{columna}|std"),
+                      pl.col(columna).min().cast(pl.Float64).alias(f"{columna}|min")]
+        agregados += [pl.col(columna).quantile(q, interpolation="linear").alias(f"{columna}|{q:.0%}") for q in PERCENTILES]
+        agregados.append(pl.col(columna).max().cast(pl.Float64).alias(f"{columna}|max"))
+    numericos = lf.group_by(columna_control, maintain_order=True).agg(agregados).collect().to_pandas()
+
+    tipos = {columna: str(tipo) for columna, tipo in esquema.items()}
+    return filas, duplicados, nulos, tipos, valores_categoricas, conteos, numericos
+
+
+def _informe_arrow(datos, columna_control, columnas_numericas, columnas_categoricas):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    filas = datos.num_rows
+    nulos = {}
+    for columna in datos.column_names:
+        serie = datos.column(columna)
+        nulos[columna] = serie.null_count
+        if pa.types.is_floating(serie.type):
+            nulos[columna] += pc.sum(pc.is_nan(serie)).as_py() or 0
+    duplicados = filas - datos.group_by(datos.column_names, use_threads=False).aggregate([]).num_rows
+
+    valores_categoricas = {}
+    for columna in columnas_categoricas:
+        top = datos.filter(pc.is_valid(datos.column(columna))).group_by(columna).aggregate([([], "count_all")]) \
+                   .sort_by([("count_all", "descending"), (columna, "ascending")]).slice(0, 5)
+        valores_categoricas[columna] = pd.DataFrame({"count": top.column("count_all").to_numpy()},
+                                                    index=pd.Index(top.column(columna).to_pylist(), name=columna))
+
+    conteos = None
+    if columnas_categoricas:
+        partes = []
+        for columna in columnas_categoricas:
+            # con nombres propios para que funcione también cuando la columna es la de control
+            pareja = pa.table({"control": datos.column(columna_control), "valor": datos.column(columna)})
+            agregado = pareja.filter(pc.is_valid(pareja.column("valor"))) \
+                             .group_by(["control", "valor"], use_threads=False).aggregate([([], "count_all")])
+            partes.append(pd.DataFrame({"control": agregado.column("control").to_pylist(),
+                                        "columna": columna,
+                                        "valor": agregado.column("valor").cast(pa.string()).to_pylist(),
+                                        "n": agregado.column("count_all").to_numpy()}))
+        conteos = pd.concat(partes, ignore_index=True)
+
+    # los momentos, el mínimo y el máximo los agrega Arrow; los cuartiles exactos salen de los grupos contiguos
+    # el control va con un nombre propio, porque si es numérico también está entre las columnas numéricas
+    clave = "|control"
+    while clave in columnas_numericas:
+        clave += "|"
+    tabla = pa.table([datos.column(columna_control)] + [datos.column(columna) for columna in columnas_numericas],
+                     names=[clave] + columnas_numericas)
+    # las filas con el control nulo no forman grupo, igual que en pandas
+    tabla = tabla.filter(pc.is_valid(tabla.column(clave)))
+    for indice, columna in enumerate(columnas_numericas, start=1):
+        serie = tabla.column(indice).cast(pa.float64())
+        tabla = tabla.set_column(indice, columna, pc.if_else(pc.is_nan(serie), None, serie))
+    agregados = [([], "count_all")]
+    for columna in columnas_numericas:
+        agregados += [(columna, "count"), (columna, "mean"), (columna, "stddev", pc.VarianceOptions(ddof=1)),
+                      (columna, "min"), (columna, "max")]
+    agregado = tabla.group_by(clave, use_threads=False).aggregate(agregados)
+    numericos = pd.DataFrame({columna_control: agregado.column(clave).to_pylist()})
+    grupos = grupos_contiguos(tabla, clave, columnas_numericas) if columnas_numericas else None
+    for j, columna in enumerate(columnas_numericas):
+        for estadistico in ("count", "mean", "stddev", "min", "max"):
+            nombre = "std" if estadistico == "stddev" else estadistico
+            numericos[f"{columna}|{nombre}"] = agregado.column(f"{columna}_{estadistico}").to_numpy(zero_copy_only=False)
+        cuartiles = [np.nanpercentile(grupo[:, j], [q * 100 for q in PERCENTILES]) if np.isfinite(grupo[:, j]).any()
+                     else np.full(len(PERCENTILES), np.nan) for grupo in grupos.seleccionar(numericos[columna_control])]
+        for q, valores in zip(PERCENTILES, np.asarray(cuartiles, dtype=np.float64).reshape(-1, len(PERCENTILES)).T):
+            numericos[f"{columna}|{q:.0%}"] = valores
+    tipos = {campo.name: str(campo.type) for campo in datos.schema}
+    return filas, duplicados, nulos, tipos, valores_categoricas, conteos, numericos
+
+
+def informe_nativo(datos, columna_control):
+    """
+    Calcula con Polars o PyArrow el mismo informe que `exploracion_dataframe_por_chunks`: filas, columnas, duplicados,
+    nulos, tipos, valores de las columnas categóricas y estadísticos por categoría de control. Todos los conteos y
+    agregados los calcula el motor; a pandas solo pasan las tablas de resultados.
+
+    Params:
+        - datos: DataFrame o LazyFrame de Polars, o tabla de PyArrow.
+        - columna_control: columna que divide los datos en grupos.
+
+    Returns:
+        Diccionario con las claves filas, columnas, duplicados, nulos, tipos, valores_categoricas,
+        estadisticos_categoricas y estadisticos_numericos (estos dos, diccionarios por categoría de control).
+        Los cuartiles son exactos, con interpolación lineal como `describe()`.
+    """
+    columnas_numericas, columnas_categoricas = columnas_por_tipo(datos)
+    funcion = _informe_arrow if tipo_tabla(datos) == "arrow" else _informe_polars
+    filas, duplicados, nulos, tipos, valores_categoricas, conteos, numericos = funcion(datos, columna_control,
+                                                                                      columnas_numericas,
+                                                                                      columnas_categoricas)
+    numericos = numericos[numericos[columna_control].notna()]
+    estadisticos_numericos = {}
+    nombres = ["count", "mean", "std", "min"] + [f"{q:.0%}" for q in PERCENTILES] + ["max"]
+    for _, fila in numericos.iterrows():
+        estadisticos_numericos[fila[columna_control]] = pd.DataFrame(
+            [[fila[f"{columna}|{nombre}"] for nombre in nombres] for columna in columnas_numericas],
+            index=columnas_numericas, columns=nombres, dtype=np.float64)
+
+    estadisticos_categoricas = {}
+    if conteos is not None:
+        estadisticos_categoricas = _resumen_categoricas(conteos[conteos["control"].notna()], columna_control, columnas_categoricas)
+
+    return {"filas": filas,
+            "columnas": len(tipos),
+            "duplicados": int(duplicados),
+            "nulos": pd.DataFrame(pd.Series(nulos, dtype=np.float64) / filas * 100, columns = ["%_nulos"]),
+            "tipos": pd.DataFrame(pd.Series(tipos), columns = ["tipo_dato"]),
+            "valores_categoricas": valores_categoricas,
+            "estadisticos_categoricas": estadisticos_categoricas,
+            "estadisticos_numericos": estadisticos_numericos}
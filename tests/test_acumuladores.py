@@ -0,0 +1,107 @@
+import builtins
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.soporte_abtesting import exploracion_dataframe_por_chunks
+from src.soporte_acumuladores import AcumuladorFrecuencias, AcumuladorMomentos
+
+
+ESTADISTICOS_EXACTOS = ["count", "mean", "std", "min", "max"]
+
+
+@pytest.fixture
+def datos():
+    rng = np.random.default_rng(0)
+    n = 1_000
+    datos = pd.DataFrame({"grupo": rng.choice(["a", "b", "c"], n),
+                          "x": rng.normal(size=n),
+                          "y": rng.integers(0, 50, n).astype(float),
+                          "ciudad": rng.choice(["madrid", "bilbao", "vigo"], n, p=[0.5, 0.3, 0.2])})
+    # en el segundo trozo el grupo b no tiene ningún valor de x
+    datos.loc[(datos.index >= 200) & (datos.index < 400) & (datos["grupo"] == "b"), "x"] = np.nan
+    datos.loc[rng.random(n) < 0.05, "y"] = np.nan
+    datos.iloc[500:510] = datos.iloc[0:10].to_numpy()
+    return datos
+
+
+@pytest.fixture
+def informe(tmp_path, datos, monkeypatch):
+    monkeypatch.setattr(builtins, "display", lambda *args, **kwargs: None, raising=False)
+    ruta = tmp_path / "datos.csv"
+    datos.to_csv(ruta, index=False)
+    return exploracion_dataframe_por_chunks(str(ruta), "grupo", tamaño_chunk=200, verbose=False)
+
+
+def test_totales_por_trozos(datos, informe):
+    assert informe["filas"] == len(datos)
+    assert informe["duplicados"] == datos.duplicated().sum()
+    esperado = datos.isnull().sum() / len(datos) * 100
+    pd.testing.assert_series_equal(informe["nulos"]["%_nulos"], esperado, check_names=False)
+
+
+def test_numericos_por_trozos_igual_que_describe(datos, informe):
+    describe = datos.groupby("grupo")[["x", "y"]].describe()
+    assert sorted(informe["estadisticos_numericos"]) == ["a", "b", "c"]
+    for grupo, estadisticos in informe["estadisticos_numericos"].items():
+        esperado = describe.loc[grupo].unstack()
+        pd.testing.assert_frame_equal(estadisticos[ESTADISTICOS_EXACTOS], esperado[ESTADISTICOS_EXACTOS],
+                                      check_names=False, rtol=1e-9)
+        # los cuartiles salen del sketch: son valores de los datos con un error de rango de como mucho el 1%
+        for columna in ["x", "y"]:
+            ordenados = np.sort(datos.loc[datos["grupo"] == grupo, columna].dropna())
+            for q, nombre in [(0.25, "25%"), (0.5, "50%"), (0.75, "75%")]:
+                valor = estadisticos.loc[columna, nombre]
+                por_debajo = np.searchsorted(ordenados, valor, side="left") / len(ordenados)
+                hasta = np.searchsorted(ordenados, valor, side="right") / len(ordenados)
+                assert por_debajo - 0.01 <= q <= hasta + 0.01
+
+
+def test_categoricas_por_trozos_igual_que_describe(datos, informe):
+    for grupo, estadisticos in informe["estadisticos_categoricas"].items():
+        conteos = datos.loc[datos["grupo"] == grupo, "ciudad"].value_counts()
+        fila = estadisticos.loc["ciudad"]
+        assert fila["count"] == conteos.sum()
+        assert fila["unique"] == len(conteos)
+        assert fila["freq"] == conteos.max() == conteos[fila["top"]]
+
+
+def test_combinar_momentos_con_columna_sin_valores():
+    rng = np.random.default_rng(1)
+    valores = rng.normal(size=(300, 2))
+    valores[100:200, 0] = np.nan
+    valores[:, 1][rng.random(300) < 0.1] = np.nan
+    combinado = AcumuladorMomentos(["x", "y"])
+    for trozo in np.array_split(valores, [100, 200]):
+        # el trozo del medio no tiene ningún valor de x
+        combinado.combinar(AcumuladorMomentos(["x", "y"]).actualizar(trozo))
+    esperado = pd.DataFrame(valores, columns=["x", "y"]).describe().T[ESTADISTICOS_EXACTOS]
+    pd.testing.assert_frame_equal(combinado.resumen(), esperado, rtol=1e-12)
+
+
+def test_combinar_momentos_vacios():
+    vacio = AcumuladorMomentos(["x"]).actualizar(np.full((5, 1), np.nan))
+    assert vacio.resumen().loc["x"].drop("count").isna().all()
+    lleno = AcumuladorMomentos(["x"]).actualizar(np.array([[1.0], [3.0]]))
+    resumen = vacio.combinar(lleno).resumen().loc["x"]
+    assert resumen["count"] == 2 and resumen["mean"] == 2 and resumen["min"] == 1 and resumen["max"] == 3
+
+
+def test_combinar_frecuencias():
+    rng = np.random.default_rng(2)
+    valores = pd.Series(rng.zipf(1.5, 20_000) % 500)
+    exacto, acotado = AcumuladorFrecuencias(), AcumuladorFrecuencias(capacidad=50)
+    for inicio in range(0, len(valores), 2_500):
+        trozo = valores.iloc[inicio:inicio + 2_500]
+        exacto.combinar(AcumuladorFrecuencias().actualizar(trozo.value_counts()))
+        acotado.combinar(AcumuladorFrecuencias(capacidad=50).actualizar(trozo.value_counts()))
+    conteos = valores.value_counts()
+    assert exacto.exacto and exacto.total == acotado.total == len(valores)
+    pd.testing.assert_series_equal(exacto.conteos.sort_index(), conteos.sort_index(), check_names=False)
+    # con capacidad acotada cada conteo guardado es una cota inferior y le falta como mucho `error`
+    assert not acotado.exacto and len(acotado.conteos) <= 50
+    guardados = acotado.conteos.reindex(conteos.index, fill_value=0)
+    assert (guardados <= conteos).all() and (conteos - guardados <= acotado.error).all()
+    assert acotado.error <= len(valores) / 51
+    assert acotado.resumen()["top"] == conteos.idxmax()
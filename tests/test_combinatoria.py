@@ -0,0 +1,71 @@
+import itertools
+
+import pytest
+
+from src.soporte_combinatoria import (combinaciones, combinaciones_con_repeticion, permutaciones,
+                                      permutaciones_con_repeticion, producto_cartesiano, variaciones,
+                                      variaciones_con_repeticion)
+
+
+CASOS = [
+    (permutaciones, (), itertools.permutations, ()),
+    (variaciones, (2,), itertools.permutations, (2,)),
+    (combinaciones, (2,), itertools.combinations, (2,)),
+    (combinaciones_con_repeticion, (2,), itertools.combinations_with_replacement, (2,)),
+]
+
+
+@pytest.mark.parametrize("elementos", [["A", "B", "C", "D"], ["A", "A", "B"], ["A", "B", "A", "C", "B"]])
+@pytest.mark.parametrize("funcion, argumentos, referencia, argumentos_referencia", CASOS)
+def test_secuencia_igual_que_itertools(elementos, funcion, argumentos, referencia, argumentos_referencia):
+    secuencia, tamaño = funcion(elementos, *argumentos)
+    esperado = list(referencia(elementos, *argumentos_referencia))
+    assert tamaño == len(secuencia) == len(esperado)
+    assert list(secuencia) == esperado
+    assert [secuencia[i] for i in range(len(secuencia))] == esperado
+    for tupla in esperado:
+        assert tupla in secuencia
+        # con elementos repetidos la tupla aparece varias veces y el índice es el de la primera
+        assert secuencia.indice(tupla) == esperado.index(tupla)
+
+
+@pytest.mark.parametrize("elementos", [["A", "B", "C"], ["A", "A", "B"]])
+def test_tuplas_que_no_estan(elementos):
+    secuencia, _ = permutaciones(elementos)
+    assert ("A", "A", "A") not in secuencia
+    assert ("A", "B") not in secuencia
+    assert ("Z", "A", "B") not in secuencia
+    assert [] not in secuencia
+    with pytest.raises(ValueError):
+        secuencia.indice(("A", "A", "A"))
+    combinadas, _ = combinaciones(elementos, 2)
+    assert ("B", "A") not in combinadas
+
+
+def test_permutaciones_con_duplicados():
+    secuencia, tamaño = permutaciones(["A", "A", "B"])
+    assert secuencia[0] in secuencia
+    assert secuencia.indice(("A", "B", "A")) == 1
+    assert all(tupla in secuencia for tupla in secuencia)
+
+    distintas, tamaño = permutaciones_con_repeticion(["A", "A", "B"])
+    assert tamaño == 3
+    assert list(distintas) == [("A", "A", "B"), ("A", "B", "A"), ("B", "A", "A")]
+    assert [distintas.indice(tupla) for tupla in distintas] == [0, 1, 2]
+
+
+def test_producto_y_variaciones_con_repeticion():
+    secuencia, tamaño = producto_cartesiano(["A", "B", "A"], ["x", "y"])
+    esperado = list(itertools.product(["A", "B", "A"], ["x", "y"]))
+    assert list(secuencia) == esperado
+    assert all(secuencia.indice(tupla) == esperado.index(tupla) for tupla in esperado)
+
+    secuencia, tamaño = variaciones_con_repeticion(["A", "B"], 3)
+    assert list(secuencia) == list(itertools.product(["A", "B"], repeat=3))
+
+
+def test_troceado_y_dividir():
+    secuencia, _ = variaciones(["A", "B", "A", "C"], 3)
+    esperado = list(secuencia)
+    assert list(secuencia[5:17]) == esperado[5:17]
+    assert [tupla for tramo in secuencia.dividir(4) for tupla in tramo] == esperado
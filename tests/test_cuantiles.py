@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from src.soporte_cuantiles import SketchCuantiles
+
+
+N = 100_000
+CUANTILES = np.linspace(0, 1, 2001)
+
+
+def _error_rango(sketch, ordenados):
+    # fracción de datos que queda entre el rango pedido y el del valor devuelto (0 si el valor tiene empates que
+    # incluyen el rango pedido)
+    valores = sketch.cuantil(CUANTILES)
+    por_debajo = np.searchsorted(ordenados, valores, side="left") / len(ordenados)
+    hasta = np.searchsorted(ordenados, valores, side="right") / len(ordenados)
+    return np.max(np.maximum(0, np.maximum(por_debajo - CUANTILES, CUANTILES - hasta)))
+
+
+@pytest.fixture(params=[0, 1, 2])
+def datos(request):
+    return np.random.default_rng(request.param).lognormal(size=N)
+
+
+@pytest.mark.parametrize("error", [0.01, 0.05])
+def test_error_de_un_sketch(datos, error):
+    sketch = SketchCuantiles(error, semilla=0).actualizar(datos)
+    assert len(sketch) == N
+    assert _error_rango(sketch, np.sort(datos)) <= error
+
+
+@pytest.mark.parametrize("error", [0.01, 0.05])
+def test_error_por_trozos(datos, error):
+    sketch = SketchCuantiles(error, semilla=0)
+    for trozo in np.array_split(datos, 50):
+        sketch.actualizar(trozo)
+    assert _error_rango(sketch, np.sort(datos)) <= error
+
+
+@pytest.mark.parametrize("error", [0.01, 0.05])
+def test_error_de_sketches_combinados(datos, error):
+    sketch = SketchCuantiles(error, semilla=0)
+    for semilla, trozo in enumerate(np.array_split(datos, 7), start=1):
+        sketch.combinar(SketchCuantiles(error, semilla=semilla).actualizar(trozo))
+    assert len(sketch) == N
+    assert sketch.minimo == datos.min() and sketch.maximo == datos.max()
+    assert _error_rango(sketch, np.sort(datos)) <= error
+
+
+def test_nulos_y_sketch_vacio():
+    sketch = SketchCuantiles()
+    assert np.isnan(sketch.cuantil(0.5))
+    sketch.actualizar([np.nan, 1.0, np.nan, 3.0, 2.0])
+    assert len(sketch) == 3
+    assert sketch.percentil([0, 50, 100]).tolist() == [1.0, 2.0, 3.0]
@@ -0,0 +1,114 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from src.soporte_abtesting import Pruebas_no_parametricas
+from src.soporte_exactas import (DistribucionesExactas, MAXIMO_CELDAS_MANNWHITNEY, mannwhitney_exacto,
+                                 metodo_mannwhitney, wilcoxon_exacto)
+from src.soporte_segmentos import pruebas_por_segmento
+
+
+def _sin_empates(rng, n):
+    # una permutación de rangos distintos: no hay empates ni ceros
+    return rng.permutation(n) + rng.random()
+
+
+@pytest.mark.parametrize("n1, n2", [(1, 1), (1, 9), (3, 5), (8, 8), (5, 3), (7, 40), (8, 200)])
+def test_mannwhitney_igual_que_scipy(n1, n2):
+    rng = np.random.default_rng(n1 * 100 + n2)
+    for _ in range(5):
+        valores = _sin_empates(rng, n1 + n2)
+        x, y = valores[:n1], valores[n1:]
+        u1 = stats.rankdata(valores)[:n1].sum() - n1 * (n1 + 1) / 2
+        esperado = stats.mannwhitneyu(x, y, method="exact")
+        estadistico, p_valor = mannwhitney_exacto(u1, n1, n2)
+        assert estadistico == esperado.statistic
+        assert p_valor == pytest.approx(esperado.pvalue, rel=1e-12)
+
+
+@pytest.mark.parametrize("n", [1, 2, 5, 12, 25, 50])
+def test_wilcoxon_igual_que_scipy(n):
+    rng = np.random.default_rng(n)
+    for _ in range(5):
+        diferencias = (rng.permutation(n) + 1) * rng.choice([-1, 1], n)
+        rangos = stats.rankdata(np.abs(diferencias))
+        suma_positivos, suma_negativos = rangos[diferencias > 0].sum(), rangos[diferencias < 0].sum()
+        esperado = stats.wilcoxon(diferencias, method="exact")
+        estadistico, p_valor = wilcoxon_exacto(suma_positivos, suma_negativos, n)
+        assert estadistico == esperado.statistic
+        assert p_valor == pytest.approx(esperado.pvalue, rel=1e-12)
+
+
+def test_tablas_construidas_desde_la_cache_igual_que_desde_cero():
+    cache = DistribucionesExactas()
+    # en este orden cada tabla sale de una anterior más pequeña
+    for n1, n2 in [(2, 3), (4, 6), (3, 10), (6, 9), (6, 4)]:
+        conteos = cache.mannwhitney(n1, n2)
+        assert conteos.sum() == math.comb(n1 + n2, n1)
+        np.testing.assert_array_equal(conteos, DistribucionesExactas().mannwhitney(n1, n2))
+    for n in [3, 10, 7, 20]:
+        conteos = cache.wilcoxon(n)
+        assert conteos.sum() == 2**n
+        np.testing.assert_array_equal(conteos, DistribucionesExactas().wilcoxon(n))
+
+
+def test_cache_acotada_en_memoria():
+    cache = DistribucionesExactas(max_bytes=4096)
+    for n in range(1, 40):
+        cache.wilcoxon(n)
+    # siempre se queda al menos la última tabla, aunque ocupe más que el máximo
+    assert cache._bytes <= 4096 or len(cache) == 1
+    np.testing.assert_array_equal(cache.wilcoxon(5), DistribucionesExactas().wilcoxon(5))
+
+
+def _p_valor_mannwhitney(capsys, x, y):
+    datos = pd.DataFrame({"grupo": ["a"] * len(x) + ["b"] * len(y), "valor": np.concatenate([x, y])})
+    Pruebas_no_parametricas(datos, "valor", "grupo").test_manwhitneyu(["a", "b"])
+    salida = capsys.readouterr().out
+    return float(next(linea for linea in salida.splitlines() if linea.startswith("Valor p:")).split(":")[1])
+
+
+@pytest.mark.parametrize("n2", [MAXIMO_CELDAS_MANNWHITNEY // 4, MAXIMO_CELDAS_MANNWHITNEY // 4 + 1])
+def test_mannwhitney_a_los_dos_lados_del_limite(capsys, n2):
+    # con n1 = 4 el límite de celdas está justo entre los dos tamaños: por debajo se usa la tabla en caché y por
+    # encima el método exacto de scipy, y los dos coinciden con lo que elige scipy por defecto
+    rng = np.random.default_rng(n2)
+    valores = _sin_empates(rng, 4 + n2)
+    x, y = valores[:4], valores[4:]
+    assert _p_valor_mannwhitney(capsys, x, y) == pytest.approx(stats.mannwhitneyu(x, y).pvalue, rel=1e-9)
+
+
+@pytest.mark.parametrize("n1, n2", [(3, 5), (8, 8), (20, 30)])
+def test_mannwhitney_con_empates(capsys, n1, n2):
+    # con empates scipy pasa a la aproximación normal con corrección por empates
+    rng = np.random.default_rng(n1 + n2)
+    x, y = rng.integers(0, 4, n1).astype(float), rng.integers(0, 4, n2).astype(float)
+    assert _p_valor_mannwhitney(capsys, x, y) == pytest.approx(stats.mannwhitneyu(x, y).pvalue, rel=1e-9)
+
+
+def test_metodo_mannwhitney():
+    exacto, en_tablas = metodo_mannwhitney(np.array([0, 3, 8, 9, 4, 4]), np.array([5, 5, 30, 9, 5_000, 5_001]),
+                                           np.array([0, 0, 0, 0, 0, 0]))
+    assert exacto.tolist() == [False, True, True, False, True, True]
+    assert en_tablas.tolist() == [False, True, True, False, True, False]
+    assert metodo_mannwhitney(3, 5, 6) == (False, False)
+
+
+def test_mannwhitney_por_segmento_igual_que_scipy():
+    # un segmento por debajo del límite de celdas, otro por encima, otro grande y otro con empates
+    rng = np.random.default_rng(0)
+    tamaños = {"pequeño": (4, 10), "limite": (4, MAXIMO_CELDAS_MANNWHITNEY // 4 + 1), "grande": (30, 40)}
+    partes = [pd.DataFrame({"segmento": nombre, "grupo": ["a"] * n1 + ["b"] * n2,
+                            "valor": _sin_empates(rng, n1 + n2)}) for nombre, (n1, n2) in tamaños.items()]
+    partes.append(pd.DataFrame({"segmento": "empates", "grupo": ["a"] * 5 + ["b"] * 6,
+                                "valor": rng.integers(0, 3, 11).astype(float)}))
+    datos = pd.concat(partes, ignore_index=True)
+    resultado = pruebas_por_segmento(datos, "segmento", "grupo", "valor", test="mannwhitneyu",
+                                     categorias=["a", "b"]).set_index("segmento")
+    for segmento, filas in datos.groupby("segmento"):
+        esperado = stats.mannwhitneyu(filas.loc[filas["grupo"] == "a", "valor"], filas.loc[filas["grupo"] == "b", "valor"])
+        assert resultado.loc[segmento, "estadistico"] == esperado.statistic
+        assert resultado.loc[segmento, "p_valor"] == pytest.approx(esperado.pvalue, rel=1e-9)
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from src.soporte_huellas import IndiceHuellas, contar_duplicados
+
+
+@pytest.fixture
+def datos():
+    rng = np.random.default_rng(0)
+    n = 20_000
+    # pocas combinaciones posibles, así que hay duplicados dentro de cada trozo y entre trozos
+    datos = pd.DataFrame({"entero": rng.integers(0, 20, n),
+                          "decimal": rng.integers(0, 10, n) / 4,
+                          "texto": rng.choice(["a", "b", "c", "d"], n)})
+    datos.loc[rng.random(n) < 0.05, "decimal"] = np.nan
+    return datos
+
+
+@pytest.mark.parametrize("tamaño_chunk", [1_000, 7_777, 100_000])
+def test_igual_que_duplicated(datos, tamaño_chunk):
+    esperado = datos.duplicated().sum()
+    assert contar_duplicados(datos, tamaño_chunk=tamaño_chunk) == esperado
+    assert contar_duplicados(pa.Table.from_pandas(datos, preserve_index=False), tamaño_chunk=tamaño_chunk) == esperado
+
+
+def test_igual_que_duplicated_con_columnas_clave(datos):
+    indice = IndiceHuellas(columnas=["entero", "texto"])
+    assert indice.actualizar(datos, tamaño_chunk=3_000) == datos.duplicated(["entero", "texto"]).sum()
+    assert len(indice) == len(datos.drop_duplicates(["entero", "texto"]))
+
+
+@pytest.mark.parametrize("metodo", ["exacto", "bloom"])
+def test_guardar_y_reabrir(tmp_path, datos, metodo):
+    ruta = str(tmp_path / f"indice_{metodo}.npy")
+    dias = np.array_split(np.arange(len(datos)), 4)
+    indice = IndiceHuellas(metodo=metodo, capacidad=len(datos), ruta=ruta)
+    duplicados = indice.actualizar(datos.iloc[dias[0]], tamaño_chunk=1_000)
+    indice.guardar()
+    for filas in dias[1:]:
+        # cada día se abre el índice desde el fichero, con memoria mapeada
+        indice = IndiceHuellas(metodo=metodo, ruta=ruta)
+        duplicados += indice.actualizar(datos.iloc[filas], tamaño_chunk=1_000)
+        indice.guardar()
+    if metodo == "exacto":
+        assert duplicados == datos.duplicated().sum()
+        assert len(IndiceHuellas(ruta=ruta)) == len(datos.drop_duplicates())
+    else:
+        assert duplicados >= datos.duplicated().sum()
+
+
+def test_bloom_nunca_cuenta_menos_que_el_exacto():
+    rng = np.random.default_rng(1)
+    # con un filtro pequeño hay falsos positivos, pero nunca falsos negativos
+    exacto, bloom = IndiceHuellas(), IndiceHuellas(metodo="bloom", capacidad=5_000, error=0.05)
+    falsos_positivos = 0
+    for _ in range(10):
+        trozo = pd.DataFrame({"id": rng.integers(0, 20_000, 2_000)})
+        duplicados_exacto, duplicados_bloom = exacto.actualizar(trozo), bloom.actualizar(trozo)
+        assert duplicados_bloom >= duplicados_exacto
+        falsos_positivos += duplicados_bloom - duplicados_exacto
+    assert falsos_positivos > 0
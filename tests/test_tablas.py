@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from src.soporte_tablas import informe_nativo
+
+pl = pytest.importorskip("polars")
+
+
+@pytest.fixture
+def datos():
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({"k": rng.integers(0, 2, 500), "y": rng.normal(size=500), "c": rng.choice(list("xy"), 500)})
+
+
+def test_arrow_con_control_numerico_igual_que_polars(datos):
+    # el control 0/1 también es columna numérica: no puede seleccionarse dos veces
+    arrow = informe_nativo(pa.Table.from_pandas(datos, preserve_index=False), "k")
+    polars = informe_nativo(pl.from_pandas(datos), "k")
+    assert sorted(arrow["estadisticos_numericos"]) == sorted(polars["estadisticos_numericos"]) == [0, 1]
+    for categoria, estadisticos in arrow["estadisticos_numericos"].items():
+        assert list(estadisticos.index) == ["k", "y"]
+        pd.testing.assert_frame_equal(estadisticos, polars["estadisticos_numericos"][categoria], check_exact=False)
+        assert estadisticos.loc["y", "count"] == (datos["k"] == categoria).sum()
+
+
+def test_arrow_con_columna_llamada_como_el_alias(datos):
+    datos = datos.rename(columns={"y": "|control"})
+    arrow = informe_nativo(pa.Table.from_pandas(datos, preserve_index=False), "k")
+    polars = informe_nativo(pl.from_pandas(datos), "k")
+    for categoria, estadisticos in arrow["estadisticos_numericos"].items():
+        pd.testing.assert_frame_equal(estadisticos, polars["estadisticos_numericos"][categoria], check_exact=False)